@@ -0,0 +1,292 @@
+import os
+import hmac
+import math
+import time
+import asyncio
+import hashlib
+from collections import deque, OrderedDict, Counter
+from typing import Optional, Dict, Any
+
+from fastapi.responses import JSONResponse
+
+
+MAX_INFLIGHT = int(os.getenv("ENGINE_MAX_INFLIGHT", "8"))
+MAX_QUEUE = int(os.getenv("ENGINE_MAX_QUEUE", "64"))
+MAX_QUEUE_PER_TENANT = int(os.getenv("ENGINE_MAX_QUEUE_PER_TENANT", "16"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("ENGINE_QUEUE_TIMEOUT_SECONDS", "30"))
+
+# Highest priority first. Paths not listed here (health, marketplaces, debug) bypass admission.
+PRIORITY_CLASSES = ("interactive", "standard", "bulk")
+ENDPOINT_CLASSES = {
+    "/verify": "interactive",
+    "/scan/page": "interactive",
+    "/refresh": "standard",
+    "/snapshots/summary": "standard",
+    "/scan": "bulk",
+}
+# Share of MAX_INFLIGHT each class may occupy, so a burst of scans always leaves
+# slots free for interactive calls.
+CLASS_SHARE = {"interactive": 1.0, "standard": 0.75, "bulk": 0.5}
+
+# Shared with the Node backend, which signs the X-Tenant-Id it forwards; other callers are keyed by IP.
+TENANT_SECRET = os.getenv("ENGINE_TENANT_SECRET")
+# Tenant keys are keyed hashes, so /debug/admission never shows a session id or an address.
+_TENANT_HASH_KEY = TENANT_SECRET.encode() if TENANT_SECRET else os.urandom(16)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "tenant", "future", "enqueued_at")
+
+    def __init__(self, priority: str, tenant: str, future: asyncio.Future):
+        self.priority = priority
+        self.tenant = tenant
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """Bounded, priority-ordered admission for engine requests.
+
+    At most ``max_inflight`` requests run at once, each priority class is
+    capped at its share of that, and the rest wait in a bounded queue.
+    Higher classes are always dispatched first; within a class tenants are
+    served round-robin so one caller cannot monopolise the engine. When
+    the queue (or a tenant's part of it) is full the request is rejected
+    with a Retry-After estimate instead of piling up in memory.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = MAX_INFLIGHT,
+        max_queue: int = MAX_QUEUE,
+        max_queue_per_tenant: int = MAX_QUEUE_PER_TENANT,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS,
+        class_share: Optional[Dict[str, float]] = None,
+    ):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.max_queue_per_tenant = max_queue_per_tenant
+        self.queue_timeout = queue_timeout
+        share = class_share or CLASS_SHARE
+        self.class_limits = {p: max(1, int(max_inflight * share.get(p, 1.0))) for p in PRIORITY_CLASSES}
+
+        self.inflight: Counter = Counter()
+        self.queues: Dict[str, "OrderedDict[str, deque]"] = {p: OrderedDict() for p in PRIORITY_CLASSES}
+        self.queued: Counter = Counter()
+        self.tenant_queued: Counter = Counter()
+
+        self.admitted: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self.timed_out: Counter = Counter()
+        self.waits: Dict[str, deque] = {p: deque(maxlen=500) for p in PRIORITY_CLASSES}
+        self.service_seconds: Dict[str, float] = {p: 1.0 for p in PRIORITY_CLASSES}
+
+    @property
+    def depth(self) -> int:
+        return sum(self.queued.values())
+
+    def _can_run(self, priority: str) -> bool:
+        return (
+            sum(self.inflight.values()) < self.max_inflight
+            and self.inflight[priority] < self.class_limits[priority]
+        )
+
+    def retry_after(self, priority: str) -> int:
+        ahead = sum(self.queued[p] for p in PRIORITY_CLASSES[:PRIORITY_CLASSES.index(priority) + 1])
+        estimate = (ahead + 1) * self.service_seconds[priority] / self.class_limits[priority]
+        return max(1, math.ceil(estimate))
+
+    async def acquire(self, priority: str, tenant: str, timeout: Optional[float] = None) -> float:
+        """Wait for a slot and return how long we waited; raises AdmissionRejected.
+
+        ``timeout`` is what is left of the caller's own deadline; the wait
+        never outlasts it or the controller's queue timeout.
+        """
+        if not self.queued[priority] and self._can_run(priority):
+            self.inflight[priority] += 1
+            self.admitted[priority] += 1
+            self.waits[priority].append(0.0)
+            return 0.0
+
+        if self.depth >= self.max_queue:
+            self.rejected[priority] += 1
+            raise AdmissionRejected("Engine queue is full", self.retry_after(priority))
+        if self.tenant_queued[tenant] >= self.max_queue_per_tenant:
+            self.rejected[priority] += 1
+            raise AdmissionRejected("Too many queued requests for this client", self.retry_after(priority))
+        queue_timeout = self.queue_timeout if timeout is None else min(self.queue_timeout, timeout)
+        if queue_timeout <= 0:
+            self.timed_out[priority] += 1
+            raise AdmissionRejected("Deadline expired before a slot was free", self.retry_after(priority))
+
+        waiter = _Waiter(priority, tenant, asyncio.get_running_loop().create_future())
+        self.queues[priority].setdefault(tenant, deque()).append(waiter)
+        self.queued[priority] += 1
+        self.tenant_queued[tenant] += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done():
+                # Granted a slot in the same tick we gave up; hand it back.
+                self.release(priority)
+            else:
+                waiter.future.cancel()
+                self._remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out[priority] += 1
+            raise AdmissionRejected("Timed out waiting in the engine queue", self.retry_after(priority))
+
+        waited = time.monotonic() - waiter.enqueued_at
+        self.waits[priority].append(waited)
+        return waited
+
+    def release(self, priority: str, service_seconds: Optional[float] = None) -> None:
+        self.inflight[priority] -= 1
+        if service_seconds is not None:
+            self.service_seconds[priority] = 0.8 * self.service_seconds[priority] + 0.2 * service_seconds
+        self._dispatch()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        tenants = self.queues[waiter.priority]
+        pending = tenants.get(waiter.tenant)
+        if pending is None or waiter not in pending:
+            return
+        pending.remove(waiter)
+        if not pending:
+            del tenants[waiter.tenant]
+        self.queued[waiter.priority] -= 1
+        self.tenant_queued[waiter.tenant] -= 1
+
+    def _pop(self, priority: str) -> Optional[_Waiter]:
+        tenants = self.queues[priority]
+        if not tenants:
+            return None
+        tenant, pending = next(iter(tenants.items()))
+        waiter = pending.popleft()
+        if pending:
+            # Round-robin: this tenant goes to the back of the line.
+            tenants.move_to_end(tenant)
+        else:
+            del tenants[tenant]
+        self.queued[priority] -= 1
+        self.tenant_queued[tenant] -= 1
+        return waiter
+
+    def _dispatch(self) -> None:
+        while sum(self.inflight.values()) < self.max_inflight:
+            for priority in PRIORITY_CLASSES:
+                if self.queued[priority] and self._can_run(priority):
+                    waiter = self._pop(priority)
+                    self.inflight[priority] += 1
+                    self.admitted[priority] += 1
+                    waiter.future.set_result(None)
+                    break
+            else:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        classes = {}
+        for priority in PRIORITY_CLASSES:
+            waits = sorted(self.waits[priority])
+            classes[priority] = {
+                "limit": self.class_limits[priority],
+                "inflight": self.inflight[priority],
+                "queued": self.queued[priority],
+                "admitted": self.admitted[priority],
+                "rejected": self.rejected[priority],
+                "timed_out": self.timed_out[priority],
+                "p50_wait_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                "p95_wait_ms": round(waits[int(len(waits) * 0.95) - 1] * 1000, 1) if len(waits) >= 20 else None,
+                "avg_service_ms": round(self.service_seconds[priority] * 1000, 1),
+            }
+        return {
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "queue_depth": self.depth,
+            "classes": classes,
+            "busiest_tenants": [
+                {"tenant": t, "queued": n} for t, n in self.tenant_queued.most_common(5) if n
+            ],
+        }
+
+
+def tenant_signature(tenant: str, secret: str) -> str:
+    return hmac.new(secret.encode(), tenant.encode(), hashlib.sha256).hexdigest()
+
+
+def signed_tenant(headers, secret: Optional[str] = TENANT_SECRET) -> Optional[str]:
+    """The X-Tenant-Id header if it carries a valid X-Tenant-Signature from the Node backend."""
+    tenant = headers.get("x-tenant-id")
+    if not tenant or not secret:
+        return None
+    signature = headers.get("x-tenant-signature", "")
+    if not hmac.compare_digest(signature.encode(), tenant_signature(tenant, secret).encode()):
+        return None
+    return tenant
+
+
+def tenant_key(request, secret: Optional[str] = TENANT_SECRET) -> str:
+    """Opaque queueing key for a request.
+
+    X-Tenant-Id is only trusted when it is signed; anything else is keyed
+    by client address, so a caller cannot mint a fresh tenant per request.
+    """
+    tenant = signed_tenant(request.headers, secret)
+    raw = f"tenant:{tenant}" if tenant else f"ip:{request.client.host if request.client else 'anonymous'}"
+    return hmac.new(_TENANT_HASH_KEY, raw.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def tenant_guard(secret: Optional[str] = TENANT_SECRET):
+    """FastAPI dependency for endpoints only the Node backend may call: 401 without a signed tenant."""
+    from fastapi import HTTPException, Request
+
+    async def check(request: Request) -> None:
+        if signed_tenant(request.headers, secret) is None:
+            raise HTTPException(status_code=401, detail="Signed X-Tenant-Id required")
+
+    return check
+
+
+def install(app, controller: AdmissionController, endpoint_classes: Optional[Dict[str, str]] = None) -> None:
+    """Gate the listed endpoints through ``controller``; everything else is admitted immediately."""
+    classes = endpoint_classes or ENDPOINT_CLASSES
+
+    @app.middleware("http")
+    async def _admit_requests(request, call_next):
+        priority = classes.get(request.url.path)
+        if priority is None:
+            return await call_next(request)
+
+        # Deadlines are measured from here, so time spent queueing comes out of the request's budget.
+        arrived_at = time.monotonic()
+        request.state.arrived_at = arrived_at
+        try:
+            budget = float(request.headers["x-deadline-ms"]) / 1000
+        except (KeyError, ValueError):
+            budget = None
+
+        try:
+            waited = await controller.acquire(priority, tenant_key(request), timeout=budget)
+        except AdmissionRejected as e:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": e.reason, "retry_after": e.retry_after},
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+        started = time.monotonic()
+        try:
+            response = await call_next(request)
+        finally:
+            controller.release(priority, time.monotonic() - started)
+        response.headers["X-Queue-Wait-Ms"] = str(int(waited * 1000))
+        return response
@@ -0,0 +1,399 @@
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import tempfile
+import subprocess
+from multiprocessing import get_context
+from typing import List, Dict, Any
+
+from python_engine.models import Marketplace, DistressSignal
+from python_engine.services.serpapi_client import MARKETPLACE_SEARCH_CONFIG, parse_organic_results
+from python_engine.services.shared_store import SharedStore
+
+
+IMPORT_TIME_BUDGET_MS = 1000
+# Heavy dependencies that must only load on first use, never when the app is imported.
+LAZY_MODULES = ("google.genai", "requests")
+
+
+SAMPLE_URLS = {
+    Marketplace.CHROME: "https://chromewebstore.google.com/detail/sample-{i}/abcdefghijklmnopabcdefghijklmnop",
+    Marketplace.SHOPIFY: "https://apps.shopify.com/sample-{i}",
+    Marketplace.WORDPRESS: "https://wordpress.org/plugins/sample-{i}",
+    Marketplace.VSCODE: "https://marketplace.visualstudio.com/items?itemName=sample.{i}",
+}
+
+
+def synthetic_organic_results(marketplace: Marketplace, count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    template = SAMPLE_URLS.get(marketplace, "https://" + MARKETPLACE_SEARCH_CONFIG[marketplace]["site"] + "/sample-{i}")
+    results = []
+    for i in range(count):
+        # Roughly a third of organic results are category/blog pages that fail the URL filter.
+        link = template.format(i=i) if rng.random() > 0.3 else f"https://example.com/blog/{i}"
+        results.append({
+            "title": f"Sample Asset {i}",
+            "link": link,
+            "snippet": f"{rng.randint(1000, 90000):,} users. Rated {rng.uniform(2, 5):.1f}/5. Last updated 2021.",
+        })
+    return results
+
+
+def synthetic_verification(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "is_valid_asset": True,
+        "distress_signals": rng.sample([s.value for s in DistressSignal], rng.randint(0, 3)),
+        "estimated_users": rng.randint(1000, 90000),
+        "estimated_rating": round(rng.uniform(2, 5), 1),
+        "verification_notes": "offline benchmark",
+    }
+
+
+def run_worker(args: tuple) -> int:
+    db_path, scans, results_per_scan, seed = args
+    from python_engine.services.gemini_verifier import GeminiVerifier
+
+    store = SharedStore(db_path)
+    verifier = GeminiVerifier(api_key="offline-benchmark")
+    rng = random.Random(seed)
+    marketplaces = list(SAMPLE_URLS)
+    processed = 0
+
+    for n in range(scans):
+        marketplace = marketplaces[n % len(marketplaces)]
+        cache_key = f"{seed}:{n}"
+        parsed = store.cache_get("benchmark", cache_key)
+        if parsed is None:
+            organic = synthetic_organic_results(marketplace, results_per_scan, seed + n)
+            parsed = parse_organic_results(organic, marketplace)
+            store.cache_set("benchmark", cache_key, parsed, 3600)
+        for raw_result in parsed:
+            asset = verifier.enrich_asset(raw_result, synthetic_verification(rng))
+            json.dumps(asset.model_dump(mode="json"))
+            processed += 1
+
+    return processed
+
+
+def benchmark(max_workers: int, scans: int, results_per_scan: int) -> List[Dict[str, Any]]:
+    rows = []
+    ctx = get_context("spawn")
+    workers = 1
+    while workers <= max_workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "state.db")
+            SharedStore(db_path)
+            jobs = [(db_path, scans, results_per_scan, w * 100000) for w in range(workers)]
+            with ctx.Pool(workers) as pool:
+                pool.map(run_worker, [(db_path, 1, 1, -1)] * workers)
+                start = time.perf_counter()
+                processed = sum(pool.map(run_worker, jobs))
+                elapsed = time.perf_counter() - start
+        rows.append({
+            "workers": workers,
+            "assets": processed,
+            "seconds": round(elapsed, 3),
+            "assets_per_second": round(processed / elapsed),
+        })
+        workers *= 2
+    base = rows[0]["assets_per_second"]
+    for row in rows:
+        row["speedup"] = round(row["assets_per_second"] / base, 2)
+    return rows
+
+
+def serialization(assets_count: int, rounds: int) -> List[Dict[str, Any]]:
+    from python_engine.models import ScanResponse
+    from python_engine.services.gemini_verifier import GeminiVerifier
+    from python_engine.serialization import asset_records, encode_scan_response
+
+    verifier = GeminiVerifier(api_key="offline-benchmark")
+    rng = random.Random(7)
+    organic = synthetic_organic_results(Marketplace.SHOPIFY, int(assets_count * 1.5), 7)
+    parsed = parse_organic_results(organic, Marketplace.SHOPIFY)[:assets_count]
+    assets = [verifier.enrich_asset(r, synthetic_verification(rng)) for r in parsed]
+    meta = {"total_found": len(assets), "marketplaces_scanned": 1, "scan_duration_ms": 0, "cached": False}
+
+    def fastapi_default() -> bytes:
+        # What response_model=ScanResponse does: validate, dump in JSON mode, then json.dumps.
+        response = ScanResponse.model_validate({**meta, "assets": assets})
+        return json.dumps(response.model_dump(mode="json")).encode()
+
+    cases = {
+        "fastapi_default": fastapi_default,
+        "rows": lambda: encode_scan_response(asset_records(assets), meta).body,
+        "rows_projected": lambda: encode_scan_response(
+            asset_records(assets), meta, ["id", "url", "estimated_valuation", "distress_score"]
+        ).body,
+        "columnar": lambda: encode_scan_response(asset_records(assets), meta, response_format="columnar").body,
+    }
+    rows = []
+    for name, fn in cases.items():
+        size = len(fn())
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        elapsed = (time.perf_counter() - start) / rounds
+        rows.append({"case": name, "assets": len(assets), "ms": round(elapsed * 1000, 2), "bytes": size})
+    return rows
+
+
+V6_BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "v6_platform", "fastapi_backend")
+
+# Five uncapped long-form sections; only used for the "before" latency estimate.
+LEGACY_ANALYZE_OUTPUT_TOKENS = 1200
+
+
+def sample_verify_reply(note_words: int) -> str:
+    return json.dumps({
+        "is_valid_asset": True,
+        "distress_signals": ["no_updates", "manifest_v2"],
+        "estimated_users": 25000,
+        "estimated_rating": 3.8,
+        "verification_notes": " ".join(["note"] * note_words),
+        "owner_likely_selling": False,
+    })
+
+
+def legacy_verify_prompt(asset_data: Dict[str, Any]) -> str:
+    """The verification prompt as sent before compaction."""
+    return f"""Analyze this software asset for acquisition potential:
+
+Name: {asset_data.get('title', 'Unknown')}
+URL: {asset_data.get('url', '')}
+Description: {asset_data.get('snippet', '')}
+Marketplace: {asset_data.get('marketplace', 'unknown')}
+
+Provide a brief analysis in JSON format:
+{{
+    "is_valid_asset": true/false,
+    "distress_signals": ["no_updates", "broken_support", "manifest_v2", "declining_reviews", "owner_inactive"],
+    "estimated_users": number,
+    "estimated_rating": number (1-5),
+    "verification_notes": "brief notes about the asset",
+    "owner_likely_selling": true/false
+}}
+
+Only include distress signals that are likely based on the information provided.
+Respond ONLY with valid JSON, no markdown."""
+
+
+def legacy_analyze_prompt(name: str, users: int, url: str, asset_type: str) -> str:
+    """The v6 analysis prompt as sent before compaction."""
+    calculated_mrr = users * 0.02 * 5
+    annual_revenue = calculated_mrr * 12
+    valuation_low, valuation_high = annual_revenue * 3, annual_revenue * 5
+    asset_type_context = ""
+    if asset_type == "chrome_extension":
+        asset_type_context = "This is a Chrome Extension. Note: Google is deprecating Manifest V2 in 2025, forcing all extensions to migrate to Manifest V3 or die."
+    return f"""You are a ruthless Distressed Asset Fund Manager specializing in digital micro-acquisitions.
+
+INPUT:
+- Asset Name: {name}
+- Users: {users:,}
+- URL: {url}
+- Asset Type: {asset_type}
+{asset_type_context}
+
+PRE-CALCULATED METRICS (use these exact numbers):
+- Potential MRR: ${calculated_mrr:,.0f}/month (Formula: {users:,} users x 2% conversion x $5/mo)
+- Annual Revenue Potential: ${annual_revenue:,.0f}
+- Valuation Range: ${valuation_low:,.0f} - ${valuation_high:,.0f} (3-5x annual revenue)
+
+YOUR TASK:
+1. Assess the "Manifest V2 Risk" (for Chrome) or "Platform Risk" (for Shopify) - rate as High/Medium/Low with specific reasoning.
+2. Write "The Play" - your acquisition and monetization strategy. Be specific about:
+   - How to approach the owner
+   - What to offer
+   - How to monetize post-acquisition
+3. Write a "Pattern Interrupt" cold email that gets the developer's attention. Make it short, direct, and intriguing.
+4. Generate a fake but realistic "Owner Contact" (for demo purposes).
+5. Write a "Negotiation Script" for the first call.
+
+Return ONLY valid JSON with these exact keys:
+{{
+  "valuation": "${valuation_low:,.0f} - ${valuation_high:,.0f}",
+  "potential_mrr": "${calculated_mrr:,.0f}/month",
+  "the_play": "string describing full acquisition strategy",
+  "cold_email": "string with the full cold email",
+  "manifest_v2_risk": "High/Medium/Low with specific reasoning",
+  "owner_contact": "Generated owner name and email for demo",
+  "negotiation_script": "Script for first acquisition call"
+}}"""
+
+
+def synthetic_listing_snippet(rng: random.Random) -> str:
+    # Rich-result snippets: a date, stats, and a marketing description of very uneven length.
+    sentences = [
+        "The all-in-one productivity toolkit trusted by teams worldwide.",
+        "Organize, automate and sync your workflow across every device!!!",
+        "Now with AI-powered suggestions, dark mode and &quot;one-click&quot; exports.",
+        "Works with Google Drive, Dropbox, Slack, Notion and 40+ other integrations.",
+        "Read more...",
+        "Support: visit https://example.com/help for FAQs and tutorials.",
+    ]
+    body = " ".join(rng.choice(sentences) for _ in range(rng.randint(1, 12)))
+    return (
+        f"{rng.choice(['Jan', 'Mar', 'Aug'])} {rng.randint(1, 28)}, {rng.randint(2019, 2024)} — "
+        f"{rng.randint(1000, 90000):,} users. Rated {rng.uniform(2, 5):.1f}/5. {body}"
+    )
+
+
+def prompt_budget(
+    samples: int,
+    ttft_ms: float,
+    prefill_tokens_per_second: float,
+    decode_tokens_per_second: float,
+) -> List[Dict[str, Any]]:
+    """Tokens per call before and after compaction, with a first-order latency estimate.
+
+    Latency is modelled as time to first token plus prompt and reply
+    tokens over the given rates. Verification replies are sampled with
+    "brief" notes before and notes at the 20-word cap after; analysis
+    replies are a typical uncapped size before and every section at its
+    cap after, so the analysis "after" figure is an upper bound.
+    """
+    from python_engine.prompts import count_tokens
+    from python_engine.services.gemini_verifier import VERIFY_PROMPT, NAME_TOKEN_BUDGET, SNIPPET_TOKEN_BUDGET
+
+    sys.path.insert(0, V6_BACKEND)
+    from app.routes.analyze import ANALYZE_PROMPT
+
+    def latency_ms(prompt_tokens: float, output_tokens: float) -> float:
+        return round(
+            ttft_ms + 1000 * prompt_tokens / prefill_tokens_per_second + 1000 * output_tokens / decode_tokens_per_second
+        )
+
+    rng = random.Random(11)
+    verify_before, verify_after, analyze_before, analyze_after, build_s = [], [], [], [], 0.0
+    for i in range(samples):
+        asset_data = {
+            "title": f"Sample Asset {i} - Tab Manager & Productivity Suite for Teams",
+            "url": SAMPLE_URLS[Marketplace.CHROME].format(i=i),
+            "snippet": synthetic_listing_snippet(rng),
+            "marketplace": "chrome",
+        }
+        verify_before.append(count_tokens(legacy_verify_prompt(asset_data)))
+        start = time.perf_counter()
+        prompt = VERIFY_PROMPT.render([
+            ("Name", asset_data["title"], NAME_TOKEN_BUDGET),
+            ("URL", asset_data["url"], None),
+            ("Marketplace", asset_data["marketplace"], None),
+            ("Listing", asset_data["snippet"], SNIPPET_TOKEN_BUDGET),
+        ])
+        build_s += time.perf_counter() - start
+        verify_after.append(VERIFY_PROMPT.system_tokens + count_tokens(prompt))
+
+        users = rng.randint(1000, 90000)
+        analyze_before.append(count_tokens(legacy_analyze_prompt(asset_data["title"], users, asset_data["url"], "chrome_extension")))
+        mrr = users * 0.1
+        prompt = ANALYZE_PROMPT.render([
+            ("Asset Name", asset_data["title"], 24),
+            ("Asset Type", "chrome_extension", None),
+            ("Users", f"{users:,}", None),
+            ("URL", asset_data["url"], None),
+            ("Potential MRR", f"${mrr:,.0f}/month ({users:,} users x 2% conversion x $5/mo)", None),
+            ("Annual Revenue Potential", f"${mrr * 12:,.0f}", None),
+            ("Valuation Range", f"${mrr * 36:,.0f} - ${mrr * 60:,.0f} (3-5x annual revenue)", None),
+        ])
+        analyze_after.append(ANALYZE_PROMPT.system_tokens + count_tokens(prompt))
+
+    outputs = {
+        "verify": (count_tokens(sample_verify_reply(45)), count_tokens(sample_verify_reply(20))),
+        "analyze": (LEGACY_ANALYZE_OUTPUT_TOKENS, ANALYZE_PROMPT.expected_output_tokens),
+    }
+    rows = []
+    for name, before, after, prompt in (
+        ("verify", verify_before, verify_after, VERIFY_PROMPT),
+        ("analyze", analyze_before, analyze_after, ANALYZE_PROMPT),
+    ):
+        output_before, output_after = outputs[name]
+        mean_before, mean_after = sum(before) / samples, sum(after) / samples
+        rows.append({
+            "prompt": name,
+            "prompt_tokens_before": round(mean_before, 1),
+            "prompt_tokens_after": round(mean_after, 1),
+            "max_prompt_tokens_before": max(before),
+            "max_prompt_tokens_after": max(after),
+            "system_tokens": prompt.system_tokens,
+            "output_tokens_before": output_before,
+            "output_tokens_after": output_after,
+            "output_cap_after": prompt.max_output_tokens,
+            "latency_ms_before": latency_ms(mean_before, output_before),
+            "latency_ms_after": latency_ms(mean_after, output_after),
+        })
+    rows[0]["render_us_per_call"] = round(build_s / samples * 1e6, 1)
+    return rows
+
+
+def import_time(module: str = "python_engine.main") -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        # From the repository root, so the package imports wherever this is run from.
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cumulative[parts[2].strip()] = int(parts[1])
+        except ValueError:
+            continue
+    slowest = sorted(cumulative.items(), key=lambda kv: kv[1], reverse=True)[:10]
+    return {
+        "module": module,
+        "total_ms": round(cumulative.get(module, 0) / 1000, 1),
+        "eager_heavy_modules": [m for m in LAZY_MODULES if m in cumulative],
+        "slowest": [{"module": m, "ms": round(us / 1000, 1)} for m, us in slowest],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline engine benchmarks")
+    subparsers = parser.add_subparsers(dest="command")
+
+    workers_parser = subparsers.add_parser("workers", help="scan pipeline throughput across worker processes")
+    workers_parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    workers_parser.add_argument("--scans", type=int, default=200)
+    workers_parser.add_argument("--results-per-scan", type=int, default=100)
+
+    import_parser = subparsers.add_parser("import-time", help="cold import cost of the engine app")
+    import_parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+
+    serialization_parser = subparsers.add_parser("serialization", help="scan response encoding cost")
+    serialization_parser.add_argument("--assets", type=int, default=1000)
+    serialization_parser.add_argument("--rounds", type=int, default=20)
+
+    prompts_parser = subparsers.add_parser("prompts", help="Gemini prompt tokens before and after compaction")
+    prompts_parser.add_argument("--samples", type=int, default=500)
+    prompts_parser.add_argument("--ttft-ms", type=float, default=300)
+    prompts_parser.add_argument("--prefill-tokens-per-second", type=float, default=5000)
+    prompts_parser.add_argument("--decode-tokens-per-second", type=float, default=150)
+
+    args = parser.parse_args()
+
+    if args.command == "prompts":
+        for row in prompt_budget(args.samples, args.ttft_ms, args.prefill_tokens_per_second, args.decode_tokens_per_second):
+            print(json.dumps(row))
+    elif args.command == "serialization":
+        for row in serialization(args.assets, args.rounds):
+            print(json.dumps(row))
+    elif args.command == "import-time":
+        report = import_time()
+        print(json.dumps(report, indent=2))
+        if report["total_ms"] > args.budget_ms or report["eager_heavy_modules"]:
+            print(f"[Benchmark] Import budget exceeded ({args.budget_ms}ms, lazy: {', '.join(LAZY_MODULES)})")
+            sys.exit(1)
+    elif args.command == "workers":
+        for row in benchmark(args.max_workers, args.scans, args.results_per_scan):
+            print(json.dumps(row))
+    else:
+        parser.print_help()
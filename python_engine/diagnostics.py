@@ -0,0 +1,243 @@
+import os
+import sys
+import hmac
+import time
+import uuid
+import asyncio
+import threading
+import traceback
+from collections import deque, Counter
+from typing import Optional, Dict, Any, List
+
+from python_engine.services.shared_store import get_store
+
+LAG_THRESHOLD_SECONDS = 0.2
+WATCHDOG_INTERVAL_SECONDS = 0.05
+
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+PROFILE_MAX_SECONDS = 30.0
+# Profiles go to the shared store, so any worker can answer /debug/profile for them.
+PROFILE_TTL_SECONDS = 3600
+DEBUG_TOKEN_HEADER = "x-debug-token"
+
+_basenames: Dict[str, str] = {}
+
+
+def _collapse(frame) -> str:
+    # Walks code objects directly; traceback.extract_stack would hit linecache on every sample.
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = _basenames.get(code.co_filename)
+        if filename is None:
+            filename = _basenames[code.co_filename] = os.path.basename(code.co_filename)
+        names.append(f"{filename}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def has_debug_token(headers, token: Optional[str]) -> bool:
+    sent = headers.get(DEBUG_TOKEN_HEADER)
+    return bool(token and sent) and hmac.compare_digest(sent.encode(), token.encode())
+
+
+def debug_guard(token: Optional[str]):
+    """FastAPI dependency for endpoints that expose stacks: 404 unless ``token`` is set and sent as X-Debug-Token."""
+    from fastapi import HTTPException, Request
+
+    async def check(request: Request) -> None:
+        if not has_debug_token(request.headers, token):
+            raise HTTPException(status_code=404, detail="Not Found")
+
+    return check
+
+
+class LoopWatchdog:
+    """Measures event-loop lag and logs the loop thread's stack whenever it is blocked too long.
+
+    A coroutine on the loop stamps a heartbeat every few milliseconds; a
+    daemon thread notices when the heartbeat goes stale and captures the
+    stack of whatever is holding the loop at that moment.
+    """
+
+    def __init__(self, threshold: float = LAG_THRESHOLD_SECONDS, interval: float = WATCHDOG_INTERVAL_SECONDS):
+        self.threshold = threshold
+        self.interval = interval
+        self.lags: deque = deque(maxlen=1200)
+        self.blocked_events: deque = deque(maxlen=50)
+        self.max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        reported_for = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat
+            if stalled < self.threshold or reported_for == heartbeat:
+                continue
+            # Report each stall once, with the stack captured while it is still blocking.
+            reported_for = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+            self.blocked_events.append({
+                "at": time.time(),
+                "blocked_ms": int(stalled * 1000),
+                "stack": stack,
+            })
+            print(f"[Watchdog] Event loop blocked for {int(stalled * 1000)}ms:\n{stack}")
+
+    def stats(self) -> Dict[str, Any]:
+        lags = sorted(self.lags)
+        p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+        return {
+            "threshold_ms": int(self.threshold * 1000),
+            "samples": len(lags),
+            "p99_lag_ms": round(p99 * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "blocked_events": len(self.blocked_events),
+            "recent_blocks": [
+                {"at": e["at"], "blocked_ms": e["blocked_ms"], "stack": e["stack"].splitlines()[-6:]}
+                for e in list(self.blocked_events)[-5:]
+            ],
+        }
+
+
+class SamplingProfiler:
+    """Samples the event-loop thread's stack into collapsed (flamegraph) form.
+
+    Runs in a daemon thread for at most PROFILE_MAX_SECONDS and only one
+    profile runs at a time, so it is cheap enough to leave switched on.
+    Samples cover everything on the loop, including overlapping requests.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def try_start(cls, thread_id: int) -> Optional["SamplingProfiler"]:
+        if not cls._lock.acquire(blocking=False):
+            return None
+        profiler = cls(thread_id)
+        profiler.started_at = time.monotonic()
+        profiler._thread = threading.Thread(target=profiler._run, name="request-profiler", daemon=True)
+        profiler._thread.start()
+        return profiler
+
+    def _run(self) -> None:
+        deadline = self.started_at + PROFILE_MAX_SECONDS
+        while not self._stopped.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+
+    def stop(self) -> Dict[str, Any]:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.monotonic() - self.started_at
+        SamplingProfiler._lock.release()
+        return {
+            "duration_ms": int(self.duration * 1000),
+            "interval_ms": self.interval * 1000,
+            "total_samples": sum(self.samples.values()),
+            "collapsed": [f"{stack} {count}" for stack, count in self.samples.most_common(200)],
+        }
+
+
+def wants_profile(headers, query_params) -> bool:
+    return headers.get("x-profile") == "1" or query_params.get("profile") == "1"
+
+
+def store_profile(profile: Dict[str, Any]) -> str:
+    profile_id = uuid.uuid4().hex[:12]
+    get_store().cache_set("profiles", profile_id, profile, PROFILE_TTL_SECONDS)
+    return profile_id
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    return get_store().cache_get("profiles", profile_id)
+
+
+def install(
+    app,
+    watchdog: LoopWatchdog,
+    profiled_paths: List[str],
+    profiling_enabled: bool = False,
+    debug_token: Optional[str] = None,
+) -> None:
+    """Start the watchdog with the app and add the opt-in ``?profile=1`` / ``X-Profile: 1`` hook.
+
+    Profiling only runs when enabled and the request carries the debug token.
+    """
+
+    @app.on_event("startup")
+    async def _start_watchdog():
+        watchdog.start()
+
+    @app.on_event("shutdown")
+    async def _stop_watchdog():
+        await watchdog.stop()
+
+    @app.middleware("http")
+    async def _profile_requests(request, call_next):
+        if (
+            not profiling_enabled
+            or request.url.path not in profiled_paths
+            or not wants_profile(request.headers, request.query_params)
+            or not has_debug_token(request.headers, debug_token)
+        ):
+            return await call_next(request)
+        profiler = SamplingProfiler.try_start(threading.get_ident())
+        if profiler is None:
+            response = await call_next(request)
+            response.headers["X-Profile-Status"] = "busy"
+            return response
+        try:
+            response = await call_next(request)
+        finally:
+            profile = profiler.stop()
+        profile["path"] = request.url.path
+        response.headers["X-Profile-Id"] = await asyncio.to_thread(store_profile, profile)
+        return response
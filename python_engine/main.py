@@ -1,9 +1,15 @@
 import os
 import time
+import heapq
 import asyncio
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+import hashlib
+import itertools
+import uuid
+from datetime import date, datetime
+from typing import List, Optional, Tuple, Callable, Dict, Set
+from fastapi import FastAPI, HTTPException, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
@@ -14,12 +20,37 @@ from python_engine.models import (
     Asset,
     ScanRequest,
     ScanResponse,
+    ScanFilters,
+    ScanAccepted,
+    PushSubscriptionRequest,
     VerifyRequest,
     VerifyResponse,
     DistressSignal,
+    RefreshRequest,
+    RefreshResponse,
+    ListingRefresh,
 )
+from python_engine.admission import AdmissionController, AdmissionRejected, tenant_key, tenant_guard, install as install_admission
+from python_engine.diagnostics import LoopWatchdog, install as install_diagnostics, get_profile, debug_guard
+from python_engine.serialization import parse_fields, asset_records, encode_scan_response, RESPONSE_FORMATS
+from python_engine.scanners.direct_fetch import DirectFetcher, is_listing_url, ESTIMATED_FIELDS
 from python_engine.services.serpapi_client import SerpAPIClient
-from python_engine.services.gemini_verifier import GeminiVerifier
+from python_engine.services.gemini_verifier import GeminiVerifier, VERIFY_PROMPT, is_confirmed
+from python_engine.services.frontier_scheduler import FrontierScheduler, SCHEDULER_LEASE
+from python_engine.services.shared_store import get_store
+from python_engine.services.latency import Deadline
+from python_engine.services.snapshots import SnapshotWriter, SnapshotReader, default_snapshot_writer
+from python_engine.services.metric_history import MetricHistory, default_metric_history
+from python_engine.services.push_delivery import PushDispatcher, is_allowed_callback
+from python_engine.services.owner_enrichment import OwnerEnricher
+from python_engine.services.top_k import TopK
+from python_engine.services.local_index import LocalIndex, default_local_index
+from python_engine.services.distress_classifier import (
+    DistressClassifier,
+    load_default_classifier,
+    CONFIDENCE_THRESHOLD,
+)
+from python_engine.services.scan_results import ScanResultStore, decode_cursor, encode_cursor, filter_records
 
 app = FastAPI(
     title="Asset Hunter Revenue Engine",
@@ -35,13 +66,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Stack-revealing endpoints answer 404 unless this token is configured and sent as X-Debug-Token.
+DEBUG_TOKEN = os.getenv("ENGINE_DEBUG_TOKEN")
+watchdog = LoopWatchdog(threshold=float(os.getenv("ENGINE_LOOP_LAG_THRESHOLD_MS", "200")) / 1000)
+install_diagnostics(
+    app,
+    watchdog,
+    profiled_paths=["/scan", "/verify", "/refresh"],
+    profiling_enabled=os.getenv("ENGINE_PROFILING_ENABLED", "").lower() in ("1", "true", "yes"),
+    debug_token=DEBUG_TOKEN,
+)
+# Installed after diagnostics so it wraps them: profiles measure handling time, not queueing.
+admission = AdmissionController()
+install_admission(app, admission)
+
 serpapi_client: Optional[SerpAPIClient] = None
 gemini_verifier: Optional[GeminiVerifier] = None
+scheduler: Optional[FrontierScheduler] = None
+classifier: Optional[DistressClassifier] = None
+snapshot_writer: Optional[SnapshotWriter] = None
+metric_history: Optional[MetricHistory] = None
+push_dispatcher: Optional[PushDispatcher] = None
+local_index: Optional[LocalIndex] = None
+scan_results = ScanResultStore()
+direct_fetcher = DirectFetcher()
+owner_enricher = (
+    OwnerEnricher(direct_fetcher)
+    if os.getenv("ENGINE_OWNER_ENRICHMENT", "1").lower() in ("1", "true", "yes")
+    else None
+)
+background_scans: set = set()
+# Fire-and-forget work (history updates, startup maintenance) kept referenced until it finishes.
+background_jobs: set = set()
+
+VERIFY_CONCURRENCY = int(os.getenv("ENGINE_VERIFY_CONCURRENCY", "8"))
+# Share of a scan deadline given to search; the rest is left for verification.
+SEARCH_BUDGET_SHARE = 0.6
+# Kept back from the deadline for ranking, encoding and the network hop.
+DEADLINE_MARGIN_SECONDS = 0.1
+# Longest a scan without a deadline waits on one asset's owner lookup.
+ENRICH_TIMEOUT_SECONDS = float(os.getenv("ENGINE_ENRICH_TIMEOUT_SECONDS", "20"))
+# /verify runs the owner lookup alongside Gemini and waits at most this long for it.
+VERIFY_CONTACT_TIMEOUT_SECONDS = float(os.getenv("ENGINE_VERIFY_CONTACT_TIMEOUT_SECONDS", "3"))
+# Search results already verified this recently are served from the local index instead of re-verified.
+INDEX_REUSE_SECONDS = float(os.getenv("ENGINE_INDEX_REUSE_SECONDS", str(24 * 3600)))
+# Only these verdicts are reused in place of verifying again; failed and fallback results are just searchable.
+INDEX_FRESH_SOURCES = ("gemini", "classifier")
+INDEX_BACKFILL_JOB = "index_backfill"
+INDEX_BACKFILL_LEASE_SECONDS = 300
+# Page size of the cursor handed out for a local-first scan's background refresh.
+REFRESH_PAGE_SIZE = 100
 
 
 @app.on_event("startup")
 async def startup():
-    global serpapi_client, gemini_verifier
+    global serpapi_client, gemini_verifier, scheduler, classifier, snapshot_writer, metric_history, push_dispatcher, local_index
+    
+    await asyncio.to_thread(get_store().purge_expired)
     
     try:
         serpapi_client = SerpAPIClient()
@@ -54,6 +135,198 @@ async def startup():
         print("[Engine] Gemini verifier initialized")
     except ValueError as e:
         print(f"[Engine] Warning: Gemini not available - {e}")
+    
+    snapshot_writer = default_snapshot_writer()
+    if snapshot_writer:
+        print(f"[Engine] Writing asset snapshots to {snapshot_writer.root}")
+    
+    metric_history = default_metric_history()
+    if metric_history:
+        print(f"[Engine] Recording asset metric history to {metric_history.root}")
+    
+    local_index = default_local_index()
+    if local_index:
+        print(f"[Engine] Local search index at {local_index.path}")
+    
+    if snapshot_writer:
+        _run_in_background(_maintain_snapshots, "Snapshot maintenance")
+    
+    push_dispatcher = PushDispatcher(prepare=_prepare_push)
+    push_dispatcher.start()
+    
+    classifier = load_default_classifier()
+    if classifier:
+        print(f"[Engine] Local distress classifier loaded (confidence threshold {CONFIDENCE_THRESHOLD})")
+    
+    if gemini_verifier and os.getenv("ENGINE_PRELOAD_SDKS", "1").lower() in ("1", "true", "yes"):
+        # Warm the SDK off the event loop so /health and /marketplaces answer immediately.
+        asyncio.get_running_loop().run_in_executor(None, lambda: gemini_verifier.client)
+    
+    if serpapi_client and os.getenv("ENGINE_SCHEDULER_ENABLED", "").lower() in ("1", "true", "yes"):
+        scheduler = FrontierScheduler(
+            scan_fn=_scheduled_search,
+            verify_fn=_build_enriched_asset if gemini_verifier else None,
+            budget_per_hour=float(os.getenv("ENGINE_SCHEDULER_BUDGET_PER_HOUR", "1.0")),
+            record_path=os.getenv("ENGINE_SCHEDULER_RECORD_PATH"),
+            store=get_store(),
+            on_verified=_publish_verified,
+        )
+        for query in os.getenv("ENGINE_SCHEDULER_QUERIES", "").split(","):
+            if query.strip():
+                scheduler.add(query.strip(), list(Marketplace))
+        scheduler.start(tick_seconds=float(os.getenv("ENGINE_SCHEDULER_TICK_SECONDS", "30")))
+        print(f"[Engine] Frontier scheduler started with {len(scheduler.entries)} entries")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if scheduler:
+        await scheduler.stop()
+    for task in list(background_scans) + list(background_jobs):
+        task.cancel()
+    if push_dispatcher:
+        await push_dispatcher.stop()
+    await direct_fetcher.close()
+
+
+def _spawn(coro, label: str) -> None:
+    """Run ``coro`` without awaiting it, keeping a reference and logging failures."""
+    task = asyncio.create_task(coro)
+    background_jobs.add(task)
+
+    def done(t):
+        background_jobs.discard(t)
+        if not t.cancelled() and t.exception():
+            print(f"[Engine] {label} failed: {t.exception()}")
+
+    task.add_done_callback(done)
+
+
+def _run_in_background(fn, label: str) -> None:
+    """Run a blocking job on a worker thread, keeping its task so failures are logged."""
+    _spawn(asyncio.to_thread(fn), label)
+
+
+TREND_SIGNALS = (DistressSignal.NO_UPDATES, DistressSignal.DECLINING_REVIEWS)
+
+
+def _apply_trend_signals(assets: List[Asset]) -> None:
+    """Settle trend signals from each asset's recorded history wherever there is enough of it."""
+    decisions = metric_history.trend_signals([a.id for a in assets])
+    for asset in assets:
+        decided = decisions.get(asset.id)
+        if not decided:
+            continue
+        signals = [s for s in asset.distress_signals if s not in decided]
+        signals.extend(s for s, present in decided.items() if present)
+        asset.distress_signals = signals
+        if gemini_verifier:
+            asset.distress_score = gemini_verifier.calculate_distress_score(signals)
+            if asset.estimated_mrr is not None:
+                asset.estimated_valuation = gemini_verifier.calculate_valuation(asset.estimated_mrr, asset.distress_score)
+
+
+HISTORY_FIELDS = {"users", "reviews_count", "rating", "last_updated"}
+
+
+def _measured_fields(marketplace: Marketplace) -> Set[str]:
+    """History fields the marketplace's listing parser reads off the page rather than estimates."""
+    return HISTORY_FIELDS - ESTIMATED_FIELDS.get(marketplace, set())
+
+
+async def _observe_listings(assets: List[Asset]) -> None:
+    """Record metrics read off each asset's listing page.
+
+    Scan results carry model estimates (and a flat fallback for users), so
+    the history only takes what the direct fetcher actually measured.
+    """
+    targets = [(a.url, a.marketplace) for a in assets if is_listing_url(a.url, a.marketplace)]
+    if not targets:
+        return
+    results = await direct_fetcher.fetch_many(targets)
+    observations = [
+        {"id": _asset_id(url), **{k: v for k, v in result["data"].items() if k in _measured_fields(marketplace)}}
+        for (url, marketplace), result in zip(targets, results)
+        if result["status"] != "error" and result["data"]
+    ]
+    await asyncio.to_thread(metric_history.record, observations)
+
+
+def _maintain_snapshots() -> None:
+    # Fold up partitions written before tiered compaction existed, then index what they hold.
+    snapshot_writer.compact()
+    if local_index:
+        _backfill_index()
+
+
+def _backfill_index() -> None:
+    """Seed the index from the snapshot history so assets scanned before it existed are searchable.
+
+    One worker does this under a shared-store lease. Snapshots are read
+    newest day first in record batches, and an asset already indexed (by
+    a live scan or a newer day) is never replaced. The job is marked done
+    only at the end, so an interrupted backfill resumes on the next start.
+    """
+    store = get_store()
+    job = store.get_job(INDEX_BACKFILL_JOB)
+    if job and job["status"] == "done" and local_index.stats()["assets"]:
+        return
+    owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    if not store.acquire_lease(INDEX_BACKFILL_JOB, owner, INDEX_BACKFILL_LEASE_SECONDS):
+        return
+    try:
+        written = 0
+        for batch in SnapshotReader(snapshot_writer.root).batches():
+            rows = batch.to_pylist()
+            for row in rows:
+                row.pop("scan_date", None)
+            # Snapshot records are searchable but too old to stand in for a fresh verification.
+            written += local_index.add((Asset(**row) for row in rows), fresh=False, replace=False)
+            store.acquire_lease(INDEX_BACKFILL_JOB, owner, INDEX_BACKFILL_LEASE_SECONDS)
+        store.put_job(INDEX_BACKFILL_JOB, "done", {"indexed": written})
+        print(f"[Engine] Indexed {written} assets from snapshots")
+    finally:
+        store.release_lease(INDEX_BACKFILL_JOB, owner)
+
+
+async def _prepare_push(assets: List[Asset]) -> None:
+    if metric_history:
+        await asyncio.to_thread(_apply_trend_signals, assets)
+
+
+def _index_assets(assets: List[Asset]) -> None:
+    checked = [a for a in assets if a.verified_by in INDEX_FRESH_SOURCES]
+    unchecked = [a for a in assets if a.verified_by not in INDEX_FRESH_SOURCES]
+    if checked:
+        local_index.add(checked)
+    if unchecked:
+        # Searchable, but never reused, and never in place of an earlier verified record.
+        local_index.add(unchecked, fresh=False, replace=False)
+
+
+async def _publish_verified(assets: List[Asset]) -> None:
+    if metric_history and assets:
+        try:
+            await asyncio.to_thread(_apply_trend_signals, assets)
+        except Exception as e:
+            print(f"[Engine] History lookup failed: {e}")
+        _spawn(_observe_listings(assets), "History update")
+    if snapshot_writer:
+        try:
+            await asyncio.to_thread(snapshot_writer.append, assets)
+        except Exception as e:
+            print(f"[Engine] Snapshot write failed: {e}")
+    if local_index and assets:
+        try:
+            await asyncio.to_thread(_index_assets, assets)
+        except Exception as e:
+            print(f"[Engine] Index update failed: {e}")
+    if push_dispatcher and assets:
+        await push_dispatcher.publish(assets)
+
+
+async def _scheduled_search(query: str, marketplace: Marketplace) -> List[dict]:
+    return await asyncio.to_thread(serpapi_client.search_marketplace, query, marketplace)
 
 
 @app.get("/health")
@@ -62,71 +335,539 @@ async def health_check():
         "status": "healthy",
         "serpapi_available": serpapi_client is not None,
         "gemini_available": gemini_verifier is not None,
+        "classifier_loaded": classifier is not None,
     }
 
 
-@app.post("/scan", response_model=ScanResponse)
-async def scan_marketplaces(request: ScanRequest):
-    if not serpapi_client:
-        raise HTTPException(status_code=503, detail="SerpAPI client not configured")
+async def _verify(raw_result: dict) -> dict:
+    if classifier:
+        prediction = classifier.predict(raw_result)
+        # Only assets the local model is unsure about are worth a Gemini call.
+        if prediction["confidence"] >= CONFIDENCE_THRESHOLD:
+            return prediction
+    return await gemini_verifier.verify_asset(raw_result)
+
+
+async def _build_asset(raw_result: dict, min_users: int = 0) -> Optional[Asset]:
+    if gemini_verifier:
+        try:
+            verification = await _verify(raw_result)
+            asset = gemini_verifier.enrich_asset(raw_result, verification)
+            
+            if asset.users >= min_users:
+                return asset
+            return None
+        except Exception as e:
+            print(f"[Engine] Verification failed for {raw_result.get('title')}: {e}")
+            marketplace = Marketplace(raw_result.get("marketplace", "chrome"))
+            asset_id = hashlib.md5(raw_result.get("url", "").encode()).hexdigest()[:12]
+            return Asset(
+                id=asset_id,
+                name=raw_result.get("title", "Unknown"),
+                description=raw_result.get("snippet", ""),
+                url=raw_result.get("url", ""),
+                marketplace=marketplace,
+                users=5000,
+                estimated_mrr=gemini_verifier.estimate_mrr(marketplace, 5000),
+            )
     
-    start_time = time.time()
+    return _build_fallback(raw_result)
+
+
+async def _enrich_owner(asset: Optional[Asset], deadline: Optional[Deadline] = None) -> Optional[Asset]:
+    if asset and owner_enricher:
+        # Finish before _build_assets stops waiting, so a slow lookup never costs the asset its verification.
+        timeout = deadline.remaining() - 2 * DEADLINE_MARGIN_SECONDS if deadline else ENRICH_TIMEOUT_SECONDS
+        try:
+            await owner_enricher.enrich([asset], timeout=max(0.0, timeout))
+        except Exception as e:
+            print(f"[Engine] Owner enrichment failed for {asset.url}: {e}")
+    return asset
+
+
+async def _build_enriched_asset(raw_result: dict, min_users: int = 0) -> Optional[Asset]:
+    return await _enrich_owner(await _build_asset(raw_result, min_users))
+
+
+def _asset_id(url: str) -> str:
+    return hashlib.md5(url.encode()).hexdigest()[:12]
+
+
+def _build_fallback(raw_result: dict) -> Asset:
+    marketplace = Marketplace(raw_result.get("marketplace", "chrome"))
+    return Asset(
+        id=_asset_id(raw_result.get("url", "")),
+        name=raw_result.get("title", "Unknown"),
+        description=raw_result.get("snippet", ""),
+        url=raw_result.get("url", ""),
+        marketplace=marketplace,
+        users=5000,
+    )
+
+
+def _heuristic_asset(raw_result: dict, min_users: int = 0) -> Optional[Asset]:
+    if classifier:
+        verification = classifier.predict(raw_result)
+    else:
+        verification = gemini_verifier.heuristic_verification(raw_result)
+    asset = gemini_verifier.enrich_asset(raw_result, verification)
+    return asset if asset.users >= min_users else None
+
+
+async def _build_assets(
+    raw_results: List[dict],
+    min_users: int,
+    deadline: Optional[Deadline] = None,
+    on_asset: Optional[Callable[[Asset], None]] = None,
+) -> Tuple[List[Asset], List[Asset]]:
+    """Verify results concurrently; returns (verified, heuristic) assets.
+
+    Whatever cannot be verified before the deadline is estimated locally
+    instead. ``on_asset`` sees each verified asset as soon as it is ready.
+    """
+    if not gemini_verifier:
+        assets = [_build_fallback(r) for r in raw_results]
+        if on_asset:
+            for asset in assets:
+                on_asset(asset)
+        return assets, []
+    
+    if deadline and deadline.remaining() < gemini_verifier.latency.estimate(0.5) + DEADLINE_MARGIN_SECONDS:
+        # Not even a typical Gemini call fits; don't start any.
+        return [], [a for a in (_heuristic_asset(r, min_users) for r in raw_results) if a]
+    
+    limit = asyncio.Semaphore(VERIFY_CONCURRENCY)
+    
+    async def build(raw_result: dict) -> Optional[Asset]:
+        async with limit:
+            asset = await _build_asset(raw_result, min_users)
+        # Outside the verification slot: the enricher bounds its own fetches.
+        await _enrich_owner(asset, deadline)
+        if asset and on_asset:
+            on_asset(asset)
+        return asset
+    
+    tasks = [asyncio.create_task(build(r)) for r in raw_results]
+    pending = set()
+    if tasks:
+        timeout = max(0.0, deadline.remaining() - DEADLINE_MARGIN_SECONDS) if deadline else None
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+    
+    verified: List[Asset] = []
+    heuristic: List[Asset] = []
+    for raw_result, task in zip(raw_results, tasks):
+        if task in pending:
+            asset = _heuristic_asset(raw_result, min_users)
+            if asset:
+                heuristic.append(asset)
+        elif task.result():
+            verified.append(task.result())
+    return verified, heuristic
+
+
+async def _search_top_k(
+    request: ScanRequest,
+    marketplaces: List[Marketplace],
+    deadline: Optional[Deadline] = None,
+) -> Tuple[List[Asset], List[Asset], int]:
+    """Search and verify only until nothing left is estimated to displace the best ``request.top_k``.
+
+    Results are verified best estimate first as searches return them. Returns
+    (top assets, every asset verified along the way, candidates pruned).
+    """
+    top = TopK(request.top_k, gemini_verifier)
+    filters = ScanFilters(**request.model_dump(include=set(ScanFilters.model_fields)))
+    finished = False
+    
+    def worth(estimate: float) -> bool:
+        if filters.min_valuation is not None and estimate < filters.min_valuation:
+            return False
+        return top.can_beat(estimate)
+    
+    loop = asyncio.get_running_loop()
+    arrived = asyncio.Event()
+    arrivals: List[dict] = []
     
+    def receive(results: List[dict]) -> None:
+        arrivals.extend(results)
+        arrived.set()
+    
+    search = asyncio.ensure_future(asyncio.to_thread(
+        serpapi_client.search_all_marketplaces,
+        query=request.query,
+        marketplaces=marketplaces,
+        max_results_per_marketplace=request.max_results_per_marketplace,
+        deadline=deadline,
+        on_results=lambda results: loop.call_soon_threadsafe(receive, results),
+        should_stop=lambda plan: finished or not any(worth(top.search_estimate(m)) for m in plan),
+    ))
+    
+    candidates: List[Tuple[float, int, dict]] = []
+    order = itertools.count()
+    seen_urls = set()
+    running: Dict[asyncio.Task, float] = {}
+    verified: List[Asset] = []
+    pruned = 0
+    try:
+        while True:
+            arrived.clear()
+            for raw_result in arrivals:
+                if raw_result["url"] not in seen_urls:
+                    seen_urls.add(raw_result["url"])
+                    heapq.heappush(candidates, (-top.estimate(raw_result), next(order), raw_result))
+            arrivals.clear()
+            
+            for task, estimate in list(running.items()):
+                if not worth(estimate):
+                    task.cancel()
+                    del running[task]
+                    pruned += 1
+            while candidates and len(running) < VERIFY_CONCURRENCY:
+                estimate = -candidates[0][0]
+                if not worth(estimate):
+                    # Candidates pop best estimate first, so none of the rest can place either.
+                    pruned += len(candidates)
+                    candidates.clear()
+                    break
+                raw_result = heapq.heappop(candidates)[2]
+                running[asyncio.create_task(_build_asset(raw_result, request.min_users))] = estimate
+            
+            if search.done() and not arrivals and not running:
+                search.result()
+                break
+            
+            waiting = set(running) | {asyncio.ensure_future(arrived.wait())}
+            if not search.done():
+                waiting.add(search)
+            timeout = max(0.0, deadline.remaining() - DEADLINE_MARGIN_SECONDS) if deadline else None
+            done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in waiting - done:
+                if task not in running and task is not search:
+                    task.cancel()
+            if not done:
+                # Out of time: keep what has been verified so far.
+                pruned += len(running) + len(candidates)
+                break
+            
+            for task in done:
+                if task not in running:
+                    continue
+                del running[task]
+                try:
+                    asset = task.result()
+                except Exception as e:
+                    print(f"[Engine] Top-k verification failed: {e}")
+                    continue
+                if asset:
+                    verified.append(asset)
+                    if filter_records(asset_records([asset]), filters):
+                        top.offer(asset)
+    finally:
+        finished = True
+        for task in running:
+            task.cancel()
+    
+    return top.results(), verified, pruned
+
+
+def _scan_deadline(request: ScanRequest, http_request: Request) -> Optional[Deadline]:
+    """The scan's budget, counted from when admission first saw the request."""
+    if not request.deadline_ms:
+        return None
+    return Deadline(request.deadline_ms / 1000, started_at=getattr(http_request.state, "arrived_at", None))
+
+
+async def _run_scan(
+    request: ScanRequest,
+    deadline: Optional[Deadline] = None,
+    on_asset: Optional[Callable[[Asset], None]] = None,
+) -> Tuple[List[Asset], int, List[Marketplace], List[Marketplace], int]:
+    """Search, verify and publish one scan; returns (assets, heuristic count, scanned, skipped, pruned)."""
     marketplaces_to_scan = request.marketplaces or list(Marketplace)
     
-    raw_results = serpapi_client.search_all_marketplaces(
+    if scheduler:
+        await scheduler.request(request.query, marketplaces_to_scan)
+    
+    skipped: List[Marketplace] = []
+    if deadline:
+        marketplaces_to_scan, skipped = await asyncio.to_thread(
+            serpapi_client.fit_to_deadline,
+            request.query,
+            marketplaces_to_scan,
+            request.max_results_per_marketplace,
+            deadline.remaining() * SEARCH_BUDGET_SHARE,
+        )
+    
+    if request.top_k and gemini_verifier:
+        assets, verified, pruned = await _search_top_k(request, marketplaces_to_scan, deadline)
+        # Contacts are only looked up for the winners; everything verified still goes into history.
+        await asyncio.gather(*(_enrich_owner(a, deadline) for a in assets))
+        await _publish_verified(verified)
+        if on_asset:
+            for asset in assets:
+                on_asset(asset)
+        return assets, 0, marketplaces_to_scan, skipped, pruned
+    
+    raw_results = await asyncio.to_thread(
+        serpapi_client.search_all_marketplaces,
         query=request.query,
         marketplaces=marketplaces_to_scan,
         max_results_per_marketplace=request.max_results_per_marketplace,
+        deadline=deadline,
     )
     
-    assets: List[Asset] = []
+    reused: List[Asset] = []
+    if local_index and raw_results:
+        known = await asyncio.to_thread(
+            local_index.fresh, [_asset_id(r.get("url", "")) for r in raw_results], INDEX_REUSE_SECONDS
+        )
+        reused = [a for a in known.values() if a.users >= request.min_users]
+        raw_results = [r for r in raw_results if _asset_id(r.get("url", "")) not in known]
     
-    for raw_result in raw_results:
-        if gemini_verifier:
-            try:
-                verification = await gemini_verifier.verify_asset(raw_result)
-                asset = gemini_verifier.enrich_asset(raw_result, verification)
-                
-                if asset.users >= request.min_users:
-                    assets.append(asset)
-            except Exception as e:
-                print(f"[Engine] Verification failed for {raw_result.get('title')}: {e}")
-                import hashlib
-                marketplace = Marketplace(raw_result.get("marketplace", "chrome"))
-                asset_id = hashlib.md5(raw_result.get("url", "").encode()).hexdigest()[:12]
-                assets.append(Asset(
-                    id=asset_id,
-                    name=raw_result.get("title", "Unknown"),
-                    description=raw_result.get("snippet", ""),
-                    url=raw_result.get("url", ""),
-                    marketplace=marketplace,
-                    users=5000,
-                    estimated_mrr=gemini_verifier.estimate_mrr(marketplace, 5000),
-                ))
-        else:
-            import hashlib
-            marketplace = Marketplace(raw_result.get("marketplace", "chrome"))
-            asset_id = hashlib.md5(raw_result.get("url", "").encode()).hexdigest()[:12]
-            assets.append(Asset(
-                id=asset_id,
-                name=raw_result.get("title", "Unknown"),
-                description=raw_result.get("snippet", ""),
-                url=raw_result.get("url", ""),
-                marketplace=marketplace,
-                users=5000,
-            ))
+    assets, heuristic = await _build_assets(raw_results, request.min_users, deadline, on_asset)
+    
+    # Heuristic estimates are returned to the caller but kept out of the snapshot history.
+    await _publish_verified(assets)
+    if metric_history and heuristic:
+        await asyncio.to_thread(_apply_trend_signals, heuristic)
+    if on_asset:
+        for asset in reused + heuristic:
+            on_asset(asset)
+    
+    return assets + reused + heuristic, len(heuristic), marketplaces_to_scan, skipped, 0
+
+
+def _scan_job_id(scan_id: str) -> str:
+    return f"scan:{scan_id}"
+
+
+def _check_callback(callback_url: str) -> None:
+    # Pushed batches are signed; an arbitrary URL would let any caller collect them.
+    if not is_allowed_callback(callback_url):
+        raise HTTPException(status_code=400, detail="callback_url must be https to a host in ENGINE_CALLBACK_HOSTS")
+
+
+async def _background_scan(request: ScanRequest, scan_id: str, tenant: str, deadline: Optional[Deadline]) -> None:
+    """Run a scan after its request has returned, pushing to ``callback_url`` if one was given.
+
+    Progress is kept as a job in the shared store so any worker can tell
+    a scan still running from one whose results have expired.
+    """
+    destination = _scan_job_id(scan_id)
+    callback_url = request.callback_url
+    start_time = time.time()
+    store = get_store()
+    try:
+        # The request that started this scan has already returned, so the scan takes its own bulk slot.
+        await admission.acquire("bulk", tenant, timeout=deadline.remaining() if deadline else None)
+    except AdmissionRejected as e:
+        await asyncio.to_thread(store.put_job, destination, "failed", {"error": e.reason})
+        if callback_url:
+            push_dispatcher.finish(destination, callback_url, {"error": e.reason})
+        return
+    
+    started = time.monotonic()
+    await asyncio.to_thread(store.put_job, destination, "running", {})
+    try:
+        assets, heuristic_count, scanned, skipped, pruned = await _run_scan(
+            request,
+            deadline,
+            on_asset=(lambda asset: push_dispatcher.enqueue(destination, callback_url, [asset])) if callback_url else None,
+        )
+        filters = ScanFilters(**request.model_dump(include=set(ScanFilters.model_fields)))
+        await asyncio.to_thread(scan_results.save, scan_id, asset_records(assets), len(scanned))
+        summary = {
+            "total_found": len(assets),
+            "marketplaces_scanned": len(scanned),
+            "scan_duration_ms": int((time.time() - start_time) * 1000),
+            "skipped_marketplaces": [m.value for m in skipped],
+            "heuristic_assets": heuristic_count,
+            "pruned_candidates": pruned,
+            "exact": False if request.top_k else None,
+            # Pushed batches carry every asset found; this cursor pages the filtered, sorted view.
+            "cursor": encode_cursor(scan_id, 0, request.page_size or len(assets) or 1, filters),
+        }
+        await asyncio.to_thread(store.put_job, destination, "done", summary)
+        if callback_url:
+            push_dispatcher.finish(destination, callback_url, summary)
+    except Exception as e:
+        print(f"[Engine] Background scan {scan_id} failed: {e}")
+        await asyncio.to_thread(store.put_job, destination, "failed", {"error": str(e)})
+        if callback_url:
+            push_dispatcher.finish(destination, callback_url, {"error": str(e)})
+    finally:
+        admission.release("bulk", time.monotonic() - started)
+
+
+async def _start_background_scan(request: ScanRequest, http_request: Request) -> str:
+    scan_id = scan_results.new_scan_id()
+    await asyncio.to_thread(get_store().put_job, _scan_job_id(scan_id), "queued", {})
+    task = asyncio.create_task(
+        _background_scan(request, scan_id, tenant_key(http_request), _scan_deadline(request, http_request))
+    )
+    background_scans.add(task)
+    task.add_done_callback(background_scans.discard)
+    return scan_id
+
+
+async def _local_first_scan(
+    request: ScanRequest,
+    http_request: Request,
+    selected_fields,
+    response_format: str,
+):
+    """Answer from the local index, or None when it has nothing for this query."""
+    start_time = time.time()
+    matches = await asyncio.to_thread(local_index.search, request.query, request.marketplaces)
+    matches = [a for a in matches if a.users >= request.min_users]
+    if not matches:
+        return None
+    
+    refresh_id = await _start_background_scan(request, http_request)
+    records = asset_records(matches)
+    filters = ScanFilters(**request.model_dump(include=set(ScanFilters.model_fields)))
+    scan_id = scan_results.new_scan_id()
+    page, total_found, next_cursor = scan_results.page(scan_id, records, filters, 0, request.page_size)
+    if next_cursor:
+        await asyncio.to_thread(scan_results.save, scan_id, records, len({a.marketplace for a in matches}))
+    
+    return encode_scan_response(
+        page,
+        meta={
+            "total_found": total_found,
+            "marketplaces_scanned": 0,
+            "scan_duration_ms": int((time.time() - start_time) * 1000),
+            "cached": True,
+            "scan_id": scan_id,
+            "next_cursor": next_cursor,
+            "local_matches": len(matches),
+            "refresh_scan_id": refresh_id,
+            "refresh_cursor": encode_cursor(refresh_id, 0, request.page_size or REFRESH_PAGE_SIZE, filters),
+        },
+        fields=selected_fields,
+        response_format=response_format,
+    )
+
+
+@app.post("/scan", response_model=ScanResponse, responses={202: {"model": ScanAccepted}})
+async def scan_marketplaces(
+    request: ScanRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    response_format: str = Query("rows", alias="format"),
+):
+    if not serpapi_client:
+        raise HTTPException(status_code=503, detail="SerpAPI client not configured")
+    
+    try:
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    if request.top_k and not gemini_verifier:
+        # Ranking needs verified valuations; answering with an untrimmed heuristic scan would hide that.
+        raise HTTPException(status_code=400, detail="top_k needs the Gemini verifier, which is not configured")
+    if request.callback_url:
+        _check_callback(request.callback_url)
+    
+    if request.local_first and local_index and request.query:
+        answer = await _local_first_scan(request, http_request, selected_fields, response_format)
+        if answer is not None:
+            return answer
+    
+    if request.callback_url:
+        scan_id = await _start_background_scan(request, http_request)
+        return JSONResponse(status_code=202, content=ScanAccepted(scan_id=scan_id).model_dump())
+    
+    start_time = time.time()
+    
+    assets, heuristic_count, marketplaces_scanned, skipped, pruned = await _run_scan(
+        request, _scan_deadline(request, http_request)
+    )
+    
+    records = asset_records(assets)
+    filters = ScanFilters(**request.model_dump(include=set(ScanFilters.model_fields)))
+    scan_id = scan_results.new_scan_id()
+    page, total_found, next_cursor = scan_results.page(scan_id, records, filters, 0, request.page_size)
+    if next_cursor:
+        await asyncio.to_thread(scan_results.save, scan_id, records, len(marketplaces_scanned))
     
     scan_duration_ms = int((time.time() - start_time) * 1000)
     
-    return ScanResponse(
-        assets=assets,
-        total_found=len(assets),
-        marketplaces_scanned=len(marketplaces_to_scan),
-        scan_duration_ms=scan_duration_ms,
+    return encode_scan_response(
+        page,
+        meta={
+            "total_found": total_found,
+            "marketplaces_scanned": len(marketplaces_scanned),
+            "scan_duration_ms": scan_duration_ms,
+            "cached": False,
+            "scan_id": scan_id,
+            "next_cursor": next_cursor,
+            "skipped_marketplaces": [m.value for m in skipped],
+            "heuristic_assets": heuristic_count,
+            "pruned_candidates": pruned,
+            "exact": False if request.top_k else None,
+        },
+        fields=selected_fields,
+        response_format=response_format,
     )
 
 
+@app.get("/scan/page", response_model=ScanResponse, responses={202: {"model": ScanAccepted}})
+async def scan_page(
+    cursor: str,
+    fields: Optional[str] = None,
+    response_format: str = Query("rows", alias="format"),
+):
+    try:
+        scan_id, offset, page_size, filters = decode_cursor(cursor)
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    
+    stored = await asyncio.to_thread(scan_results.load, scan_id)
+    if stored is None:
+        job = await asyncio.to_thread(get_store().get_job, _scan_job_id(scan_id))
+        if job and job["status"] in ("queued", "running"):
+            return JSONResponse(status_code=202, content=ScanAccepted(scan_id=scan_id, status=job["status"]).model_dump())
+        raise HTTPException(status_code=404, detail="Scan results expired; run the scan again")
+    
+    start_time = time.time()
+    page, total_found, next_cursor = scan_results.page(scan_id, stored["records"], filters, offset, page_size)
+    
+    return encode_scan_response(
+        page,
+        meta={
+            "total_found": total_found,
+            "marketplaces_scanned": stored["marketplaces_scanned"],
+            "scan_duration_ms": int((time.time() - start_time) * 1000),
+            "cached": True,
+            "scan_id": scan_id,
+            "next_cursor": next_cursor,
+        },
+        fields=selected_fields,
+        response_format=response_format,
+    )
+
+
+async def _owner_contact(request: VerifyRequest) -> Optional[str]:
+    if not owner_enricher:
+        return None
+    probe = Asset(id=request.asset_id, name="", url=request.asset_url, marketplace=request.marketplace)
+    try:
+        # The lookup itself is shared and keeps filling the cache after we stop waiting.
+        contact = await asyncio.wait_for(owner_enricher.contact_for(probe), VERIFY_CONTACT_TIMEOUT_SECONDS)
+    except Exception as e:
+        print(f"[Engine] Owner lookup failed for {request.asset_url}: {e}")
+        return None
+    return contact.get("email") or contact.get("website")
+
+
 @app.post("/verify", response_model=VerifyResponse)
 async def verify_asset(request: VerifyRequest):
     if not gemini_verifier:
@@ -139,6 +880,7 @@ async def verify_asset(request: VerifyRequest):
         "marketplace": request.marketplace.value,
     }
     
+    contact_task = asyncio.create_task(_owner_contact(request))
     verification = await gemini_verifier.verify_asset(raw_data)
     
     distress_signals = []
@@ -156,16 +898,179 @@ async def verify_asset(request: VerifyRequest):
     
     return VerifyResponse(
         asset_id=request.asset_id,
-        verified=verification.get("is_valid_asset", False),
+        verified=is_confirmed(verification),
+        verified_by=verification.get("verified_by"),
         distress_score=distress_score,
         distress_signals=distress_signals,
         estimated_mrr=mrr,
         estimated_valuation=valuation,
-        owner_contact=None,
+        owner_contact=await contact_task,
         verification_notes=verification.get("verification_notes", ""),
     )
 
 
+@app.post("/refresh", response_model=RefreshResponse)
+async def refresh_listings(request: RefreshRequest):
+    start_time = time.time()
+    
+    invalid = [l.url for l in request.listings if not is_listing_url(l.url, l.marketplace)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Not marketplace listing URLs: {', '.join(invalid[:5])}")
+    
+    results = await direct_fetcher.fetch_many([(l.url, l.marketplace) for l in request.listings])
+    
+    listings = []
+    for listing, result in zip(request.listings, results):
+        data = result["data"] or {}
+        listings.append(ListingRefresh(
+            url=listing.url,
+            marketplace=listing.marketplace,
+            status=result["status"],
+            users=data.get("users"),
+            rating=data.get("rating"),
+            reviews_count=data.get("reviews_count"),
+            last_updated=data.get("last_updated"),
+        ))
+    
+    if metric_history:
+        observations = [
+            {"id": _asset_id(l.url), **l.model_dump(include=_measured_fields(l.marketplace))}
+            for l in listings
+            if l.status != "error"
+        ]
+        await asyncio.to_thread(metric_history.record, observations)
+    
+    return RefreshResponse(
+        listings=listings,
+        fetched=sum(1 for r in results if r["status"] == "modified"),
+        not_modified=sum(1 for r in results if r["status"] == "not_modified"),
+        errors=sum(1 for r in results if r["status"] == "error"),
+        refresh_duration_ms=int((time.time() - start_time) * 1000),
+    )
+
+
+@app.post("/subscriptions", dependencies=[Depends(tenant_guard())])
+async def create_subscription(request: PushSubscriptionRequest):
+    _check_callback(request.callback_url)
+    # Newly verified assets matching the filters are pushed from every scan and scheduler run.
+    return await asyncio.to_thread(
+        push_dispatcher.subscribe,
+        request.callback_url,
+        marketplaces=[m.value for m in request.marketplaces],
+        min_distress_score=request.min_distress_score,
+        min_valuation=request.min_valuation,
+    )
+
+
+@app.get("/subscriptions", dependencies=[Depends(tenant_guard())])
+async def list_subscriptions():
+    subscriptions = await asyncio.to_thread(push_dispatcher.subscriptions)
+    return {"subscriptions": subscriptions, "delivery": push_dispatcher.snapshot()}
+
+
+@app.delete("/subscriptions/{subscription_id}", dependencies=[Depends(tenant_guard())])
+async def delete_subscription(subscription_id: str):
+    if not await asyncio.to_thread(push_dispatcher.unsubscribe, subscription_id):
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    return {"deleted": subscription_id}
+
+
+@app.get("/scheduler")
+async def scheduler_status():
+    if not scheduler:
+        raise HTTPException(status_code=503, detail="Frontier scheduler not enabled")
+    
+    # With several workers only the lease holder scans; it publishes its state to the shared store.
+    job = await asyncio.to_thread(get_store().get_job, SCHEDULER_LEASE)
+    if job:
+        return job["payload"]
+    return scheduler.snapshot()
+
+
+@app.get("/snapshots/summary")
+async def snapshot_summary(
+    marketplace: Optional[List[str]] = Query(None),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    min_distress_score: Optional[int] = None,
+):
+    if not snapshot_writer:
+        raise HTTPException(status_code=503, detail="Snapshots not enabled")
+    
+    reader = SnapshotReader(snapshot_writer.root)
+    summary = await asyncio.to_thread(
+        reader.summary,
+        marketplaces=marketplace,
+        since=since,
+        until=until,
+        min_distress_score=min_distress_score,
+    )
+    return {"marketplaces": summary}
+
+
+@app.get("/assets/{asset_id}/history")
+async def asset_history(asset_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    if not metric_history:
+        raise HTTPException(status_code=503, detail="Metric history not enabled")
+    
+    observations = await asyncio.to_thread(metric_history.history, asset_id, since, until)
+    decisions = await asyncio.to_thread(metric_history.trend_signals, [asset_id])
+    return {
+        "asset_id": asset_id,
+        "observations": observations,
+        # Only signals the history can settle are listed; true means the signal applies.
+        "trend_signals": {s.value: present for s, present in decisions.get(asset_id, {}).items()},
+    }
+
+
+@app.get("/history/stats")
+async def history_stats():
+    if not metric_history:
+        raise HTTPException(status_code=503, detail="Metric history not enabled")
+    return await asyncio.to_thread(metric_history.stats)
+
+
+@app.get("/debug/loop", dependencies=[Depends(debug_guard(DEBUG_TOKEN))])
+async def loop_stats():
+    return watchdog.stats()
+
+
+@app.get("/debug/admission")
+async def admission_stats():
+    return admission.stats()
+
+
+@app.get("/debug/latency")
+async def upstream_latency():
+    return {
+        "serpapi": serpapi_client.latency.stats() if serpapi_client else None,
+        "gemini": gemini_verifier.latency.stats() if gemini_verifier else None,
+        "gemini_tokens": VERIFY_PROMPT.stats(),
+    }
+
+
+@app.get("/debug/enrichment")
+async def enrichment_stats():
+    if not owner_enricher:
+        raise HTTPException(status_code=503, detail="Owner enrichment disabled")
+    return owner_enricher.snapshot()
+
+
+@app.get("/debug/index")
+async def index_stats():
+    if not local_index:
+        raise HTTPException(status_code=503, detail="Local index disabled")
+    return await asyncio.to_thread(local_index.stats)
+
+
+@app.get("/debug/profile/{profile_id}", dependencies=[Depends(debug_guard(DEBUG_TOKEN))])
+async def request_profile(profile_id: str):
+    profile = await asyncio.to_thread(get_profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
 @app.get("/marketplaces")
 async def list_marketplaces():
     return {
@@ -176,4 +1081,10 @@ async def list_marketplaces():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    workers = int(os.getenv("ENGINE_WORKERS", "1"))
+    if workers > 1:
+        # Workers share caches, rate limits and job state through ENGINE_STATE_DB.
+        uvicorn.run("python_engine.main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -46,15 +46,45 @@ class Asset(BaseModel):
     distress_signals: List[DistressSignal] = Field(default_factory=list)
     distress_score: int = 0
     verified: bool = False
+    # What assessed the asset: "gemini", "classifier" or "heuristic". Only a Gemini check sets verified.
+    verified_by: Optional[str] = None
     verification_notes: Optional[str] = None
     scraped_at: datetime = Field(default_factory=datetime.utcnow)
 
 
-class ScanRequest(BaseModel):
+class SortField(str, Enum):
+    ESTIMATED_VALUATION = "estimated_valuation"
+    DISTRESS_SCORE = "distress_score"
+    USERS = "users"
+    ESTIMATED_MRR = "estimated_mrr"
+
+
+class ScanFilters(BaseModel):
+    marketplaces: List[Marketplace] = Field(default_factory=list)
+    min_users: int = 0
+    min_distress_score: int = 0
+    min_valuation: Optional[float] = None
+    max_valuation: Optional[float] = None
+    verified_only: bool = False
+    sort_by: Optional[SortField] = None
+    sort_desc: bool = True
+
+
+class ScanRequest(ScanFilters):
     query: str = ""
     marketplaces: List[Marketplace] = Field(default_factory=lambda: list(Marketplace))
     min_users: int = 1000
     max_results_per_marketplace: int = 20
+    page_size: Optional[int] = Field(default=None, ge=1, le=1000)
+    # Latency budget for the whole scan; the engine drops work rather than overrun it.
+    # Also send it as X-Deadline-Ms so admission queueing gives up inside the same budget.
+    deadline_ms: Optional[int] = Field(default=None, ge=100)
+    # When set, /scan answers 202 at once and pushes assets here in batches as they are verified.
+    callback_url: Optional[str] = None
+    # Only the best top_k by valuation and distress are wanted; work that cannot displace them is cancelled.
+    top_k: Optional[int] = Field(default=None, ge=1, le=1000)
+    # Answer at once from the local index of earlier scans and refresh from the marketplaces in the background.
+    local_first: bool = False
 
 
 class ScanResponse(BaseModel):
@@ -63,6 +93,30 @@ class ScanResponse(BaseModel):
     marketplaces_scanned: int
     scan_duration_ms: int
     cached: bool = False
+    scan_id: Optional[str] = None
+    next_cursor: Optional[str] = None
+    skipped_marketplaces: List[Marketplace] = Field(default_factory=list)
+    heuristic_assets: int = 0
+    # Search results a top_k scan never verified, or stopped verifying, because they were estimated not to place.
+    pruned_candidates: int = 0
+    # False for top_k scans: pruning works from estimates, so an exhaustive scan could rank differently.
+    exact: Optional[bool] = None
+    # Set on local_first answers: how many indexed assets matched, and where the refreshed results will land.
+    local_matches: int = 0
+    refresh_scan_id: Optional[str] = None
+    refresh_cursor: Optional[str] = None
+
+
+class ScanAccepted(BaseModel):
+    scan_id: str
+    status: str = "accepted"
+
+
+class PushSubscriptionRequest(BaseModel):
+    callback_url: str
+    marketplaces: List[Marketplace] = Field(default_factory=list)
+    min_distress_score: int = 0
+    min_valuation: Optional[float] = None
 
 
 class VerifyRequest(BaseModel):
@@ -74,9 +128,37 @@ class VerifyRequest(BaseModel):
 class VerifyResponse(BaseModel):
     asset_id: str
     verified: bool
+    verified_by: Optional[str] = None
     distress_score: int
     distress_signals: List[DistressSignal]
     estimated_mrr: Optional[float]
     estimated_valuation: Optional[float]
     owner_contact: Optional[str]
     verification_notes: str
+
+
+class ListingRef(BaseModel):
+    url: str
+    marketplace: Marketplace
+
+
+class RefreshRequest(BaseModel):
+    listings: List[ListingRef] = Field(min_length=1, max_length=100)
+
+
+class ListingRefresh(BaseModel):
+    url: str
+    marketplace: Marketplace
+    status: str
+    users: Optional[int] = None
+    rating: Optional[float] = None
+    reviews_count: Optional[int] = None
+    last_updated: Optional[str] = None
+
+
+class RefreshResponse(BaseModel):
+    listings: List[ListingRefresh]
+    fetched: int
+    not_modified: int
+    errors: int
+    refresh_duration_ms: int
@@ -0,0 +1,363 @@
+import os
+import re
+import html
+import asyncio
+import ipaddress
+from urllib.parse import urlparse
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from ..models import Marketplace
+from ..services.shared_store import SharedStore, get_store
+from ..services.serpapi_client import MARKETPLACE_SEARCH_CONFIG
+from .chrome import extract_chrome_extension_data
+from .shopify import extract_shopify_app_data
+
+
+VALIDATOR_NAMESPACE = "listing_validators"
+VALIDATOR_TTL_SECONDS = 30 * 24 * 3600
+# Bumped when parse_listing gains fields; pages parsed by an older version are fetched in full again.
+PARSER_VERSION = 3
+
+PER_HOST_CONCURRENCY = int(os.getenv("DIRECT_FETCH_PER_HOST", "4"))
+MAX_CONNECTIONS = int(os.getenv("DIRECT_FETCH_MAX_CONNECTIONS", "32"))
+FETCH_TIMEOUT_SECONDS = 15.0
+MAX_REDIRECTS = 5
+USER_AGENT = "Mozilla/5.0 (compatible; AssetHunterEngine/1.0)"
+
+EXTRACTORS = {
+    Marketplace.CHROME: extract_chrome_extension_data,
+    Marketplace.SHOPIFY: extract_shopify_app_data,
+}
+# Fields a parser derives rather than reads off the page (Shopify installs are reviews x 10, or a flat 1000).
+ESTIMATED_FIELDS = {
+    Marketplace.SHOPIFY: {"users"},
+}
+
+SIGNAL_PATTERNS = [
+    r'[\d,.]+\s*[KkMm]?\+?\s*(?:users?|installs?|downloads?)',
+    r'[\d,]+\s*(?:reviews?|ratings?)',
+    r'\d(?:\.\d+)?\s*(?:out of 5|/\s*5|stars?)',
+    r'(?:Updated|Last updated)[:\s]+[A-Z][a-z]+\.? \d{1,2},? \d{4}',
+]
+
+# Tried in order; each captures the developer's display name.
+DEVELOPER_PATTERNS = [
+    r'<a[^>]+href=["\'][^"\']*/partners/[^"\']+["\'][^>]*>\s*([^<]+?)\s*</a>',
+    r'"author"\s*:\s*\{[^}]*"name"\s*:\s*"([^"]+)"',
+    r'(?:Offered|Developed|Published) by[:\s]+(?:<[^>]+>\s*)*([^<\n]{2,80}?)\s*<',
+    r'Developer[:\s]+(?:<[^>]+>\s*)*([^<\n]{2,80}?)\s*<',
+]
+# Google Play links each listing to its developer page, whose id is stable across the developer's apps.
+PLAY_DEVELOPER_PATTERN = r'/store/apps/dev(?:eloper)?\?id=([^"\'&<>\s]+)'
+EMAIL_PATTERN = r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}'
+WEBSITE_PATTERN = r'<a[^>]+href=["\'](https?://[^"\']+)["\'][^>]*>\s*(?:<[^>]+>\s*)*(?:Developer )?(?:website|homepage|site)\b'
+# Addresses and links on these hosts belong to the marketplace, not the developer.
+MARKETPLACE_HOSTS = (
+    "google.com", "mozilla.org", "shopify.com", "wordpress.org", "slack.com", "zapier.com", "notion.so",
+    "figma.com", "atlassian.com", "salesforce.com", "hubspot.com", "visualstudio.com", "microsoft.com",
+    "apple.com", "example.com", "sentry.io",
+)
+
+
+class UnsafeURL(ValueError):
+    pass
+
+
+def is_listing_url(url: str, marketplace: Marketplace) -> bool:
+    """Whether ``url`` is an https listing page on ``marketplace``'s own host.
+
+    Callers hand the fetcher URLs, so anything else (other hosts, ports,
+    credentials, or a marketplace path smuggled into the query string) is
+    refused rather than fetched.
+    """
+    config = MARKETPLACE_SEARCH_CONFIG.get(marketplace)
+    if not config:
+        return False
+    parsed = urlparse(url)
+    if parsed.scheme != "https" or parsed.username or parsed.password:
+        return False
+    try:
+        if parsed.port not in (None, 443):
+            return False
+    except ValueError:
+        return False
+    host = (parsed.hostname or "").lower()
+    site_host = config["site"].split("/")[0]
+    if host not in (site_host, "www." + site_host):
+        return False
+    return bool(re.search(config["url_pattern"], host + parsed.path))
+
+
+def is_site_url(url: str) -> bool:
+    """Whether ``url`` is an https page on a developer's public host.
+
+    Marketplace hosts, IP literals, single-label names, credentials and
+    non-default ports are all refused.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme != "https" or parsed.username or parsed.password:
+        return False
+    try:
+        if parsed.port not in (None, 443):
+            return False
+    except ValueError:
+        return False
+    host = (parsed.hostname or "").lower()
+    try:
+        ipaddress.ip_address(host)
+        return False
+    except ValueError:
+        pass
+    return "." in host and _developer_host(url) is not None
+
+
+def _meta(page: str, name: str) -> Optional[str]:
+    match = re.search(
+        rf'<meta[^>]+(?:name|property)=["\']{re.escape(name)}["\'][^>]+content=["\']([^"\']*)["\']',
+        page,
+        re.I,
+    )
+    return html.unescape(match.group(1)).strip() if match else None
+
+
+def extract_listing_text(page: str) -> Dict[str, Any]:
+    """Reduce a listing page to the title/snippet shape the SERP extractors expect."""
+    title = _meta(page, "og:title")
+    if not title:
+        title_match = re.search(r'<title[^>]*>([^<]*)</title>', page, re.I)
+        title = html.unescape(title_match.group(1)).strip() if title_match else ""
+    description = _meta(page, "description") or _meta(page, "og:description") or ""
+
+    body = re.sub(r'<(script|style)[^>]*>[\s\S]*?</\1>', " ", page, flags=re.I)
+    text = html.unescape(re.sub(r'<[^>]+>', " ", body))
+    text = re.sub(r'\s+', " ", text)
+
+    signals = []
+    for pattern in SIGNAL_PATTERNS:
+        match = re.search(pattern, text, re.I)
+        if match:
+            signals.append(match.group(0))
+    # Listing pages say "10,000+ users" and "4.5 out of 5"; the extractors expect "10,000 users" and "4.5/5".
+    snippet = " ".join([description] + signals).replace("+", "")
+    snippet = re.sub(r'(\d(?:\.\d+)?)\s*out of 5', r'\1/5', snippet)
+
+    last_updated = None
+    updated_match = re.search(r'(?:Updated|Last updated)[:\s]+([A-Z][a-z]+\.? \d{1,2},? \d{4})', text)
+    if updated_match:
+        last_updated = updated_match.group(1)
+
+    return {"title": title, "snippet": snippet, "last_updated": last_updated}
+
+
+def _developer_host(url: str) -> Optional[str]:
+    host = urlparse(url).netloc.lower().split(":")[0]
+    if host.startswith("www."):
+        host = host[4:]
+    if not host or any(host == h or host.endswith("." + h) for h in MARKETPLACE_HOSTS):
+        return None
+    return host
+
+
+def extract_emails(page: str) -> List[str]:
+    """Developer-owned addresses on a page, mailto links first."""
+    candidates = re.findall(r'mailto:(' + EMAIL_PATTERN + r')', page, re.I)
+    candidates += re.findall(EMAIL_PATTERN, html.unescape(re.sub(r'<[^>]+>', " ", page)))
+    emails = []
+    for email in candidates:
+        email = email.lower().rstrip(".")
+        if email not in emails and _developer_host("//" + email.split("@")[1]) and not email.endswith((".png", ".jpg", ".svg")):
+            emails.append(email)
+    return emails
+
+
+def extract_developer(page: str) -> Dict[str, Optional[str]]:
+    """Developer name, contact email and website as shown on a listing page."""
+    developer = None
+    for pattern in DEVELOPER_PATTERNS:
+        match = re.search(pattern, page, re.I)
+        if match:
+            developer = html.unescape(match.group(1)).strip()
+            break
+
+    website = None
+    for link in re.findall(WEBSITE_PATTERN, page, re.I):
+        if _developer_host(link):
+            website = html.unescape(link)
+            break
+
+    developer_id = re.search(PLAY_DEVELOPER_PATTERN, page)
+    emails = extract_emails(page)
+    return {
+        "developer": developer,
+        "developer_id": html.unescape(developer_id.group(1)) if developer_id else None,
+        "developer_email": emails[0] if emails else None,
+        "developer_website": website,
+    }
+
+
+def parse_listing(url: str, marketplace: Marketplace, page: str) -> Dict[str, Any]:
+    listing = extract_listing_text(page)
+    serp_like = {"link": url, "title": listing["title"], "snippet": listing["snippet"]}
+
+    extractor = EXTRACTORS.get(marketplace)
+    if extractor:
+        data = extractor(serp_like)
+    else:
+        users_match = re.search(r'([\d,]+)\s*(?:users?|installs?|downloads?)', listing["snippet"], re.I)
+        rating_match = re.search(r'(\d(?:\.\d+)?)\s*(?:/5|stars?)', listing["snippet"], re.I)
+        data = {
+            "name": listing["title"],
+            "url": url,
+            "description": listing["snippet"],
+            "users": int(users_match.group(1).replace(",", "")) if users_match else 0,
+            "rating": float(rating_match.group(1)) if rating_match else None,
+            "marketplace": marketplace.value,
+        }
+
+    reviews_match = re.search(r'([\d,]+)\s*(?:reviews?|ratings?)', listing["snippet"], re.I)
+    data["reviews_count"] = data.pop("reviews", None) or (
+        int(reviews_match.group(1).replace(",", "")) if reviews_match else 0
+    )
+    data["last_updated"] = listing["last_updated"]
+    data.update(extract_developer(page))
+    return data
+
+
+class DirectFetcher:
+    """Refreshes known listing URLs directly, using conditional GETs so unchanged pages cost a 304."""
+
+    def __init__(
+        self,
+        store: Optional[SharedStore] = None,
+        per_host_concurrency: int = PER_HOST_CONCURRENCY,
+        timeout: float = FETCH_TIMEOUT_SECONDS,
+        transport=None,
+    ):
+        self._store = store
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.transport = transport
+        self._client = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.stats = {"requests": 0, "not_modified": 0, "modified": 0, "errors": 0, "rejected": 0, "bytes": 0}
+
+    @property
+    def store(self) -> SharedStore:
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    async def __aenter__(self) -> "DirectFetcher":
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            # Redirects are followed by _get, which checks every hop.
+            follow_redirects=False,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            headers={"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"},
+            transport=self.transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_limits[host]
+
+    async def _get(self, url: str, allowed: Callable[[str], bool], headers: Optional[Dict[str, str]] = None):
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await self._client.get(url, headers=headers)
+            if not response.is_redirect or response.next_request is None:
+                return response
+            url = str(response.next_request.url)
+            if not allowed(url):
+                raise UnsafeURL(f"redirected off-site to {url}")
+        raise UnsafeURL("too many redirects")
+
+    async def fetch(self, url: str, marketplace: Marketplace) -> Dict[str, Any]:
+        if not is_listing_url(url, marketplace):
+            self.stats["rejected"] += 1
+            print(f"[DirectFetch] Refusing {url}: not a {marketplace.value} listing URL")
+            return {"url": url, "status": "error", "data": None}
+        if self._client is None:
+            await self.__aenter__()
+
+        cached = await asyncio.to_thread(self.store.cache_get, VALIDATOR_NAMESPACE, url)
+        headers = {}
+        if cached and cached.get("parser") == PARSER_VERSION:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._host_limit(url):
+            self.stats["requests"] += 1
+            try:
+                response = await self._get(url, lambda u: is_listing_url(u, marketplace), headers)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[DirectFetch] Error fetching {url}: {e!r}")
+                return {"url": url, "status": "error", "data": cached["data"] if cached else None}
+
+        if response.status_code == 304 and cached:
+            self.stats["not_modified"] += 1
+            return {"url": url, "status": "not_modified", "data": cached["data"]}
+
+        if response.status_code >= 400:
+            self.stats["errors"] += 1
+            print(f"[DirectFetch] {url} returned HTTP {response.status_code}")
+            return {"url": url, "status": "error", "data": cached["data"] if cached else None}
+
+        self.stats["modified"] += 1
+        self.stats["bytes"] += int(response.headers.get("content-length") or len(response.content))
+        data = parse_listing(url, marketplace, response.text)
+        await asyncio.to_thread(
+            self.store.cache_set,
+            VALIDATOR_NAMESPACE,
+            url,
+            {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "data": data,
+                "parser": PARSER_VERSION,
+            },
+            VALIDATOR_TTL_SECONDS,
+        )
+        return {"url": url, "status": "modified", "data": data}
+
+    async def get_text(self, url: str) -> Optional[str]:
+        """Plain GET of a developer's own https site; redirects must stay on the same host."""
+        if not is_site_url(url):
+            self.stats["rejected"] += 1
+            print(f"[DirectFetch] Refusing {url}: not a public https site")
+            return None
+        if self._client is None:
+            await self.__aenter__()
+
+        host = urlparse(url).hostname
+        async with self._host_limit(url):
+            self.stats["requests"] += 1
+            try:
+                response = await self._get(url, lambda u: is_site_url(u) and urlparse(u).hostname == host)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[DirectFetch] Error fetching {url}: {e}")
+                return None
+
+        if response.status_code >= 400:
+            self.stats["errors"] += 1
+            return None
+        self.stats["bytes"] += len(response.content)
+        return response.text
+
+    async def fetch_many(self, listings: List[Tuple[str, Marketplace]]) -> List[Dict[str, Any]]:
+        return await asyncio.gather(*(self.fetch(url, marketplace) for url, marketplace in listings))
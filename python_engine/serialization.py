@@ -0,0 +1,66 @@
+import json
+from typing import List, Optional, Dict, Any, Iterable
+from fastapi import Response
+from python_engine.models import Asset
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ASSET_FIELDS = tuple(Asset.model_fields)
+RESPONSE_FORMATS = ("rows", "columnar")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Turn a ``fields=id,name,url`` query value into a validated projection."""
+    if not fields:
+        return None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in ASSET_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown asset fields: {', '.join(unknown)}")
+    return selected
+
+
+def _default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        # orjson handles datetime and str-enum values natively, so assets skip jsonable_encoder.
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode()
+
+
+def asset_records(assets: Iterable[Asset]) -> List[Dict[str, Any]]:
+    # Python-mode dumps keep datetimes and enums as-is; dumps() encodes them natively.
+    return [a.model_dump() for a in assets]
+
+
+def asset_rows(records: List[Dict[str, Any]], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    if not fields:
+        return records
+    return [{name: r[name] for name in fields} for r in records]
+
+
+def asset_columns(records: List[Dict[str, Any]], fields: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+    names = fields or list(ASSET_FIELDS)
+    return {name: [r[name] for r in records] for name in names}
+
+
+def encode_scan_response(
+    records: List[Dict[str, Any]],
+    meta: Dict[str, Any],
+    fields: Optional[List[str]] = None,
+    response_format: str = "rows",
+) -> Response:
+    if response_format == "columnar":
+        payload = {**meta, "format": "columnar", "columns": asset_columns(records, fields)}
+    else:
+        payload = {**meta, "assets": asset_rows(records, fields)}
+    return Response(content=dumps(payload), media_type="application/json")
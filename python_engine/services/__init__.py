@@ -1,4 +1,15 @@
 from .serpapi_client import SerpAPIClient
 from .gemini_verifier import GeminiVerifier
+from .frontier_scheduler import FrontierScheduler
+from .shared_store import SharedStore, get_store
+from .scan_results import ScanResultStore
+from .query_planner import QueryPlanner
+from .distress_classifier import DistressClassifier
+from .snapshots import SnapshotWriter, SnapshotReader
+from .metric_history import MetricHistory
+from .push_delivery import PushDispatcher
+from .owner_enrichment import OwnerEnricher
+from .top_k import TopK
+from .local_index import LocalIndex
 
-__all__ = ["SerpAPIClient", "GeminiVerifier"]
+__all__ = ["SerpAPIClient", "GeminiVerifier", "FrontierScheduler", "SharedStore", "get_store", "ScanResultStore", "QueryPlanner", "DistressClassifier", "SnapshotWriter", "SnapshotReader", "MetricHistory", "PushDispatcher", "OwnerEnricher", "TopK", "LocalIndex"]
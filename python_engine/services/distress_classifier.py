@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import math
+import zlib
+import random
+from typing import Optional, List, Dict, Any, Tuple
+from ..models import DistressSignal
+
+
+LABELS_PATH = os.getenv("ENGINE_LABELS_PATH")
+CLASSIFIER_PATH = os.getenv("ENGINE_CLASSIFIER_PATH")
+CONFIDENCE_THRESHOLD = float(os.getenv("ENGINE_CLASSIFIER_CONFIDENCE", "0.85"))
+
+HASH_BUCKETS = 1 << 18
+# Intercepts live outside the hashed feature space.
+INTERCEPT = -1
+VALID_LABEL = "is_valid_asset"
+SIGNAL_LABELS = [s.value for s in DistressSignal]
+
+
+def record_label(asset_data: Dict[str, Any], verification: Dict[str, Any], path: Optional[str] = None) -> None:
+    """Append one Gemini verification to the JSONL training set, if label collection is enabled.
+
+    Placeholder, heuristic and classifier results are skipped so the model
+    never trains on its own guesses.
+    """
+    path = path or LABELS_PATH
+    if not path or verification.get("verified_by") != "gemini":
+        return
+    line = {
+        "title": asset_data.get("title", ""),
+        "snippet": asset_data.get("snippet", ""),
+        "marketplace": asset_data.get("marketplace", ""),
+        "verification": verification,
+    }
+    try:
+        with open(path, "a") as f:
+            f.write(json.dumps(line) + "\n")
+    except OSError as e:
+        print(f"[Classifier] Unable to record label: {e}")
+
+
+def load_labels(path: str) -> List[Dict[str, Any]]:
+    examples = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                examples.append(json.loads(line))
+    return examples
+
+
+def _bucket(token: str) -> int:
+    # crc32 rather than hash(): str hashes are salted per process and the model is shared.
+    return zlib.crc32(token.encode()) % HASH_BUCKETS
+
+
+def featurize(title: str, snippet: str, marketplace: str) -> Dict[int, float]:
+    text = f"{title} {snippet}".lower()
+    tokens = re.findall(r"[a-z0-9]+", text)
+    features = [f"mp={marketplace}"]
+    features.extend(tokens)
+    features.extend(f"{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+
+    users_match = re.search(r'([\d,]+)\+?\s*users?', text)
+    if users_match:
+        users = int(users_match.group(1).replace(",", "") or 0)
+        features.append(f"users_log10={int(math.log10(users + 1))}")
+    years = re.findall(r'\b(20[0-2]\d)\b', text)
+    features.extend(f"year={y}" for y in years)
+    if not years:
+        features.append("no_year")
+
+    scale = 1.0 / math.sqrt(len(features))
+    vector: Dict[int, float] = {}
+    for feature in features:
+        idx = _bucket(feature)
+        vector[idx] = vector.get(idx, 0.0) + scale
+    return vector
+
+
+def _sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def _dot(weights: Dict[int, float], x: Dict[int, float]) -> float:
+    return weights.get(INTERCEPT, 0.0) + sum(weights.get(i, 0.0) * v for i, v in x.items())
+
+
+class DistressClassifier:
+    """Hashed bag-of-words linear models distilled from Gemini verification outputs.
+
+    One logistic model per distress signal plus validity, and linear
+    regressions for log(users) and rating. Prediction is a handful of
+    sparse dot products, so it runs in the scan path on CPU.
+    """
+
+    def __init__(self):
+        self.classifiers: Dict[str, Dict[int, float]] = {}
+        self.regressors: Dict[str, Dict[int, float]] = {}
+
+    @staticmethod
+    def targets(verification: Dict[str, Any]) -> Tuple[Dict[str, int], Dict[str, float]]:
+        signals = set(verification.get("distress_signals") or [])
+        labels = {label: int(label in signals) for label in SIGNAL_LABELS}
+        labels[VALID_LABEL] = int(bool(verification.get("is_valid_asset", True)))
+        values = {
+            "log_users": math.log1p(max(0, int(verification.get("estimated_users") or 0))),
+            "rating": float(verification.get("estimated_rating") or 4.0),
+        }
+        return labels, values
+
+    def train(
+        self,
+        examples: List[Dict[str, Any]],
+        epochs: int = 15,
+        learning_rate: float = 0.5,
+        l2: float = 1e-5,
+        seed: int = 13,
+    ) -> None:
+        rows = []
+        for ex in examples:
+            x = featurize(ex.get("title", ""), ex.get("snippet", ""), ex.get("marketplace", ""))
+            labels, values = self.targets(ex.get("verification", {}))
+            rows.append((x, labels, values))
+
+        self.classifiers = {label: {} for label in SIGNAL_LABELS + [VALID_LABEL]}
+        self.regressors = {name: {} for name in ("log_users", "rating")}
+        for name, weights in self.regressors.items():
+            weights[INTERCEPT] = sum(r[2][name] for r in rows) / max(1, len(rows))
+
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(rows)
+            rate = learning_rate / (1 + epoch)
+            for x, labels, values in rows:
+                for label, weights in self.classifiers.items():
+                    error = _sigmoid(_dot(weights, x)) - labels[label]
+                    weights[INTERCEPT] = weights.get(INTERCEPT, 0.0) - rate * error
+                    for i, v in x.items():
+                        weights[i] = weights.get(i, 0.0) * (1 - rate * l2) - rate * error * v
+                for name, weights in self.regressors.items():
+                    error = _dot(weights, x) - values[name]
+                    step = rate * 0.1
+                    weights[INTERCEPT] -= step * error
+                    for i, v in x.items():
+                        weights[i] = weights.get(i, 0.0) - step * error * v
+
+    def predict(self, asset_data: Dict[str, Any]) -> Dict[str, Any]:
+        x = featurize(asset_data.get("title", ""), asset_data.get("snippet", ""), asset_data.get("marketplace", ""))
+        probs = {label: _sigmoid(_dot(w, x)) for label, w in self.classifiers.items()}
+        confidence = min(max(p, 1 - p) for p in probs.values()) if probs else 0.0
+        users = int(max(0.0, math.expm1(_dot(self.regressors.get("log_users", {}), x))))
+        users_match = re.search(r'([\d,]+)\+?\s*users?', asset_data.get("snippet", ""), re.I)
+        if users_match and users_match.group(1).replace(",", ""):
+            # An explicit count in the snippet beats the regression estimate.
+            users = int(users_match.group(1).replace(",", ""))
+        rating = min(5.0, max(1.0, _dot(self.regressors.get("rating", {}), x)))
+        return {
+            "is_valid_asset": probs.get(VALID_LABEL, 1.0) >= 0.5,
+            "distress_signals": [s for s in SIGNAL_LABELS if probs.get(s, 0.0) >= 0.5],
+            "estimated_users": users,
+            "estimated_rating": round(rating, 1),
+            "verification_notes": f"Local classifier (confidence {confidence:.2f})",
+            "owner_likely_selling": False,
+            "confidence": confidence,
+            "verified_by": "classifier",
+        }
+
+    def save(self, path: str) -> None:
+        payload = {
+            "version": 1,
+            "hash_buckets": HASH_BUCKETS,
+            "classifiers": {k: {str(i): w for i, w in v.items() if abs(w) > 1e-6} for k, v in self.classifiers.items()},
+            "regressors": {k: {str(i): w for i, w in v.items() if abs(w) > 1e-6} for k, v in self.regressors.items()},
+        }
+        with open(path, "w") as f:
+            json.dump(payload, f)
+
+    @classmethod
+    def load(cls, path: str) -> "DistressClassifier":
+        with open(path) as f:
+            payload = json.load(f)
+        if payload.get("hash_buckets") != HASH_BUCKETS:
+            raise ValueError("Classifier was trained with a different feature space")
+        model = cls()
+        model.classifiers = {k: {int(i): w for i, w in v.items()} for k, v in payload["classifiers"].items()}
+        model.regressors = {k: {int(i): w for i, w in v.items()} for k, v in payload["regressors"].items()}
+        return model
+
+
+def load_default_classifier() -> Optional[DistressClassifier]:
+    if not CLASSIFIER_PATH or not os.path.exists(CLASSIFIER_PATH):
+        return None
+    try:
+        return DistressClassifier.load(CLASSIFIER_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[Classifier] Unable to load {CLASSIFIER_PATH}: {e}")
+        return None
@@ -0,0 +1,452 @@
+import os
+import json
+import time
+import asyncio
+import itertools
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Iterable, Tuple
+from ..models import Asset, Marketplace
+from .shared_store import SharedStore
+
+
+SERPAPI_COST_PER_CALL = float(os.getenv("SERPAPI_COST_PER_CALL", "0.01"))
+GEMINI_COST_PER_CALL = float(os.getenv("GEMINI_COST_PER_CALL", "0.0005"))
+
+MIN_REFRESH_SECONDS = 15 * 60
+MAX_REFRESH_SECONDS = 7 * 24 * 3600
+DEFAULT_REFRESH_SECONDS = 6 * 3600
+
+# Every /scan query joins the frontier; past this many entries the least promising are evicted.
+MAX_FRONTIER_ENTRIES = int(os.getenv("ENGINE_FRONTIER_MAX_ENTRIES", "2000"))
+# URLs remembered per entry for churn, and across the frontier for skipping re-verification.
+MAX_SEEN_URLS = 200
+MAX_KNOWN_URLS = 100_000
+
+HIGH_VALUE_MIN_DISTRESS = 4
+HIGH_VALUE_MIN_VALUATION = 10000.0
+
+FRONTIER_NAMESPACE = "frontier"
+SCHEDULER_LEASE = "frontier_scheduler"
+
+# Weight of the newest observation in the yield/churn moving averages.
+EWMA_ALPHA = 0.3
+
+ScanFn = Callable[[str, Marketplace], Awaitable[List[Dict[str, Any]]]]
+VerifyFn = Callable[[Dict[str, Any]], Awaitable[Optional[Asset]]]
+VerifiedFn = Callable[[List[Asset]], Awaitable[None]]
+
+
+def remember(urls: Dict[str, None], new: Iterable[str], limit: int) -> None:
+    """Add ``new`` to an insertion-ordered set, dropping the least recently seen past ``limit``."""
+    for url in new:
+        urls.pop(url, None)
+        urls[url] = None
+    for url in list(itertools.islice(urls, max(0, len(urls) - limit))):
+        del urls[url]
+
+
+def is_high_value_lead(asset: Asset) -> bool:
+    return (
+        asset.distress_score >= HIGH_VALUE_MIN_DISTRESS
+        and (asset.estimated_valuation or 0) >= HIGH_VALUE_MIN_VALUATION
+    )
+
+
+class FrontierEntry:
+    def __init__(self, query: str, marketplace: Marketplace, next_due: float = 0.0):
+        self.query = query
+        self.marketplace = marketplace
+        self.next_due = next_due
+        self.refresh_interval = float(DEFAULT_REFRESH_SECONDS)
+        self.scans = 0
+        self.total_leads = 0
+        # Optimistic priors so unexplored pairs get scanned at least once.
+        self.lead_yield = 1.0
+        self.churn = 0.5
+        self.avg_results = 10.0
+        self.last_requested = next_due
+        self.seen_urls: Dict[str, None] = {}
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.query, self.marketplace.value)
+
+    def expected_cost(self, verify: bool = True) -> float:
+        cost = SERPAPI_COST_PER_CALL
+        if verify:
+            # Only unseen results are sent to Gemini.
+            cost += GEMINI_COST_PER_CALL * self.avg_results * max(self.churn, 0.05)
+        return cost
+
+    def priority(self, verify: bool = True) -> float:
+        return self.lead_yield / self.expected_cost(verify)
+
+    def record(self, results: List[Dict[str, Any]], new_leads: int, now: float) -> int:
+        urls = {r.get("url", "") for r in results if r.get("url")}
+        new_urls = [u for u in urls if u not in self.seen_urls]
+        churn = len(new_urls) / len(urls) if urls else 0.0
+
+        self.scans += 1
+        self.total_leads += new_leads
+        remember(self.seen_urls, urls, max(MAX_SEEN_URLS, len(urls)))
+        self.lead_yield = (1 - EWMA_ALPHA) * self.lead_yield + EWMA_ALPHA * new_leads
+        self.churn = (1 - EWMA_ALPHA) * self.churn + EWMA_ALPHA * churn
+        self.avg_results = (1 - EWMA_ALPHA) * self.avg_results + EWMA_ALPHA * len(urls)
+
+        # Pairs whose listings keep changing are revisited sooner; static ones back off.
+        interval = DEFAULT_REFRESH_SECONDS * (0.5 / max(self.churn, 0.01))
+        self.refresh_interval = min(MAX_REFRESH_SECONDS, max(MIN_REFRESH_SECONDS, interval))
+        self.next_due = now + self.refresh_interval
+        return len(new_urls)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "query": self.query,
+            "marketplace": self.marketplace.value,
+            "scans": self.scans,
+            "total_leads": self.total_leads,
+            "lead_yield": round(self.lead_yield, 3),
+            "churn": round(self.churn, 3),
+            "priority": round(self.priority(), 2),
+            "refresh_interval_s": int(self.refresh_interval),
+            "next_due": self.next_due,
+        }
+
+
+class BudgetBucket:
+    """Token bucket of dollars refilled continuously at an hourly rate."""
+
+    def __init__(self, per_hour: float, now: float):
+        self.per_hour = per_hour
+        self.capacity = per_hour
+        self.available = per_hour
+        self.updated_at = now
+        self.spent = 0.0
+
+    def refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated_at)
+        self.available = min(self.capacity, self.available + elapsed * self.per_hour / 3600)
+        self.updated_at = now
+
+    def try_spend(self, amount: float) -> bool:
+        if amount > self.available:
+            return False
+        self.available -= amount
+        self.spent += amount
+        return True
+
+
+class FrontierScheduler:
+    def __init__(
+        self,
+        scan_fn: ScanFn,
+        verify_fn: Optional[VerifyFn] = None,
+        budget_per_hour: float = 1.0,
+        clock: Callable[[], float] = time.time,
+        record_path: Optional[str] = None,
+        store: Optional[SharedStore] = None,
+        on_verified: Optional[VerifiedFn] = None,
+        max_entries: int = MAX_FRONTIER_ENTRIES,
+    ):
+        self.scan_fn = scan_fn
+        self.verify_fn = verify_fn
+        self.clock = clock
+        self.budget = BudgetBucket(budget_per_hour, clock())
+        self.record_path = record_path
+        self.entries: Dict[Tuple[str, str], FrontierEntry] = {}
+        self.max_entries = max_entries
+        self.known_urls: Dict[str, None] = {}
+        self.recent_leads: deque = deque(maxlen=500)
+        self.serpapi_calls = 0
+        self.gemini_calls = 0
+        self.skipped_verifications = 0
+        self.evicted = 0
+        # Kept as a running total so evicting an entry does not take its leads out of the count.
+        self.leads_found = 0
+        self.store = store
+        self.on_verified = on_verified
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, query: str, marketplaces: Iterable[Marketplace]) -> None:
+        added, evicted = self._add(query, marketplaces)
+        if self.store:
+            self._share(added, evicted)
+
+    async def request(self, query: str, marketplaces: Iterable[Marketplace]) -> None:
+        """:meth:`add` for callers on the event loop; the shared-store writes run in a thread."""
+        added, evicted = self._add(query, marketplaces)
+        if self.store and (added or evicted):
+            await asyncio.to_thread(self._share, added, evicted)
+
+    def _add(self, query: str, marketplaces: Iterable[Marketplace]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        now = self.clock()
+        added, evicted = [], []
+        for marketplace in marketplaces:
+            key = (query, marketplace.value)
+            if key in self.entries:
+                self.entries[key].last_requested = now
+                continue
+            evicted.extend(self._insert(FrontierEntry(query, marketplace, next_due=now)))
+            added.append(key)
+        return added, evicted
+
+    def _share(self, added: List[Tuple[str, str]], evicted: List[Tuple[str, str]]) -> None:
+        # Any worker can grow the frontier; the lease holder picks it up.
+        for key in added:
+            self.store.cache_set(FRONTIER_NAMESPACE, "|".join(key), list(key), MAX_REFRESH_SECONDS * 4)
+        for key in evicted:
+            self.store.cache_delete(FRONTIER_NAMESPACE, "|".join(key))
+
+    def _insert(self, entry: FrontierEntry) -> List[Tuple[str, str]]:
+        evicted = []
+        if len(self.entries) >= self.max_entries:
+            evicted.append(self._evict())
+        self.entries[entry.key] = entry
+        return evicted
+
+    def _evict(self) -> Tuple[str, str]:
+        """Drop the entry least worth keeping: lowest priority among scanned entries, least recently requested first."""
+        scanned = [e for e in self.entries.values() if e.scans] or list(self.entries.values())
+        victim = min(scanned, key=lambda e: (e.priority(self.verify_fn is not None), e.last_requested))
+        del self.entries[victim.key]
+        self.evicted += 1
+        return victim.key
+
+    async def _sync_frontier(self) -> None:
+        shared = await asyncio.to_thread(self.store.cache_items, FRONTIER_NAMESPACE)
+        evicted = []
+        for query, marketplace in shared:
+            key = (query, marketplace)
+            if key not in self.entries:
+                evicted.extend(self._insert(FrontierEntry(query, Marketplace(marketplace), next_due=self.clock())))
+        if evicted:
+            await asyncio.to_thread(self._share, [], evicted)
+
+    def due_entries(self, now: float) -> List[FrontierEntry]:
+        due = [e for e in self.entries.values() if e.next_due <= now]
+        due.sort(key=lambda e: e.priority(self.verify_fn is not None), reverse=True)
+        return due
+
+    async def run_once(self) -> List[FrontierEntry]:
+        now = self.clock()
+        self.budget.refill(now)
+        scanned = []
+        for entry in self.due_entries(now):
+            if not self.budget.try_spend(SERPAPI_COST_PER_CALL):
+                break
+            await self._scan_entry(entry, now)
+            scanned.append(entry)
+        return scanned
+
+    async def _scan_entry(self, entry: FrontierEntry, now: float) -> None:
+        self.serpapi_calls += 1
+        try:
+            results = await self.scan_fn(entry.query, entry.marketplace)
+        except Exception as e:
+            print(f"[Scheduler] Scan failed for {entry.marketplace.value} - {entry.query}: {e}")
+            entry.next_due = now + MIN_REFRESH_SECONDS
+            return
+
+        new_leads = 0
+        verified: Dict[str, Asset] = {}
+        fresh = [r for r in results if r.get("url") and r["url"] not in self.known_urls]
+        if not self.verify_fn:
+            remember(self.known_urls, (r["url"] for r in fresh), MAX_KNOWN_URLS)
+            fresh = []
+        for i, raw_result in enumerate(fresh):
+            if not self.budget.try_spend(GEMINI_COST_PER_CALL):
+                # Left unknown so the next visit verifies them once the budget has refilled.
+                self.skipped_verifications += len(fresh) - i
+                break
+            self.gemini_calls += 1
+            remember(self.known_urls, [raw_result["url"]], MAX_KNOWN_URLS)
+            asset = await self.verify_fn(raw_result)
+            if not asset:
+                continue
+            verified[raw_result["url"]] = asset
+            if is_high_value_lead(asset):
+                new_leads += 1
+                self.recent_leads.append(asset)
+
+        entry.record(results, new_leads, now)
+        self.leads_found += new_leads
+        self._record(entry, results, verified, now)
+        if verified and self.on_verified:
+            await self.on_verified(list(verified.values()))
+
+    def _record(
+        self,
+        entry: FrontierEntry,
+        results: List[Dict[str, Any]],
+        verified: Dict[str, Asset],
+        now: float,
+    ) -> None:
+        if not self.record_path:
+            return
+        recorded = []
+        for r in results:
+            asset = verified.get(r.get("url", ""))
+            if asset:
+                r = dict(r, distress_score=asset.distress_score, estimated_valuation=asset.estimated_valuation)
+            recorded.append(r)
+        line = {"t": now, "query": entry.query, "marketplace": entry.marketplace.value, "results": recorded}
+        try:
+            with open(self.record_path, "a") as f:
+                f.write(json.dumps(line, default=str) + "\n")
+        except OSError as e:
+            print(f"[Scheduler] Unable to record observation: {e}")
+
+    def start(self, tick_seconds: float = 30.0) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(tick_seconds))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            if self.store:
+                # Lets another worker take over without waiting out the lease.
+                await asyncio.to_thread(self.store.release_lease, SCHEDULER_LEASE, self.owner)
+
+    async def _loop(self, tick_seconds: float) -> None:
+        lease_seconds = tick_seconds * 3
+        while True:
+            try:
+                if self.store:
+                    if not await asyncio.to_thread(self.store.acquire_lease, SCHEDULER_LEASE, self.owner, lease_seconds):
+                        await asyncio.sleep(tick_seconds)
+                        continue
+                    await self._sync_frontier()
+                    scanned = await self._run_leased(lease_seconds)
+                else:
+                    scanned = await self.run_once()
+                if scanned:
+                    print(f"[Scheduler] Refreshed {len(scanned)} frontier entries, spent ${self.budget.spent:.2f}")
+                if self.store:
+                    await asyncio.to_thread(self.store.put_job, SCHEDULER_LEASE, "running", self.snapshot())
+            except Exception as e:
+                print(f"[Scheduler] Tick failed: {e}")
+            await asyncio.sleep(tick_seconds)
+
+    async def _run_leased(self, lease_seconds: float) -> List[FrontierEntry]:
+        """run_once, renewing the lease while it runs; a run that loses the lease is cancelled."""
+        run = asyncio.ensure_future(self.run_once())
+        renew = asyncio.ensure_future(self._renew_lease(lease_seconds))
+        try:
+            await asyncio.wait({run, renew}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            renew.cancel()
+            lost = not run.done()
+            run.cancel()
+        if lost:
+            print("[Scheduler] Lost the scheduler lease mid-run; stopping this run")
+            return []
+        return run.result()
+
+    async def _renew_lease(self, lease_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            if not await asyncio.to_thread(self.store.acquire_lease, SCHEDULER_LEASE, self.owner, lease_seconds):
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frontier_size": len(self.entries),
+            "serpapi_calls": self.serpapi_calls,
+            "gemini_calls": self.gemini_calls,
+            "skipped_verifications": self.skipped_verifications,
+            "evicted_entries": self.evicted,
+            "spent": round(self.budget.spent, 4),
+            "budget_available": round(self.budget.available, 4),
+            "leads_found": self.leads_found,
+            "known_urls": len(self.known_urls),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        entries = sorted(self.entries.values(), key=lambda e: e.priority(), reverse=True)
+        return {
+            **self.stats(),
+            "frontier": [e.to_dict() for e in entries[:50]],
+            "recent_leads": [a.model_dump(mode="json") for a in list(self.recent_leads)[-20:]],
+        }
+
+
+class RecordedMarketplace:
+    """Replays recorded scan observations as a stand-in for SerpAPI + Gemini.
+
+    Each line of the recording is ``{"t", "query", "marketplace", "results"}``
+    where results are raw SerpAPI-style dicts, optionally carrying the
+    ``distress_score`` and ``estimated_valuation`` Gemini assigned to them.
+    """
+
+    def __init__(self, path: str):
+        self.observations: Dict[Tuple[str, str], List[Tuple[float, List[Dict[str, Any]]]]] = {}
+        self.start = float("inf")
+        self.end = 0.0
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                obs = json.loads(line)
+                key = (obs["query"], obs["marketplace"])
+                self.observations.setdefault(key, []).append((obs["t"], obs.get("results", [])))
+                self.start = min(self.start, obs["t"])
+                self.end = max(self.end, obs["t"])
+        for series in self.observations.values():
+            series.sort(key=lambda o: o[0])
+        self.now = self.start
+
+    def clock(self) -> float:
+        return self.now
+
+    def pairs(self) -> List[Tuple[str, Marketplace]]:
+        return [(q, Marketplace(m)) for q, m in self.observations]
+
+    async def scan(self, query: str, marketplace: Marketplace) -> List[Dict[str, Any]]:
+        latest: List[Dict[str, Any]] = []
+        for t, results in self.observations.get((query, marketplace.value), []):
+            if t > self.now:
+                break
+            latest = results
+        return latest
+
+    async def verify(self, raw_result: Dict[str, Any]) -> Optional[Asset]:
+        return Asset(
+            id=raw_result.get("url", ""),
+            name=raw_result.get("title", "Unknown"),
+            url=raw_result.get("url", ""),
+            marketplace=Marketplace(raw_result.get("marketplace", "chrome")),
+            distress_score=raw_result.get("distress_score", 0),
+            estimated_valuation=raw_result.get("estimated_valuation"),
+        )
+
+
+async def simulate(
+    recording_path: str,
+    budget_per_hour: float = 1.0,
+    tick_seconds: float = 300.0,
+) -> Dict[str, Any]:
+    source = RecordedMarketplace(recording_path)
+    scheduler = FrontierScheduler(
+        scan_fn=source.scan,
+        verify_fn=source.verify,
+        budget_per_hour=budget_per_hour,
+        clock=source.clock,
+    )
+    for query, marketplace in source.pairs():
+        scheduler.add(query, [marketplace])
+
+    while source.now <= source.end:
+        await scheduler.run_once()
+        source.now += tick_seconds
+
+    stats = scheduler.stats()
+    stats["leads_per_dollar"] = round(stats["leads_found"] / stats["spent"], 3) if stats["spent"] else 0.0
+    stats["simulated_hours"] = round((source.end - source.start) / 3600, 2)
+    return stats
+
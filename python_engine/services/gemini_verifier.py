@@ -1,7 +1,35 @@
 import os
+import re
+import asyncio
 from typing import Optional, List, Dict, Any
-from google import genai
 from ..models import Asset, Marketplace, DistressSignal
+from .distress_classifier import record_label, LABELS_PATH
+from .latency import LatencyTracker, hedged
+from ..prompts import CompactPrompt, TruncatedReply
+
+
+SNIPPET_TOKEN_BUDGET = int(os.getenv("ENGINE_SNIPPET_TOKEN_BUDGET", "120"))
+NAME_TOKEN_BUDGET = 24
+# A full reply with 20-word notes is about 100 tokens; the cap leaves room for wordier ones.
+VERIFY_EXPECTED_OUTPUT_TOKENS = 100
+VERIFY_MAX_OUTPUT_TOKENS = int(os.getenv("ENGINE_VERIFY_MAX_OUTPUT_TOKENS", "256"))
+
+def is_confirmed(verification: Dict[str, Any]) -> bool:
+    """Whether Gemini itself judged the listing a valid asset; local estimates never count."""
+    return verification.get("verified_by") == "gemini" and bool(verification.get("is_valid_asset"))
+
+
+VERIFY_PROMPT = CompactPrompt(
+    "verify",
+    system=(
+        "Assess a software marketplace listing as an acquisition target. Reply with JSON: "
+        "is_valid_asset (bool), distress_signals (only those the listing supports, from no_updates, "
+        "broken_support, manifest_v2, declining_reviews, owner_inactive), estimated_users (int), "
+        "estimated_rating (1-5), verification_notes (at most 20 words), owner_likely_selling (bool)."
+    ),
+    expected_output_tokens=VERIFY_EXPECTED_OUTPUT_TOKENS,
+    max_output_tokens=VERIFY_MAX_OUTPUT_TOKENS,
+)
 
 
 class GeminiVerifier:
@@ -10,7 +38,16 @@ class GeminiVerifier:
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY or AI_INTEGRATIONS_GEMINI_API_KEY environment variable required")
         
-        self.client = genai.Client(api_key=self.api_key)
+        self._client = None
+        self.latency = LatencyTracker("gemini", default_seconds=4.0)
+    
+    @property
+    def client(self):
+        # google.genai takes ~0.5s to import, so it is loaded on first use rather than at startup.
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
     
     def estimate_mrr(self, marketplace: Marketplace, users: int, rating: float = 4.0) -> float:
         base_rates = {
@@ -61,39 +98,35 @@ class GeminiVerifier:
         return min(10, total)
     
     async def verify_asset(self, asset_data: Dict[str, Any]) -> Dict[str, Any]:
-        prompt = f"""Analyze this software asset for acquisition potential:
-
-Name: {asset_data.get('title', 'Unknown')}
-URL: {asset_data.get('url', '')}
-Description: {asset_data.get('snippet', '')}
-Marketplace: {asset_data.get('marketplace', 'unknown')}
-
-Provide a brief analysis in JSON format:
-{{
-    "is_valid_asset": true/false,
-    "distress_signals": ["no_updates", "broken_support", "manifest_v2", "declining_reviews", "owner_inactive"],
-    "estimated_users": number,
-    "estimated_rating": number (1-5),
-    "verification_notes": "brief notes about the asset",
-    "owner_likely_selling": true/false
-}}
-
-Only include distress signals that are likely based on the information provided.
-Respond ONLY with valid JSON, no markdown."""
+        prompt = VERIFY_PROMPT.render([
+            ("Name", asset_data.get('title', 'Unknown'), NAME_TOKEN_BUDGET),
+            ("URL", asset_data.get('url', ''), None),
+            ("Marketplace", asset_data.get('marketplace', 'unknown'), None),
+            ("Listing", asset_data.get('snippet', ''), SNIPPET_TOKEN_BUDGET),
+        ])
 
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt
+            text = await VERIFY_PROMPT.generate(
+                lambda config: hedged(
+                    lambda: self.client.aio.models.generate_content(
+                        model="gemini-2.0-flash",
+                        contents=prompt,
+                        config=config,
+                    ),
+                    self.latency,
+                ),
+                prompt,
             )
             
             import json
             import re
             
-            text = (response.text or "").strip()
             json_match = re.search(r'\{[\s\S]*\}', text)
             if json_match:
                 result = json.loads(json_match.group())
+                result["verified_by"] = "gemini"
+                if LABELS_PATH:
+                    await asyncio.to_thread(record_label, asset_data, result)
                 return result
             
             return {
@@ -105,6 +138,12 @@ Respond ONLY with valid JSON, no markdown."""
                 "owner_likely_selling": False
             }
             
+        except TruncatedReply as e:
+            # Half a JSON object says nothing reliable; use the snippet estimate and say so.
+            print(f"[Gemini] {e} for {asset_data.get('url', '')}")
+            result = self.heuristic_verification(asset_data)
+            result["verification_notes"] = "Gemini reply was cut off; heuristic estimate from search snippet"
+            return result
         except Exception as e:
             print(f"[Gemini] Verification error: {e}")
             return {
@@ -116,6 +155,22 @@ Respond ONLY with valid JSON, no markdown."""
                 "owner_likely_selling": False
             }
     
+    def heuristic_verification(self, asset_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Best-effort verification from the search snippet alone, for scans with no time left for Gemini."""
+        snippet = asset_data.get("snippet", "")
+        users_match = re.search(r'([\d,]+)\+?\s*users?', snippet, re.I)
+        rating_match = re.search(r'(\d(?:\.\d+)?)\s*(?:/5|stars?|out of 5)', snippet, re.I)
+        users = int(users_match.group(1).replace(",", "") or 0) if users_match else 5000
+        return {
+            "is_valid_asset": False,
+            "distress_signals": [],
+            "estimated_users": users,
+            "estimated_rating": float(rating_match.group(1)) if rating_match else 4.0,
+            "verification_notes": "Heuristic estimate from search snippet; not verified",
+            "owner_likely_selling": False,
+            "verified_by": "heuristic",
+        }
+    
     def enrich_asset(self, raw_result: Dict[str, Any], verification: Dict[str, Any]) -> Asset:
         marketplace = Marketplace(raw_result.get("marketplace", "chrome"))
         users = verification.get("estimated_users", 5000)
@@ -147,6 +202,7 @@ Respond ONLY with valid JSON, no markdown."""
             estimated_valuation=valuation,
             distress_signals=distress_signals,
             distress_score=distress_score,
-            verified=verification.get("is_valid_asset", False),
+            verified=is_confirmed(verification),
+            verified_by=verification.get("verified_by"),
             verification_notes=verification.get("verification_notes", "")
         )
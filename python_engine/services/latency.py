@@ -0,0 +1,150 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, Callable, Awaitable, TypeVar
+
+
+T = TypeVar("T")
+
+HEDGE_QUANTILE = 0.95
+# Below this many samples the p95 is noise, so we neither hedge nor trust it for planning.
+MIN_SAMPLES = 20
+# Hedges are extra paid calls; cap them at this share of primary calls.
+HEDGE_MAX_FRACTION = float(os.getenv("ENGINE_HEDGE_MAX_FRACTION", "0.1"))
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+
+class Deadline:
+    """A latency budget measured from when the request arrived.
+
+    ``started_at`` is the monotonic arrival time stamped by the admission
+    middleware, so time spent queueing for a slot is charged to the budget.
+    """
+
+    def __init__(self, seconds: float, started_at: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = (time.monotonic() if started_at is None else started_at) + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class LatencyTracker:
+    """Rolling latency samples for one upstream, used to plan around deadlines and to time hedges."""
+
+    def __init__(self, name: str, default_seconds: float, window: int = 500):
+        self.name = name
+        self.default_seconds = default_seconds
+        self.samples: deque = deque(maxlen=window)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def count_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def record(self, seconds: float, hedge_won: bool = False) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def estimate(self, q: float = HEDGE_QUANTILE) -> float:
+        observed = self.quantile(q)
+        return observed if observed is not None else self.default_seconds
+
+    def take_hedge(self, can_hedge: Optional[Callable[[], bool]] = None) -> bool:
+        with self._lock:
+            if self.hedges >= HEDGE_MAX_FRACTION * self.calls:
+                return False
+        if can_hedge is not None and not can_hedge():
+            return False
+        with self._lock:
+            self.hedges += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.quantile(0.5)
+        p95 = self.quantile(HEDGE_QUANTILE)
+        return {
+            "samples": len(self.samples),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+async def hedged(factory: Callable[[], Awaitable[T]], tracker: LatencyTracker) -> T:
+    """Await ``factory()``; if it outlives the tracker's p95, race a duplicate and keep the first success."""
+    tracker.count_call()
+    started = time.monotonic()
+    tasks = [asyncio.ensure_future(factory())]
+    delay = tracker.quantile(HEDGE_QUANTILE)
+    error: Optional[BaseException] = None
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and tracker.take_hedge():
+                tasks.append(asyncio.ensure_future(factory()))
+        pending = list(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    tracker.record(time.monotonic() - started, hedge_won=task is not tasks[0])
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def hedged_sync(fn: Callable[[], T], tracker: LatencyTracker, can_hedge: Optional[Callable[[], bool]] = None) -> T:
+    """Thread-pool counterpart of :func:`hedged` for blocking clients.
+
+    A losing call cannot be interrupted, so it finishes in the background
+    and its result is dropped.
+    """
+    global _hedge_pool
+    if _hedge_pool is None:
+        _hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+    tracker.count_call()
+    started = time.monotonic()
+    futures = [_hedge_pool.submit(fn)]
+    delay = tracker.quantile(HEDGE_QUANTILE)
+    if delay is not None:
+        done, _ = wait(futures, timeout=delay)
+        if not done and tracker.take_hedge(can_hedge):
+            futures.append(_hedge_pool.submit(fn))
+
+    error: Optional[BaseException] = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                tracker.record(time.monotonic() - started, hedge_won=future is not futures[0])
+                return future.result()
+            error = error or future.exception()
+    raise error
@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from typing import Optional, List, Dict, Any, Iterable
+from ..models import Asset, Marketplace
+
+
+DEFAULT_INDEX_DB = os.path.join(os.getenv("TMPDIR", "/tmp"), "asset_hunter_index.db")
+# A title hit counts double a snippet hit.
+TITLE_WEIGHT = 2.0
+SNIPPET_WEIGHT = 1.0
+MAX_MATCHES = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_assets (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    marketplace TEXT NOT NULL,
+    record TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS asset_text USING fts5(title, snippet, tokenize='porter unicode61');
+"""
+
+
+def match_expression(query: str) -> Optional[str]:
+    """OR of the query's words, quoted so user input can never be read as FTS syntax."""
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return None
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+class LocalIndex:
+    """BM25 full-text index over the title and snippet of every asset the engine has verified.
+
+    Backed by an SQLite FTS5 table next to the latest record for each
+    asset, so it is updated incrementally as scans land, survives
+    restarts, and is shared by every worker process like the state store.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("ENGINE_INDEX_DB") or DEFAULT_INDEX_DB
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, assets: Iterable[Asset], fresh: bool = True, replace: bool = True) -> int:
+        """Index or re-index ``assets``; returns how many were written.
+
+        Assets added with ``fresh=False`` are searchable but never count as
+        recently verified for :meth:`fresh`. With ``replace=False`` assets
+        already in the index are left as they are.
+        """
+        conn = self._conn()
+        now = time.time() if fresh else 0.0
+        on_conflict = (
+            "DO UPDATE SET marketplace = excluded.marketplace, "
+            "record = excluded.record, indexed_at = excluded.indexed_at"
+            if replace else "DO NOTHING"
+        )
+        written = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for asset in assets:
+                row = conn.execute(
+                    "INSERT INTO indexed_assets (id, marketplace, record, indexed_at) VALUES (?, ?, ?, ?) "
+                    f"ON CONFLICT(id) {on_conflict} RETURNING rowid",
+                    (asset.id, asset.marketplace.value, asset.model_dump_json(), now),
+                ).fetchone()
+                if row is None:
+                    continue
+                rowid = row[0]
+                conn.execute("DELETE FROM asset_text WHERE rowid = ?", (rowid,))
+                conn.execute(
+                    "INSERT INTO asset_text (rowid, title, snippet) VALUES (?, ?, ?)",
+                    (rowid, asset.name, asset.description or ""),
+                )
+                written += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return written
+
+    def search(
+        self,
+        query: str,
+        marketplaces: Optional[List[Marketplace]] = None,
+        limit: int = MAX_MATCHES,
+    ) -> List[Asset]:
+        """Indexed assets matching ``query``, best BM25 score first."""
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        sql = (
+            "SELECT a.record FROM asset_text JOIN indexed_assets a ON a.rowid = asset_text.rowid "
+            "WHERE asset_text MATCH ?"
+        )
+        params: List[Any] = [expression]
+        if marketplaces:
+            sql += f" AND a.marketplace IN ({', '.join('?' * len(marketplaces))})"
+            params.extend(m.value for m in marketplaces)
+        # bm25() is lower-is-better.
+        sql += " ORDER BY bm25(asset_text, ?, ?) LIMIT ?"
+        params.extend([TITLE_WEIGHT, SNIPPET_WEIGHT, limit])
+        rows = self._conn().execute(sql, params).fetchall()
+        return [Asset.model_validate_json(r[0]) for r in rows]
+
+    def fresh(self, asset_ids: List[str], max_age_seconds: float) -> Dict[str, Asset]:
+        """Indexed assets among ``asset_ids`` verified within the last ``max_age_seconds``."""
+        if not asset_ids:
+            return {}
+        rows = self._conn().execute(
+            f"SELECT id, record FROM indexed_assets WHERE indexed_at >= ? "
+            f"AND id IN ({', '.join('?' * len(asset_ids))})",
+            [time.time() - max_age_seconds, *asset_ids],
+        ).fetchall()
+        return {r[0]: Asset.model_validate_json(r[1]) for r in rows}
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        by_marketplace = dict(conn.execute(
+            "SELECT marketplace, COUNT(*) FROM indexed_assets GROUP BY marketplace"
+        ).fetchall())
+        return {
+            "path": self.path,
+            "assets": sum(by_marketplace.values()),
+            "by_marketplace": by_marketplace,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+def default_local_index() -> Optional[LocalIndex]:
+    if os.getenv("ENGINE_LOCAL_INDEX", "1").lower() not in ("1", "true", "yes"):
+        return None
+    return LocalIndex()
@@ -0,0 +1,425 @@
+import os
+import re
+import json
+import time
+import uuid
+import bisect
+import threading
+from datetime import datetime, date
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+from ..models import DistressSignal
+from .shared_store import SharedStore, get_store
+
+
+HISTORY_DIR = os.getenv("ENGINE_HISTORY_DIR")
+# This many segments of one size tier are merged into a single segment of the next tier.
+COMPACTION_FANIN = int(os.getenv("ENGINE_HISTORY_COMPACTION_FANIN", "8"))
+COMPACTION_LEASE = "metric_history_compaction"
+# Rows per record batch; each batch's first and last asset id are kept in the footer so reads skip the rest.
+BATCH_ROWS = 4096
+_TIER = re.compile(r"L(\d+)-")
+
+# Stored as integers so deltas are exact: rating in hundredths, last_updated in days since epoch.
+# Zero means "not observed"; reads carry the previous known value forward.
+METRICS = ("users", "reviews_count", "rating", "last_updated")
+
+NO_UPDATES_DAYS = 365
+# Without a published update date, flat users and reviews for this long count as inactivity.
+STALE_METRICS_DAYS = 180
+TREND_WINDOW_DAYS = 90
+MIN_TREND_SPAN_DAYS = 14
+MIN_TREND_OBSERVATIONS = 3
+RATING_DROP = 0.2
+REVIEW_VELOCITY_DROP = 0.5
+
+DAY = 86400
+_EPOCH = date(1970, 1, 1)
+
+
+def parse_day(value: Optional[str]) -> int:
+    """Days since epoch for a listing's "last updated" text, or 0 if it can't be read."""
+    if not value:
+        return 0
+    text = re.sub(r"\.(?=\s)", "", value.strip())
+    if re.match(r"\d{4}-\d{2}-\d{2}", text):
+        text = text[:10]
+    for fmt in ("%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y"):
+        try:
+            return (datetime.strptime(text, fmt).date() - _EPOCH).days
+        except ValueError:
+            continue
+    return 0
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("asset", pa.string()),
+        ("t", pa.int64()),
+        ("users", pa.int64()),
+        ("reviews_count", pa.int64()),
+        ("rating", pa.int64()),
+        ("last_updated", pa.int64()),
+    ])
+
+
+def _groups(keys):
+    """Start offsets and lengths of runs of equal keys in a sorted array."""
+    import numpy as np
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+    lengths = np.diff(np.r_[starts, len(keys)])
+    return starts, lengths
+
+
+def _encode(keys, columns: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-asset delta encoding: each asset's first row is absolute, later rows are differences."""
+    import numpy as np
+
+    starts, _ = _groups(keys)
+    encoded = {}
+    for name, values in columns.items():
+        delta = np.empty_like(values)
+        if len(values):
+            delta[0] = values[0]
+            delta[1:] = values[1:] - values[:-1]
+            delta[starts] = values[starts]
+        encoded[name] = delta
+    return encoded
+
+
+def _decode(keys, columns: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of _encode: a cumulative sum that restarts at every asset boundary."""
+    import numpy as np
+
+    starts, lengths = _groups(keys)
+    decoded = {}
+    for name, deltas in columns.items():
+        total = np.cumsum(deltas)
+        before = total[starts] - deltas[starts] if len(starts) else total[:0]
+        decoded[name] = total - np.repeat(before, lengths)
+    return decoded
+
+
+def _carry_forward(values, starts):
+    """Replace zeros with the previous known value of the same asset."""
+    import numpy as np
+
+    idx = np.arange(len(values))
+    is_start = np.zeros(len(values), dtype=bool)
+    is_start[starts] = True
+    idx = np.where((values != 0) | is_start, idx, 0)
+    return values[np.maximum.accumulate(idx)]
+
+
+class MetricHistory:
+    """Append-only history of per-asset listing metrics.
+
+    Every write is one small segment file, sorted by asset and time and
+    delta-encoded per asset, so unchanged metrics store as zeros and the
+    zstd-compressed columns stay a few bytes per observation. Segments are
+    merged in tiers: ``fanin`` segments of one tier become one of the next,
+    so each observation is rewritten about log_fanin(segments) times. Every
+    segment's footer records its time range and the asset range of each
+    record batch, so reads decompress only batches that can hold the
+    requested assets and decode them with vectorized cumulative sums.
+    """
+
+    def __init__(self, root: str, store: Optional[SharedStore] = None, fanin: int = COMPACTION_FANIN):
+        self.root = root
+        self.fanin = max(2, fanin)
+        self._store = store
+        self._lock = threading.Lock()
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    @property
+    def store(self) -> SharedStore:
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def _segments(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            os.path.join(self.root, name) for name in os.listdir(self.root)
+            if name.endswith(".arrow") and not name.startswith(".")
+        )
+
+    def _write(self, keys, columns: Dict[str, Any], name: str) -> str:
+        import numpy as np
+        import pyarrow as pa
+
+        encoded = _encode(keys, columns)
+        # Batches are cut only where an asset's run starts, so each decodes on its own.
+        starts, _ = _groups(keys)
+        cuts = starts[np.r_[True, np.diff(starts // BATCH_ROWS) > 0]] if len(starts) else starts
+        bounds = list(zip(cuts.tolist(), np.r_[cuts[1:], len(keys)].tolist()))
+        t = columns["t"]
+        index = {
+            "t": [int(t.min()), int(t.max())] if len(t) else [0, 0],
+            "batches": [[str(keys[lo]), str(keys[hi - 1])] for lo, hi in bounds],
+        }
+        schema = _schema().with_metadata({"index": json.dumps(index)})
+        table = pa.Table.from_arrays(
+            [pa.array(keys, pa.string())] + [pa.array(encoded[c]) for c in schema.names[1:]],
+            schema=schema,
+        )
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, name)
+        tmp_path = os.path.join(self.root, f".{name}.tmp")
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, schema, options=options) as writer:
+                for lo, hi in bounds:
+                    writer.write_table(table.slice(lo, hi - lo))
+        os.replace(tmp_path, path)
+        return path
+
+    def record(self, observations: Iterable[Dict[str, Any]], observed_at: Optional[float] = None) -> int:
+        """Append one observation per dict (``id``, ``users``, ``reviews_count``, ``rating``, ``last_updated``)."""
+        import numpy as np
+
+        t = int(observed_at or time.time())
+        rows = {}
+        for obs in observations:
+            rows[obs["id"]] = (
+                int(obs.get("users") or 0),
+                int(obs.get("reviews_count") or 0),
+                int(round((obs.get("rating") or 0) * 100)),
+                parse_day(obs.get("last_updated")),
+            )
+        if not rows:
+            return 0
+
+        keys = np.array(sorted(rows), dtype=object)
+        values = np.array([rows[k] for k in keys], dtype=np.int64).reshape(len(keys), len(METRICS))
+        columns = {"t": np.full(len(keys), t, dtype=np.int64)}
+        columns.update({name: values[:, i] for i, name in enumerate(METRICS)})
+
+        with self._lock:
+            self._write(keys, columns, f"{t:012d}-{uuid.uuid4().hex[:8]}.arrow")
+        self.compact()
+        return len(keys)
+
+    def _read(self, path: str, wanted: Optional[List[str]], since: Optional[float], until: Optional[float]):
+        """The batches of one segment that can hold ``wanted`` assets in [since, until], as a table."""
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            metadata = reader.schema.metadata or {}
+            if b"index" not in metadata:
+                # Written before segments carried an index.
+                return reader.read_all()
+            index = json.loads(metadata[b"index"])
+            low, high = index["t"]
+            if (since is not None and high < since) or (until is not None and low > until):
+                return None
+            batches = []
+            for i, (first, last) in enumerate(index["batches"]):
+                if wanted is not None:
+                    at = bisect.bisect_left(wanted, first)
+                    if at == len(wanted) or wanted[at] > last:
+                        continue
+                batches.append(reader.get_batch(i))
+            return pa.Table.from_batches(batches, schema=reader.schema) if batches else None
+
+    def _load(
+        self,
+        asset_ids: Optional[List[str]] = None,
+        paths: Optional[List[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """Decoded observations sorted by (asset, t), optionally limited to ``asset_ids``.
+
+        ``since``/``until`` only skip whole segments; callers still filter rows by time.
+        """
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        keys_parts, column_parts = [], {name: [] for name in _schema().names[1:]}
+        wanted = sorted(set(asset_ids)) if asset_ids is not None else None
+        for path in paths if paths is not None else self._segments():
+            try:
+                table = self._read(path, wanted, since, until)
+            except FileNotFoundError:
+                # Folded into a compacted segment by another worker since we listed the directory.
+                continue
+            if table is not None and wanted is not None:
+                # Whole asset runs survive the filter, so each run still starts with its absolute row.
+                table = table.filter(pc.is_in(table["asset"], value_set=pa.array(wanted, pa.string())))
+            if table is None or table.num_rows == 0:
+                continue
+            keys = table["asset"].to_numpy(zero_copy_only=False)
+            decoded = _decode(keys, {name: table[name].to_numpy() for name in column_parts})
+            keys_parts.append(keys)
+            for name in column_parts:
+                column_parts[name].append(decoded[name])
+
+        if not keys_parts:
+            return np.array([], dtype=object), {name: np.array([], dtype=np.int64) for name in column_parts}
+
+        keys = np.concatenate(keys_parts)
+        columns = {name: np.concatenate(parts) for name, parts in column_parts.items()}
+        order = np.lexsort((columns["t"], keys))
+        keys = keys[order]
+        return keys, {name: values[order] for name, values in columns.items()}
+
+    def _full_tier(self) -> Optional[Tuple[int, List[str]]]:
+        tiers: Dict[int, List[str]] = {}
+        for path in self._segments():
+            match = _TIER.match(os.path.basename(path))
+            tiers.setdefault(int(match.group(1)) if match else 0, []).append(path)
+        full = sorted(tier for tier, paths in tiers.items() if len(paths) >= self.fanin)
+        return (full[0], tiers[full[0]]) if full else None
+
+    def compact(self) -> bool:
+        """Merge each tier that has ``fanin`` segments into one segment of the next tier.
+
+        New writes during compaction are left alone; a shared-store lease
+        keeps other workers from merging the same segments.
+        """
+        if self._full_tier() is None:
+            return False
+        if not self.store.acquire_lease(COMPACTION_LEASE, self.owner, 600):
+            return False
+        try:
+            compacted = False
+            while True:
+                full = self._full_tier()
+                if full is None:
+                    return compacted
+                tier, paths = full
+                keys, columns = self._load(paths=paths)
+                self._write(keys, columns, f"L{tier + 1}-{int(time.time()):012d}-{uuid.uuid4().hex[:8]}.arrow")
+                for path in paths:
+                    os.remove(path)
+                print(f"[History] Compacted {len(paths)} tier-{tier} segments ({len(keys)} observations)")
+                compacted = True
+        finally:
+            self.store.release_lease(COMPACTION_LEASE, self.owner)
+
+    def history(
+        self,
+        asset_id: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        keys, columns = self._load(
+            [asset_id],
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+        )
+        t = columns["t"]
+        mask = t >= 0
+        if since:
+            mask &= t >= since.timestamp()
+        if until:
+            mask &= t <= until.timestamp()
+        return [
+            {
+                "observed_at": datetime.utcfromtimestamp(int(t[i])).isoformat(),
+                "users": int(columns["users"][i]) or None,
+                "reviews_count": int(columns["reviews_count"][i]) or None,
+                "rating": float(columns["rating"][i]) / 100 if columns["rating"][i] else None,
+                "last_updated": (
+                    date.fromordinal(_EPOCH.toordinal() + int(columns["last_updated"][i])).isoformat()
+                    if columns["last_updated"][i] else None
+                ),
+            }
+            for i in mask.nonzero()[0]
+        ]
+
+    def trend_signals(self, asset_ids: List[str], now: Optional[float] = None) -> Dict[str, Dict[DistressSignal, bool]]:
+        """Decide NO_UPDATES and DECLINING_REVIEWS from history where there is enough of it.
+
+        A signal is only present in an asset's result once the history can
+        settle it either way; callers keep their own guess for the rest.
+        """
+        import numpy as np
+
+        keys, columns = self._load(asset_ids)
+        if not len(keys):
+            return {}
+        now = now or time.time()
+        starts, lengths = _groups(keys)
+        ends = starts + lengths - 1
+        t = columns["t"]
+        users = _carry_forward(columns["users"], starts)
+        reviews = _carry_forward(columns["reviews_count"], starts)
+        rating = _carry_forward(columns["rating"], starts)
+        updated = _carry_forward(columns["last_updated"], starts)
+
+        # Position of each asset's first observation inside the trend window, and of its midpoint.
+        group_id = np.repeat(np.arange(len(starts)), lengths)
+        key = group_id * (1 << 40) + t
+        first = np.searchsorted(key, np.arange(len(starts)) * (1 << 40) + int(now - TREND_WINDOW_DAYS * DAY))
+        first = np.minimum(first, ends)
+        mid = np.searchsorted(key, np.arange(len(starts)) * (1 << 40) + (t[first] + t[ends]) // 2)
+        mid = np.clip(mid, first, ends)
+
+        span = (t[ends] - t[first]) / DAY
+        enough = (span >= MIN_TREND_SPAN_DAYS) & (ends - first + 1 >= MIN_TREND_OBSERVATIONS)
+        rating_drop = (rating[first] > 0) & (rating[first] - rating[ends] >= RATING_DROP * 100)
+        early_days = np.maximum((t[mid] - t[first]) / DAY, 1e-9)
+        late_days = np.maximum((t[ends] - t[mid]) / DAY, 1e-9)
+        early_velocity = (reviews[mid] - reviews[first]) / early_days
+        late_velocity = (reviews[ends] - reviews[mid]) / late_days
+        velocity_drop = (reviews[first] > 0) & (early_velocity > 0) & (late_velocity < early_velocity * REVIEW_VELOCITY_DROP)
+        declining = enough & (rating_drop | velocity_drop | (reviews[ends] < reviews[first]))
+
+        today = int(now // DAY)
+        stale_update = (updated[ends] > 0) & (today - updated[ends] >= NO_UPDATES_DAYS)
+        full_span = (t[ends] - t[starts]) / DAY
+        flat = (
+            (updated[ends] == 0)
+            & (full_span >= STALE_METRICS_DAYS)
+            & (users[ends] == users[starts])
+            & (reviews[ends] == reviews[starts])
+        )
+        inactive = stale_update | flat
+        knows_activity = (updated[ends] > 0) | (full_span >= STALE_METRICS_DAYS)
+
+        decisions: Dict[str, Dict[DistressSignal, bool]] = {}
+        for i, start in enumerate(starts):
+            decided = {}
+            if knows_activity[i]:
+                decided[DistressSignal.NO_UPDATES] = bool(inactive[i])
+            if enough[i]:
+                decided[DistressSignal.DECLINING_REVIEWS] = bool(declining[i])
+            if decided:
+                decisions[str(keys[start])] = decided
+        return decisions
+
+    def stats(self) -> Dict[str, Any]:
+        import pyarrow as pa
+
+        paths = self._segments()
+        rows = 0
+        for path in paths:
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                rows += sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        size = sum(os.path.getsize(p) for p in paths)
+        return {
+            "segments": len(paths),
+            "observations": rows,
+            "bytes": size,
+            "bytes_per_observation": round(size / rows, 2) if rows else None,
+        }
+
+
+def default_metric_history() -> Optional[MetricHistory]:
+    if not HISTORY_DIR:
+        return None
+    try:
+        import numpy  # noqa: F401
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("[History] ENGINE_HISTORY_DIR is set but numpy/pyarrow are not installed; history disabled")
+        return None
+    return MetricHistory(HISTORY_DIR)
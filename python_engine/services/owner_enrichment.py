@@ -0,0 +1,191 @@
+import os
+import re
+import asyncio
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+from typing import Optional, List, Dict, Any, Callable, Awaitable
+from ..models import Asset, Marketplace
+from .shared_store import SharedStore, get_store
+
+
+CONTACT_NAMESPACE = "owner_contacts"
+DOMAIN_NAMESPACE = "owner_domains"
+CONTACT_TTL_SECONDS = 7 * 24 * 3600
+# Lookups that found nothing are retried sooner; developers add contact details more often than they remove them.
+MISS_TTL_SECONDS = 24 * 3600
+ENRICH_CONCURRENCY = int(os.getenv("ENGINE_ENRICH_CONCURRENCY", "8"))
+CONTACT_PATHS = ("", "/contact", "/about")
+SNIPPET_DEVELOPER_PATTERN = r'(?:Offered|Developed|Published) by[:\s]+([A-Z][\w&.\' -]{1,60}?)\s*(?:[·|,;]|\.\s|$)'
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r'\s+', " ", name).strip().lower()
+
+
+def developer_key(asset: Asset) -> Optional[str]:
+    """Identify the developer from what the asset already carries, without fetching anything."""
+    if asset.developer:
+        return "name:" + _normalize(asset.developer)
+    match = re.search(SNIPPET_DEVELOPER_PATTERN, asset.description or "")
+    if match:
+        return "name:" + _normalize(match.group(1))
+    query = parse_qs(urlparse(asset.url).query)
+    if asset.marketplace == Marketplace.VSCODE and query.get("itemName"):
+        return "vscode:" + query["itemName"][0].split(".")[0].lower()
+    if asset.marketplace == Marketplace.ANDROID and query.get("id"):
+        # Dropping only the app's own segment keeps com.acme.notes and com.acme.todo together
+        # without lumping every com.google.android.* publisher into one developer.
+        parts = query["id"][0].lower().split(".")
+        if len(parts) >= 3:
+            return "android:" + ".".join(parts[:-1])
+    return None
+
+
+class OwnerEnricher:
+    """Fills in developer identity and contact details for verified assets.
+
+    Contacts are cached per developer and per developer domain in the
+    shared store, and concurrent assets from the same developer wait on a
+    single lookup, so a scan costs roughly one lookup per unique developer.
+    Listing pages come through the direct fetcher and its parsers; a
+    developer's own site is only fetched when the listing has no address.
+    """
+
+    def __init__(self, fetcher, store: Optional[SharedStore] = None, concurrency: int = ENRICH_CONCURRENCY):
+        self.fetcher = fetcher
+        self._store = store
+        self.concurrency = concurrency
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Counter = Counter()
+
+    @property
+    def store(self) -> SharedStore:
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    @property
+    def limit(self) -> asyncio.Semaphore:
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.concurrency)
+        return self._limit
+
+    async def enrich(self, assets: List[Asset], timeout: Optional[float] = None) -> int:
+        """Set ``developer`` and ``developer_email`` in place; returns how many assets got an address.
+
+        Assets still unresolved at ``timeout`` are left as they are. Their
+        lookups keep running and fill the cache for the next scan.
+        """
+        pending = [a for a in assets if not a.developer_email]
+        if not pending:
+            return 0
+        tasks = [asyncio.ensure_future(self.contact_for(a)) for a in pending]
+        _, not_done = await asyncio.wait(tasks, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        return sum(1 for a in pending if a.developer_email)
+
+    async def contact_for(self, asset: Asset) -> Dict[str, Optional[str]]:
+        listing = None
+        key = developer_key(asset)
+        if key is None:
+            # Nothing short of the listing page names the developer.
+            listing = await self._listing(asset.url, asset.marketplace)
+            if listing.get("developer_id"):
+                key = "play:" + listing["developer_id"]
+            elif listing.get("developer"):
+                key = "name:" + _normalize(listing["developer"])
+            elif listing.get("developer_website"):
+                key = "host:" + urlparse(listing["developer_website"]).netloc.lower()
+            else:
+                self.stats["unidentified"] += 1
+                asset.developer_email = asset.developer_email or listing.get("developer_email")
+                return {"developer": None, "email": listing.get("developer_email"), "website": None}
+
+        contact = await self._single_flight(
+            CONTACT_NAMESPACE, key, lambda: self._resolve(key, asset, listing)
+        )
+        asset.developer = asset.developer or contact.get("developer")
+        asset.developer_email = asset.developer_email or contact.get("email")
+        return contact
+
+    async def _single_flight(
+        self,
+        namespace: str,
+        key: str,
+        factory: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        cached = await asyncio.to_thread(self.store.cache_get, namespace, key)
+        if cached is not None:
+            self.stats[f"{namespace}_hits"] += 1
+            return cached
+        flight = f"{namespace}:{key}"
+        task = self._inflight.get(flight)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[flight] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight, None))
+        else:
+            self.stats["shared"] += 1
+        # Shielded so a caller giving up does not cancel the lookup for everyone else.
+        return await asyncio.shield(task)
+
+    async def _resolve(self, key: str, asset: Asset, listing: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        from ..scanners.direct_fetch import is_site_url
+
+        self.stats["lookups"] += 1
+        if listing is None:
+            listing = await self._listing(asset.url, asset.marketplace)
+        contact = {
+            "developer": listing.get("developer") or asset.developer,
+            "email": listing.get("developer_email"),
+            "website": listing.get("developer_website"),
+        }
+        if not contact["email"] and contact["website"] and is_site_url(contact["website"]):
+            host = urlparse(contact["website"]).hostname
+            found = await self._single_flight(DOMAIN_NAMESPACE, host, lambda: self._site_email(contact["website"]))
+            contact["email"] = found["email"]
+        ttl = CONTACT_TTL_SECONDS if contact["email"] else MISS_TTL_SECONDS
+        await asyncio.to_thread(self.store.cache_set, CONTACT_NAMESPACE, key, contact, ttl)
+        return contact
+
+    async def _listing(self, url: str, marketplace: Marketplace) -> Dict[str, Any]:
+        from ..scanners.direct_fetch import VALIDATOR_NAMESPACE, PARSER_VERSION
+
+        # Ownership rarely changes, so a listing parsed on an earlier refresh is good enough.
+        cached = await asyncio.to_thread(self.store.cache_get, VALIDATOR_NAMESPACE, url)
+        if cached and cached.get("parser") == PARSER_VERSION:
+            self.stats["listing_cache_hits"] += 1
+            return cached["data"]
+        async with self.limit:
+            self.stats["listing_fetches"] += 1
+            result = await self.fetcher.fetch(url, marketplace)
+        return result["data"] or {}
+
+    async def _site_email(self, website: str) -> Dict[str, Any]:
+        from ..scanners.direct_fetch import extract_emails
+
+        # Only the https host the listing itself links to; get_text refuses anything else.
+        host = urlparse(website).hostname
+        email = None
+        for path in CONTACT_PATHS:
+            async with self.limit:
+                self.stats["site_fetches"] += 1
+                page = await self.fetcher.get_text(f"https://{host}{path}")
+            if not page:
+                continue
+            emails = extract_emails(page)
+            # An address on the developer's own domain beats a generic one.
+            own = [e for e in emails if host.endswith(e.split("@")[1])]
+            email = (own or emails or [None])[0]
+            if email:
+                break
+        result = {"email": email}
+        await asyncio.to_thread(
+            self.store.cache_set, DOMAIN_NAMESPACE, host, result, CONTACT_TTL_SECONDS if email else MISS_TTL_SECONDS
+        )
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._inflight), **self.stats}
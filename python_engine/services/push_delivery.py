@@ -0,0 +1,305 @@
+import os
+import hmac
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+from collections import Counter
+from functools import partial
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Iterable
+from urllib.parse import urlsplit
+from ..models import Asset
+from .shared_store import SharedStore, get_store
+
+
+SUBSCRIPTION_NAMESPACE = "push_subscriptions"
+SUBSCRIPTION_TTL_SECONDS = 30 * 24 * 3600
+
+PUSH_BATCH_SIZE = int(os.getenv("ENGINE_PUSH_BATCH_SIZE", "50"))
+PUSH_WINDOW_SECONDS = float(os.getenv("ENGINE_PUSH_WINDOW_SECONDS", "2"))
+PUSH_MAX_ATTEMPTS = int(os.getenv("ENGINE_PUSH_MAX_ATTEMPTS", "6"))
+PUSH_CONCURRENCY = int(os.getenv("ENGINE_PUSH_CONCURRENCY", "8"))
+PUSH_SECRET = os.getenv("ENGINE_PUSH_SECRET")
+PUSH_TIMEOUT_SECONDS = 10.0
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 60.0
+# Client errors other than these will not succeed on retry.
+RETRYABLE_STATUS = {408, 409, 425, 429}
+# Hosts the engine will push to. Defaults to the Node server running beside it.
+CALLBACK_HOSTS = {
+    h.strip().lower() for h in os.getenv("ENGINE_CALLBACK_HOSTS", "localhost,127.0.0.1").split(",") if h.strip()
+}
+# Plain http is only allowed where it never leaves the machine.
+LOOPBACK_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+def is_allowed_callback(url: str, hosts: Iterable[str] = CALLBACK_HOSTS) -> bool:
+    """Whether ``url`` is https (or loopback http) to an allowlisted host, with no credentials."""
+    try:
+        parts = urlsplit(url)
+        parts.port  # Raises on a malformed port.
+    except ValueError:
+        return False
+    host = (parts.hostname or "").lower()
+    if parts.username or parts.password or host not in hosts:
+        return False
+    return parts.scheme == "https" or (parts.scheme == "http" and host in LOOPBACK_HOSTS)
+
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _matches(subscription: Dict[str, Any], asset: Asset) -> bool:
+    if subscription.get("marketplaces") and asset.marketplace.value not in subscription["marketplaces"]:
+        return False
+    if asset.distress_score < subscription.get("min_distress_score", 0):
+        return False
+    min_valuation = subscription.get("min_valuation")
+    if min_valuation is not None and (asset.estimated_valuation or 0) < min_valuation:
+        return False
+    return True
+
+
+class _Buffer:
+    __slots__ = ("callback_url", "assets", "opened_at")
+
+    def __init__(self, callback_url: str):
+        self.callback_url = callback_url
+        self.assets: List[Asset] = []
+        self.opened_at = time.monotonic()
+
+
+class PushDispatcher:
+    """Pushes verified assets to caller-registered callback URLs in batches.
+
+    Assets are buffered per destination (a scan or a subscription) and sent
+    once ``batch_size`` accumulate or the oldest has waited ``window``
+    seconds. Each batch carries a sequence number and an idempotency key
+    that stays the same across retries, so receivers can drop duplicates.
+    Delivery runs in background tasks and never holds up a scan. A scan's
+    final batch waits for its earlier batches to settle and lists any that
+    were given up on, so the receiver can tell a partial result from a
+    complete one.
+    """
+
+    def __init__(
+        self,
+        store: Optional[SharedStore] = None,
+        batch_size: int = PUSH_BATCH_SIZE,
+        window: float = PUSH_WINDOW_SECONDS,
+        max_attempts: int = PUSH_MAX_ATTEMPTS,
+        secret: Optional[str] = PUSH_SECRET,
+        prepare: Optional[Callable[[List[Asset]], Awaitable[None]]] = None,
+    ):
+        self._store = store
+        self.batch_size = batch_size
+        self.window = window
+        self.max_attempts = max_attempts
+        self.secret = secret
+        self.prepare = prepare
+        self._buffers: Dict[str, _Buffer] = {}
+        self._sequences: Counter = Counter()
+        self._deliveries: set = set()
+        # Batches still being delivered per destination, and scan batches given up on.
+        self._pending: Dict[str, set] = {}
+        self._failed: Dict[str, List[int]] = {}
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Counter = Counter()
+
+    @property
+    def store(self) -> SharedStore:
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def subscribe(
+        self,
+        callback_url: str,
+        marketplaces: Optional[List[str]] = None,
+        min_distress_score: int = 0,
+        min_valuation: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        subscription = {
+            "id": uuid.uuid4().hex[:16],
+            "callback_url": callback_url,
+            "marketplaces": marketplaces or [],
+            "min_distress_score": min_distress_score,
+            "min_valuation": min_valuation,
+            "created_at": time.time(),
+        }
+        self.store.cache_set(SUBSCRIPTION_NAMESPACE, subscription["id"], subscription, SUBSCRIPTION_TTL_SECONDS)
+        return subscription
+
+    def unsubscribe(self, subscription_id: str) -> bool:
+        return self.store.cache_delete(SUBSCRIPTION_NAMESPACE, subscription_id)
+
+    def subscriptions(self) -> List[Dict[str, Any]]:
+        return self.store.cache_items(SUBSCRIPTION_NAMESPACE)
+
+    def enqueue(self, destination: str, callback_url: str, assets: List[Asset]) -> None:
+        if not assets:
+            return
+        buffer = self._buffers.setdefault(destination, _Buffer(callback_url))
+        buffer.assets.extend(assets)
+        while len(buffer.assets) >= self.batch_size:
+            batch, buffer.assets = buffer.assets[:self.batch_size], buffer.assets[self.batch_size:]
+            self._send(destination, buffer.callback_url, batch)
+        if not buffer.assets:
+            del self._buffers[destination]
+
+    async def publish(self, assets: List[Asset]) -> None:
+        """Fan assets out to every subscription whose filters they pass."""
+        # Subscriptions live in the shared store so any worker can register them.
+        for subscription in await asyncio.to_thread(self.subscriptions):
+            matching = [a for a in assets if _matches(subscription, a)]
+            self.enqueue(f"subscription:{subscription['id']}", subscription["callback_url"], matching)
+
+    def finish(self, destination: str, callback_url: str, meta: Dict[str, Any]) -> None:
+        """Flush what is left for ``destination`` as its final batch, with summary ``meta``."""
+        buffer = self._buffers.pop(destination, None)
+        self._send(destination, callback_url, buffer.assets if buffer else [], final=True, meta=meta)
+
+    def _send(
+        self,
+        destination: str,
+        callback_url: str,
+        assets: List[Asset],
+        final: bool = False,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._sequences[destination] += 1
+        sequence = self._sequences[destination]
+        if final:
+            del self._sequences[destination]
+            # Receivers mark the destination done only once every batch up to this one has arrived.
+            meta = {**(meta or {}), "batches": sequence}
+        # Random per batch, so workers and restarts never reuse a key the receiver has already seen.
+        key = uuid.uuid4().hex
+        earlier = list(self._pending.get(destination, ())) if final else []
+        task = asyncio.create_task(
+            self._deliver(destination, callback_url, key, sequence, assets, final, meta, earlier)
+        )
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+        if not final:
+            self._pending.setdefault(destination, set()).add(task)
+            task.add_done_callback(partial(self._settled, destination))
+
+    def _settled(self, destination: str, task: asyncio.Task) -> None:
+        pending = self._pending.get(destination)
+        if pending is not None:
+            pending.discard(task)
+            if not pending:
+                del self._pending[destination]
+
+    async def _deliver(
+        self,
+        destination: str,
+        callback_url: str,
+        key: str,
+        sequence: int,
+        assets: List[Asset],
+        final: bool,
+        meta: Optional[Dict[str, Any]],
+        earlier: Optional[List[asyncio.Task]] = None,
+    ) -> bool:
+        from ..serialization import dumps, asset_records
+
+        if self.prepare and assets:
+            await self.prepare(assets)
+
+        kind, _, destination_id = destination.partition(":")
+        if final:
+            if earlier:
+                await asyncio.wait(earlier)
+            failed = self._failed.pop(destination, [])
+            if failed:
+                meta = {**(meta or {}), "failed_batches": sorted(failed)}
+        payload = {
+            "idempotency_key": key,
+            f"{kind}_id": destination_id,
+            "sequence": sequence,
+            "final": final,
+            "assets": asset_records(assets),
+        }
+        if meta:
+            payload.update(meta)
+        body = dumps(payload)
+        headers = {"Content-Type": "application/json", "Idempotency-Key": key}
+        if self.secret:
+            headers["X-Engine-Signature"] = sign(body, self.secret)
+
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(PUSH_CONCURRENCY)
+        async with self._limit:
+            for attempt in range(1, self.max_attempts + 1):
+                delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                try:
+                    response = await self._http().post(callback_url, content=body, headers=headers)
+                    if response.status_code < 300:
+                        self.stats["batches"] += 1
+                        self.stats["assets"] += len(assets)
+                        return True
+                    if response.status_code < 500 and response.status_code not in RETRYABLE_STATUS:
+                        print(f"[Push] {callback_url} rejected batch {sequence} with HTTP {response.status_code}")
+                        break
+                    retry_after = response.headers.get("retry-after")
+                    if retry_after and retry_after.isdigit():
+                        delay = min(RETRY_MAX_SECONDS, float(retry_after))
+                except Exception as e:
+                    print(f"[Push] Error delivering batch {sequence} to {callback_url}: {e}")
+                if attempt < self.max_attempts:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(delay)
+        self.stats["failed"] += 1
+        if kind == "scan" and not final:
+            # Subscriptions never end, so only scans collect failures for their final batch to report.
+            self._failed.setdefault(destination, []).append(sequence)
+        return False
+
+    def _http(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=PUSH_TIMEOUT_SECONDS)
+        return self._client
+
+    def start(self) -> None:
+        if not self.secret:
+            print("[Push] Warning: ENGINE_PUSH_SECRET is not set; batches go out unsigned and receivers will reject them")
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.window / 2)
+            now = time.monotonic()
+            for destination, buffer in list(self._buffers.items()):
+                if now - buffer.opened_at >= self.window:
+                    del self._buffers[destination]
+                    self._send(destination, buffer.callback_url, buffer.assets)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for destination, buffer in list(self._buffers.items()):
+            self._send(destination, buffer.callback_url, buffer.assets)
+        self._buffers.clear()
+        if self._deliveries:
+            await asyncio.wait(list(self._deliveries), timeout=timeout)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "buffered_destinations": len(self._buffers),
+            "buffered_assets": sum(len(b.assets) for b in self._buffers.values()),
+            "in_flight": len(self._deliveries),
+            **self.stats,
+        }
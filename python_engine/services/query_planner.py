@@ -0,0 +1,126 @@
+import math
+from typing import Optional, List, Dict, Any, Tuple
+from ..models import Marketplace
+from .shared_store import SharedStore, get_store
+
+
+YIELD_NAMESPACE = "serpapi_yield"
+YIELD_TTL_SECONDS = 30 * 24 * 3600
+
+# Fraction of organic results assumed to pass a marketplace's url_pattern before we have data.
+DEFAULT_YIELD = 0.6
+LOW_YIELD_THRESHOLD = 0.4
+MIN_YIELD = 0.1
+YIELD_EWMA_ALPHA = 0.3
+
+MAX_SITES_PER_QUERY = 3
+MAX_PAGES = 3
+SERPAPI_MAX_NUM = 100
+
+
+class PlannedQuery:
+    def __init__(self, marketplaces: List[Marketplace], q: str, num: int, engine: str = "google"):
+        self.marketplaces = marketplaces
+        self.q = q
+        self.num = num
+        self.engine = engine
+
+    def __repr__(self) -> str:
+        return f"PlannedQuery({[m.value for m in self.marketplaces]}, num={self.num}, q={self.q!r})"
+
+
+class QueryPlanner:
+    """Packs SerpAPI searches and sizes them from each marketplace's observed filter yield."""
+
+    def __init__(self, search_config: Dict[Marketplace, Dict[str, Any]], store: Optional[SharedStore] = None):
+        self.search_config = search_config
+        self._store = store
+
+    @property
+    def store(self) -> SharedStore:
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def get_yield(self, marketplace: Marketplace) -> float:
+        stats = self.store.cache_get(YIELD_NAMESPACE, marketplace.value)
+        return stats["yield"] if stats else DEFAULT_YIELD
+
+    def record_yield(self, marketplace: Marketplace, returned: int, valid: int) -> None:
+        if returned <= 0:
+            return
+        observed = valid / returned
+
+        def update(stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            if not stats:
+                return {"yield": round(observed, 4), "samples": 1}
+            blended = (1 - YIELD_EWMA_ALPHA) * stats["yield"] + YIELD_EWMA_ALPHA * observed
+            return {"yield": round(blended, 4), "samples": stats["samples"] + 1}
+
+        # Concurrent searches record yields for the same marketplace, so the read-modify-write is atomic.
+        self.store.cache_update(YIELD_NAMESPACE, marketplace.value, update, YIELD_TTL_SECONDS)
+
+    def build_query(self, query: str, marketplaces: List[Marketplace]) -> str:
+        if len(marketplaces) == 1:
+            config = self.search_config[marketplaces[0]]
+            parts = [f"site:{config['site']}", query, config.get("query_suffix", "")]
+            return " ".join(p for p in parts if p)
+        # Each site keeps its own suffix inside its clause, so packing does not change what it matches.
+        clauses = []
+        for m in marketplaces:
+            config = self.search_config[m]
+            suffix = config.get("query_suffix")
+            clauses.append(f"(site:{config['site']} ({suffix}))" if suffix else f"site:{config['site']}")
+        packed = "(" + " OR ".join(clauses) + ")"
+        return f"{packed} {query}" if query else packed
+
+    def engine(self, marketplace: Marketplace) -> str:
+        return self.search_config[marketplace].get("engine", "google")
+
+    def page_size(self, target: int, expected_yield: float) -> int:
+        return min(SERPAPI_MAX_NUM, max(target, math.ceil(target / max(expected_yield, MIN_YIELD))))
+
+    def plan(self, query: str, marketplaces: List[Marketplace], target: int) -> List[PlannedQuery]:
+        solo: List[Marketplace] = []
+        low_yield: List[Marketplace] = []
+        for m in marketplaces:
+            if m not in self.search_config:
+                continue
+            (low_yield if self.get_yield(m) < LOW_YIELD_THRESHOLD else solo).append(m)
+
+        plans = [
+            PlannedQuery([m], self.build_query(query, [m]), self.page_size(target, self.get_yield(m)), self.engine(m))
+            for m in solo
+        ]
+
+        # Only marketplaces searched through the same engine can share a query.
+        by_engine: Dict[str, List[Marketplace]] = {}
+        for m in sorted(low_yield, key=self.get_yield):
+            by_engine.setdefault(self.engine(m), []).append(m)
+        for engine, members in by_engine.items():
+            for i in range(0, len(members), MAX_SITES_PER_QUERY):
+                group = members[i:i + MAX_SITES_PER_QUERY]
+                group_yield = sum(self.get_yield(m) for m in group) / len(group)
+                num = self.page_size(target * len(group), group_yield)
+                plans.append(PlannedQuery(group, self.build_query(query, group), num, engine))
+
+        return plans
+
+    def trim(self, plans: List[PlannedQuery], max_queries: int) -> Tuple[List[PlannedQuery], List[Marketplace]]:
+        """Keep the ``max_queries`` highest-yield plans; returns them and the marketplaces dropped."""
+        ranked = sorted(
+            plans,
+            key=lambda p: sum(self.get_yield(m) for m in p.marketplaces) / len(p.marketplaces),
+            reverse=True,
+        )
+        kept = ranked[:max(0, max_queries)]
+        dropped = [m for p in ranked[len(kept):] for m in p.marketplaces]
+        return kept, dropped
+
+    def worth_another_page(self, short: List[Marketplace], group_size: int, num: int) -> bool:
+        # Each member gets roughly num / group_size slots on the next page.
+        expected = sum(self.get_yield(m) for m in short) * num / group_size
+        return expected >= 1
+
+    def attribute(self, marketplace: Marketplace, link: str) -> bool:
+        return self.search_config[marketplace]["site"] in link
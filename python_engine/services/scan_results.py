@@ -0,0 +1,112 @@
+import json
+import heapq
+import base64
+import uuid
+from typing import Optional, List, Dict, Any, Tuple
+from ..models import ScanFilters, SortField
+from .shared_store import SharedStore, get_store
+
+
+SCAN_RESULTS_NAMESPACE = "scan_results"
+SCAN_RESULTS_TTL_SECONDS = 6 * 3600
+
+
+def filter_records(records: List[Dict[str, Any]], filters: ScanFilters) -> List[Dict[str, Any]]:
+    marketplaces = {m.value for m in filters.marketplaces}
+
+    def matches(r: Dict[str, Any]) -> bool:
+        if marketplaces and r["marketplace"] not in marketplaces:
+            return False
+        if r["users"] < filters.min_users or r["distress_score"] < filters.min_distress_score:
+            return False
+        if filters.verified_only and not r["verified"]:
+            return False
+        valuation = r.get("estimated_valuation") or 0
+        if filters.min_valuation is not None and valuation < filters.min_valuation:
+            return False
+        if filters.max_valuation is not None and valuation > filters.max_valuation:
+            return False
+        return True
+
+    return [r for r in records if matches(r)]
+
+
+def select_page(
+    records: List[Dict[str, Any]],
+    sort_by: Optional[SortField],
+    descending: bool,
+    offset: int,
+    limit: Optional[int],
+) -> List[Dict[str, Any]]:
+    if limit is None:
+        limit = len(records) - offset
+    if sort_by is None:
+        return records[offset:offset + limit]
+
+    field = sort_by.value
+
+    def key(r: Dict[str, Any]) -> float:
+        return r.get(field) or 0
+
+    # Only the first offset + limit rows are ever ordered, so a page costs O(n log k) instead of a full sort.
+    k = offset + limit
+    top = heapq.nlargest(k, records, key=key) if descending else heapq.nsmallest(k, records, key=key)
+    return top[offset:]
+
+
+def encode_cursor(scan_id: str, offset: int, page_size: int, filters: ScanFilters) -> str:
+    payload = {
+        "scan_id": scan_id,
+        "offset": offset,
+        "page_size": page_size,
+        "filters": filters.model_dump(mode="json"),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int, ScanFilters]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        filters = ScanFilters(**payload["filters"])
+        return payload["scan_id"], int(payload["offset"]), int(payload["page_size"]), filters
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class ScanResultStore:
+    """Keeps each scan's full result set so later pages never re-run the search."""
+
+    def __init__(self, store: Optional[SharedStore] = None):
+        self._store = store
+
+    @property
+    def store(self) -> SharedStore:
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def new_scan_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def save(self, scan_id: str, records: List[Dict[str, Any]], marketplaces_scanned: int) -> None:
+        payload = {"records": records, "marketplaces_scanned": marketplaces_scanned}
+        self.store.cache_set(SCAN_RESULTS_NAMESPACE, scan_id, payload, SCAN_RESULTS_TTL_SECONDS)
+
+    def load(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.cache_get(SCAN_RESULTS_NAMESPACE, scan_id)
+
+    def page(
+        self,
+        scan_id: str,
+        records: List[Dict[str, Any]],
+        filters: ScanFilters,
+        offset: int,
+        page_size: Optional[int],
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        matching = filter_records(records, filters)
+        page = select_page(matching, filters.sort_by, filters.sort_desc, offset, page_size)
+        next_offset = offset + len(page)
+        next_cursor = None
+        if page_size is not None and next_offset < len(matching):
+            next_cursor = encode_cursor(scan_id, next_offset, page_size, filters)
+        return page, len(matching), next_cursor
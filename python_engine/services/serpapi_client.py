@@ -1,9 +1,14 @@
 import os
-import requests
-from typing import List, Dict, Any, Optional
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from ..models import Marketplace, Asset
+from .shared_store import get_store
+from .query_planner import QueryPlanner, PlannedQuery, MAX_PAGES
+from .latency import Deadline, LatencyTracker, hedged_sync
 import hashlib
-from datetime import datetime, timedelta
 
 
 SERPAPI_BASE_URL = "https://serpapi.com/search.json"
@@ -13,6 +18,7 @@ MARKETPLACE_SEARCH_CONFIG = {
         "site": "chromewebstore.google.com",
         "url_pattern": r"chromewebstore\.google\.com/detail/",
         "engine": "google",
+        "query_suffix": "extension OR addon",
     },
     Marketplace.FIREFOX: {
         "site": "addons.mozilla.org",
@@ -23,6 +29,7 @@ MARKETPLACE_SEARCH_CONFIG = {
         "site": "apps.shopify.com",
         "url_pattern": r"apps\.shopify\.com/[a-z0-9-]+$",
         "engine": "google",
+        "query_suffix": "app",
     },
     Marketplace.WORDPRESS: {
         "site": "wordpress.org/plugins",
@@ -81,16 +88,32 @@ MARKETPLACE_SEARCH_CONFIG = {
     },
 }
 
-_cache: Dict[str, tuple] = {}
 CACHE_TTL_HOURS = 6
+SERPAPI_RATE_PER_MINUTE = float(os.getenv("SERPAPI_RATE_PER_MINUTE", "0"))
+# Called with a planned search's marketplaces before each page; True means the page is not worth paying for.
+StopCheck = Callable[[List[Marketplace]], bool]
+
+# Planned searches for one scan run side by side; pages within a search stay sequential.
+SERPAPI_CONCURRENCY = int(os.getenv("SERPAPI_CONCURRENCY", "4"))
+REQUEST_TIMEOUT_SECONDS = 30
 
 
 def _get_cache_key(query: str, marketplace: str) -> str:
     return hashlib.md5(f"{query}:{marketplace}".encode()).hexdigest()
 
 
-def _is_cache_valid(cached_time: datetime) -> bool:
-    return datetime.utcnow() - cached_time < timedelta(hours=CACHE_TTL_HOURS)
+def parse_organic_results(results: List[Dict[str, Any]], marketplace: Marketplace) -> List[Dict[str, Any]]:
+    pattern = MARKETPLACE_SEARCH_CONFIG[marketplace]["url_pattern"]
+    return [
+        {
+            "title": r.get("title", "Unknown"),
+            "url": r.get("link", ""),
+            "snippet": r.get("snippet", ""),
+            "marketplace": marketplace.value,
+        }
+        for r in results
+        if re.search(pattern, r.get("link", ""))
+    ]
 
 
 class SerpAPIClient:
@@ -98,6 +121,11 @@ class SerpAPIClient:
         self.api_key = api_key or os.getenv("SERPAPI_KEY")
         if not self.api_key:
             raise ValueError("SERPAPI_KEY environment variable is required")
+        self.planner = QueryPlanner(MARKETPLACE_SEARCH_CONFIG)
+        self.latency = LatencyTracker("serpapi", default_seconds=3.0)
+        self.calls = 0
+        # Marketplaces are searched from worker threads, so the call count needs a lock.
+        self._calls_lock = threading.Lock()
     
     def search_marketplace(
         self, 
@@ -105,77 +133,179 @@ class SerpAPIClient:
         marketplace: Marketplace, 
         max_results: int = 20
     ) -> List[Dict[str, Any]]:
-        cache_key = _get_cache_key(query, marketplace.value)
+        return self.search_all_marketplaces(query, [marketplace], max_results)
+    
+    def fit_to_deadline(
+        self,
+        query: str,
+        marketplaces: List[Marketplace],
+        max_results_per_marketplace: int,
+        budget_seconds: float,
+    ) -> Tuple[List[Marketplace], List[Marketplace]]:
+        """Split marketplaces into those searchable within ``budget_seconds`` and the low-yield ones to skip."""
+        store = get_store()
+        misses = [
+            m for m in marketplaces
+            if m in MARKETPLACE_SEARCH_CONFIG
+            and store.cache_get("serpapi", _get_cache_key(query, m.value)) is None
+        ]
+        rounds = int(budget_seconds // self.latency.estimate())
+        plans = self.planner.plan(query, misses, max_results_per_marketplace)
+        _, dropped = self.planner.trim(plans, rounds * SERPAPI_CONCURRENCY)
+        return [m for m in marketplaces if m not in dropped], dropped
+    
+    def search_all_marketplaces(
+        self, 
+        query: str, 
+        marketplaces: List[Marketplace],
+        max_results_per_marketplace: int = 20,
+        deadline: Optional[Deadline] = None,
+        on_results: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        should_stop: Optional[StopCheck] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search every marketplace, from cache where possible.
+
+        ``on_results`` receives each marketplace's results as soon as they
+        are in, from whichever thread fetched them. ``should_stop`` lets the
+        caller cancel searches and extra pages it no longer needs.
+        """
+        store = get_store()
+        results_by_marketplace: Dict[Marketplace, List[Dict[str, Any]]] = {}
+        misses: List[Marketplace] = []
         
-        if cache_key in _cache:
-            cached_results, cached_time = _cache[cache_key]
-            if _is_cache_valid(cached_time):
+        for marketplace in marketplaces:
+            if marketplace not in MARKETPLACE_SEARCH_CONFIG:
+                print(f"[SerpAPI] No config for marketplace: {marketplace}")
+                continue
+            cached_results = store.cache_get("serpapi", _get_cache_key(query, marketplace.value))
+            if cached_results is not None:
                 print(f"[SerpAPI] Cache HIT: {marketplace.value} - {query}")
-                return cached_results
+                results_by_marketplace[marketplace] = cached_results
+                if on_results:
+                    on_results(cached_results)
+            else:
+                misses.append(marketplace)
         
-        config = MARKETPLACE_SEARCH_CONFIG.get(marketplace)
-        if not config:
-            print(f"[SerpAPI] No config for marketplace: {marketplace}")
-            return []
+        calls_before = self.calls
+        plans = self.planner.plan(query, misses, max_results_per_marketplace)
         
-        search_query = f"site:{config['site']} {query}" if query else f"site:{config['site']}"
-        
-        if marketplace == Marketplace.CHROME:
-            search_query += " extension OR addon"
-        elif marketplace == Marketplace.SHOPIFY:
-            search_query += " app"
-        
-        try:
-            response = requests.get(
-                SERPAPI_BASE_URL,
-                params={
-                    "q": search_query,
-                    "api_key": self.api_key,
-                    "engine": config["engine"],
-                    "num": max_results,
-                },
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            results = data.get("organic_results", [])
+        def run(plan: PlannedQuery) -> Tuple[Dict[Marketplace, List[Dict[str, Any]]], bool]:
+            stopped = []
             
-            import re
-            pattern = config["url_pattern"]
-            filtered_results = [
-                r for r in results 
-                if re.search(pattern, r.get("link", ""))
-            ]
+            def check(plan_marketplaces: List[Marketplace]) -> bool:
+                if should_stop(plan_marketplaces):
+                    stopped.append(True)
+                    return True
+                return False
             
-            parsed_results = []
-            for r in filtered_results:
-                parsed_results.append({
-                    "title": r.get("title", "Unknown"),
-                    "url": r.get("link", ""),
-                    "snippet": r.get("snippet", ""),
-                    "marketplace": marketplace.value,
-                })
-            
-            _cache[cache_key] = (parsed_results, datetime.utcnow())
-            print(f"[SerpAPI] Found {len(parsed_results)} results for {marketplace.value}")
+            found = self._execute(plan, max_results_per_marketplace, deadline, check if should_stop else None)
+            return found, bool(stopped)
+        
+        if plans:
+            with ThreadPoolExecutor(max_workers=min(SERPAPI_CONCURRENCY, len(plans))) as pool:
+                futures = [pool.submit(run, p) for p in plans]
+                for future in as_completed(futures):
+                    found, stopped = future.result()
+                    for marketplace, parsed_results in found.items():
+                        if not stopped:
+                            # A search cut short is missing pages, so it is not cached as complete.
+                            store.cache_set("serpapi", _get_cache_key(query, marketplace.value), parsed_results, CACHE_TTL_HOURS * 3600)
+                        results_by_marketplace[marketplace] = parsed_results
+                        print(f"[SerpAPI] Found {len(parsed_results)} results for {marketplace.value}")
+                        if on_results:
+                            on_results(parsed_results)
+        if misses:
+            print(f"[SerpAPI] {len(misses)} marketplaces searched with {self.calls - calls_before} calls")
+        
+        all_results = []
+        for marketplace in marketplaces:
+            all_results.extend(results_by_marketplace.get(marketplace, []))
+        
+        return all_results
+    
+    def _execute(
+        self,
+        plan: PlannedQuery,
+        target: int,
+        deadline: Optional[Deadline] = None,
+        should_stop: Optional[StopCheck] = None,
+    ) -> Dict[Marketplace, List[Dict[str, Any]]]:
+        found: Dict[Marketplace, List[Dict[str, Any]]] = {m: [] for m in plan.marketplaces}
+        seen_urls = set()
+        
+        for page in range(MAX_PAGES):
+            if should_stop and should_stop(plan.marketplaces):
+                return {m: r for m, r in found.items() if page > 0}
+            organic = self._fetch(plan.q, plan.num, page * plan.num, deadline, plan.engine)
+            if organic is None:
+                # Nothing is cached for a search that failed outright.
+                return {m: r for m, r in found.items() if page > 0}
             
-            return parsed_results
+            for marketplace in plan.marketplaces:
+                attributed = [r for r in organic if self.planner.attribute(marketplace, r.get("link", ""))]
+                parsed_results = parse_organic_results(attributed, marketplace)
+                self.planner.record_yield(marketplace, len(attributed), len(parsed_results))
+                for r in parsed_results:
+                    if r["url"] not in seen_urls:
+                        seen_urls.add(r["url"])
+                        found[marketplace].append(r)
             
-        except requests.RequestException as e:
-            print(f"[SerpAPI] Error searching {marketplace.value}: {e}")
-            return []
+            # Only pay for another page when filtering left someone short and Google has more.
+            short = [m for m in plan.marketplaces if len(found[m]) < target]
+            if not short or len(organic) < plan.num:
+                break
+            if not self.planner.worth_another_page(short, len(plan.marketplaces), plan.num):
+                break
+            if deadline and deadline.remaining() < self.latency.estimate():
+                break
+        
+        return {m: r[:target] for m, r in found.items()}
     
-    def search_all_marketplaces(
-        self, 
-        query: str, 
-        marketplaces: List[Marketplace],
-        max_results_per_marketplace: int = 20
-    ) -> List[Dict[str, Any]]:
-        all_results = []
+    def _fetch(
+        self,
+        search_query: str,
+        num: int,
+        start: int = 0,
+        deadline: Optional[Deadline] = None,
+        engine: str = "google",
+    ) -> Optional[List[Dict[str, Any]]]:
+        store = get_store()
+        wait = store.acquire_rate("serpapi", SERPAPI_RATE_PER_MINUTE)
+        while wait > 0:
+            if deadline and wait >= deadline.remaining():
+                print(f"[SerpAPI] Rate limited past the scan deadline, skipping {search_query!r}")
+                return None
+            time.sleep(wait)
+            wait = store.acquire_rate("serpapi", SERPAPI_RATE_PER_MINUTE)
         
-        for marketplace in marketplaces:
-            results = self.search_marketplace(query, marketplace, max_results_per_marketplace)
-            all_results.extend(results)
+        import requests
         
-        return all_results
+        params = {
+            "q": search_query,
+            "api_key": self.api_key,
+            "engine": engine,
+            "num": num,
+        }
+        if start:
+            params["start"] = start
+        
+        timeout = REQUEST_TIMEOUT_SECONDS
+        if deadline:
+            timeout = max(1.0, min(timeout, deadline.remaining()))
+        
+        def request() -> List[Dict[str, Any]]:
+            response = requests.get(SERPAPI_BASE_URL, params=params, timeout=timeout)
+            response.raise_for_status()
+            return response.json().get("organic_results", [])
+        
+        def can_hedge() -> bool:
+            # A hedge is another paid search, so only send it if the shared rate limit has room now.
+            return store.acquire_rate("serpapi", SERPAPI_RATE_PER_MINUTE) == 0
+        
+        with self._calls_lock:
+            self.calls += 1
+        try:
+            return hedged_sync(request, self.latency, can_hedge)
+        except requests.RequestException as e:
+            print(f"[SerpAPI] Error searching {search_query!r}: {e}")
+            return None
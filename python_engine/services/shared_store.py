@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional, Any, Dict, List, Callable
+
+
+DEFAULT_STATE_DB = os.path.join(os.getenv("TMPDIR", "/tmp"), "asset_hunter_engine.db")
+# Jobs untouched this long are dropped; background scans each leave one behind.
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class SharedStore:
+    """Cross-process engine state backed by a SQLite database in WAL mode.
+
+    Every worker process opens the same file, so caches, rate limits,
+    leases and job state are shared instead of duplicated per process.
+    Calls block while another writer holds the database, so async code
+    runs them with ``asyncio.to_thread``.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("ENGINE_STATE_DB") or DEFAULT_STATE_DB
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def cache_get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def cache_set(self, namespace: str, key: str, value: Any, ttl_seconds: float) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, default=_json_default), time.time() + ttl_seconds),
+        )
+
+    def cache_update(
+        self,
+        namespace: str,
+        key: str,
+        update: Callable[[Optional[Any]], Any],
+        ttl_seconds: float,
+    ) -> Any:
+        """Atomically replace a cached value with ``update(current)``, where current is None if unset or expired."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            value = update(json.loads(row[0]) if row and row[1] >= now else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, default=_json_default), now + ttl_seconds),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def cache_delete(self, namespace: str, key: str) -> bool:
+        cursor = self._conn().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+        return cursor.rowcount > 0
+
+    def cache_items(self, namespace: str) -> List[Any]:
+        rows = self._conn().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND expires_at >= ?",
+            (namespace, time.time()),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def acquire_rate(self, name: str, per_minute: float) -> float:
+        """Take one token from a shared bucket; returns seconds to wait if none are left."""
+        if per_minute <= 0:
+            return 0.0
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limits WHERE name = ?", (name,)).fetchone()
+            tokens = per_minute if row is None else min(per_minute, row[0] + (now - row[1]) * per_minute / 60)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) * 60 / per_minute
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (name, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Claim or renew a named lease so only one worker runs a singleton task."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            acquired = row is None or row[0] == owner or row[1] < now
+            if acquired:
+                conn.execute(
+                    "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                    (name, owner, now + ttl_seconds),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def put_job(self, job_id: str, status: str, payload: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO jobs (id, status, payload, updated_at) VALUES (?, ?, ?, ?)",
+            (job_id, status, json.dumps(payload, default=_json_default), time.time()),
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT status, payload, updated_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if not row:
+            return None
+        return {"id": job_id, "status": row[0], "payload": json.loads(row[1]), "updated_at": row[2]}
+
+    def purge_expired(self) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+        conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - JOB_RETENTION_SECONDS,))
+
+
+_store: Optional[SharedStore] = None
+
+
+def get_store() -> SharedStore:
+    global _store
+    if _store is None:
+        _store = SharedStore()
+    return _store
@@ -0,0 +1,263 @@
+import os
+import re
+import uuid
+import time
+import fcntl
+import threading
+from datetime import datetime, date
+from typing import Optional, List, Dict, Any
+from ..models import Asset
+
+
+SNAPSHOT_DIR = os.getenv("ENGINE_SNAPSHOT_DIR")
+# This many files of one size tier in a partition are merged into a single file of the next tier.
+COMPACTION_FANIN = int(os.getenv("ENGINE_SNAPSHOT_COMPACTION_FANIN", "8"))
+_TIER = re.compile(r"L(\d+)-")
+
+
+def _schema():
+    # marketplace and scan_date are hive partition directories, not file columns.
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("name", pa.string()),
+        ("description", pa.string()),
+        ("url", pa.string()),
+        ("users", pa.int64()),
+        ("rating", pa.float64()),
+        ("reviews_count", pa.int64()),
+        ("last_updated", pa.string()),
+        ("developer", pa.string()),
+        ("developer_email", pa.string()),
+        ("estimated_mrr", pa.float64()),
+        ("estimated_valuation", pa.float64()),
+        ("distress_signals", pa.list_(pa.string())),
+        ("distress_score", pa.int32()),
+        ("verified", pa.bool_()),
+        ("verified_by", pa.string()),
+        ("verification_notes", pa.string()),
+        ("scraped_at", pa.timestamp("us")),
+    ])
+
+
+class SnapshotWriter:
+    """Appends verified asset batches to Arrow IPC files partitioned by marketplace and scan date.
+
+    Files are written uncompressed so SnapshotReader can memory-map them
+    and filter without copying or re-parsing.
+    """
+
+    def __init__(self, root: str, fanin: int = COMPACTION_FANIN):
+        self.root = root
+        self.fanin = max(2, fanin)
+        self._lock = threading.Lock()
+
+    def append(self, assets: List[Asset], scan_date: Optional[date] = None) -> List[str]:
+        if not assets:
+            return []
+        import pyarrow as pa
+
+        scan_date = scan_date or datetime.utcnow().date()
+        schema = _schema()
+        by_marketplace: Dict[str, List[Asset]] = {}
+        for asset in assets:
+            by_marketplace.setdefault(asset.marketplace.value, []).append(asset)
+
+        written = []
+        with self._lock:
+            for marketplace, batch in by_marketplace.items():
+                columns = {
+                    name: [getattr(a, name) for a in batch]
+                    for name in schema.names
+                }
+                columns["distress_signals"] = [[s.value for s in a.distress_signals] for a in batch]
+                table = pa.Table.from_pydict(columns, schema=schema)
+
+                partition = os.path.join(self.root, f"marketplace={marketplace}", f"scan_date={scan_date.isoformat()}")
+                os.makedirs(partition, exist_ok=True)
+                written.append(self._write_file(partition, table))
+                self.compact_partition(partition)
+        return written
+
+    def _write_file(self, partition: str, table, prefix: str = "") -> str:
+        import pyarrow as pa
+
+        filename = f"{prefix}{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.arrow"
+        path = os.path.join(partition, filename)
+        # Dot-prefixed files are skipped by dataset discovery until they are renamed into place.
+        tmp_path = os.path.join(partition, f".{filename}.tmp")
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return path
+
+    def compact_partition(self, partition: str) -> int:
+        """Merge small files tier by tier; returns how many files were folded away.
+
+        Each batch lands as a tier-0 file. Once a tier holds ``fanin``
+        files they become one file of the next tier, so every row is
+        rewritten about log_fanin(files) times rather than on every pass.
+        A lock file keeps other workers from compacting the same partition.
+        """
+        import pyarrow as pa
+
+        folded = 0
+        with open(os.path.join(partition, ".compact.lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            while True:
+                tiers: Dict[int, List[str]] = {}
+                for name in os.listdir(partition):
+                    if name.endswith(".arrow") and not name.startswith("."):
+                        match = _TIER.match(name)
+                        tiers.setdefault(int(match.group(1)) if match else 0, []).append(name)
+                full = sorted(tier for tier, names in tiers.items() if len(names) >= self.fanin)
+                if not full:
+                    return folded
+                tier = full[0]
+                paths = [os.path.join(partition, name) for name in sorted(tiers[tier])]
+                tables = []
+                for path in paths:
+                    with pa.memory_map(path) as source:
+                        tables.append(pa.ipc.open_file(source).read_all())
+                # Files written before a column was added are null-filled for it.
+                merged = pa.concat_tables(tables, promote_options="default")
+                self._write_file(partition, merged, prefix=f"L{tier + 1}-")
+                for path in paths:
+                    os.remove(path)
+                folded += len(paths)
+
+    def compact(self) -> int:
+        """Compact every partition, such as those left from before compaction existed."""
+        folded = 0
+        if not os.path.isdir(self.root):
+            return 0
+        with self._lock:
+            for marketplace_dir in os.listdir(self.root):
+                marketplace_path = os.path.join(self.root, marketplace_dir)
+                if not os.path.isdir(marketplace_path):
+                    continue
+                for date_dir in os.listdir(marketplace_path):
+                    partition = os.path.join(marketplace_path, date_dir)
+                    if os.path.isdir(partition):
+                        folded += self.compact_partition(partition)
+        return folded
+
+
+class SnapshotReader:
+    def __init__(self, root: str):
+        self.root = root
+
+    def dataset(self):
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+
+        import pyarrow as pa
+
+        # An explicit schema, so files written before a column existed read it as null.
+        schema = pa.schema(list(_schema()) + [("marketplace", pa.string()), ("scan_date", pa.string())])
+        return ds.dataset(
+            self.root,
+            schema=schema,
+            format="arrow",
+            partitioning="hive",
+            filesystem=fs.LocalFileSystem(use_mmap=True),
+        )
+
+    def scan_dates(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        dates = set()
+        for marketplace_dir in os.listdir(self.root):
+            marketplace_path = os.path.join(self.root, marketplace_dir)
+            if os.path.isdir(marketplace_path):
+                dates.update(
+                    name.partition("=")[2] for name in os.listdir(marketplace_path) if name.startswith("scan_date=")
+                )
+        return sorted(dates)
+
+    def batches(self, newest_first: bool = True, batch_size: int = 10_000):
+        """Record batches one scan date at a time, so the whole history is never in memory at once."""
+        import pyarrow.dataset as ds
+
+        if not os.path.isdir(self.root):
+            return
+        dataset = self.dataset()
+        for day in sorted(self.scan_dates(), reverse=newest_first):
+            yield from dataset.to_batches(filter=ds.field("scan_date") == day, batch_size=batch_size)
+
+    def read(
+        self,
+        marketplaces: Optional[List[str]] = None,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        min_distress_score: Optional[int] = None,
+        min_valuation: Optional[float] = None,
+        columns: Optional[List[str]] = None,
+    ):
+        """Return a pyarrow Table of matching assets; partitions outside the filter are never opened."""
+        import pyarrow.dataset as ds
+
+        expr = None
+
+        def both(a, b):
+            return b if a is None else a & b
+
+        if marketplaces:
+            expr = both(expr, ds.field("marketplace").isin(marketplaces))
+        if since:
+            expr = both(expr, ds.field("scan_date") >= since.isoformat())
+        if until:
+            expr = both(expr, ds.field("scan_date") <= until.isoformat())
+        if min_distress_score is not None:
+            expr = both(expr, ds.field("distress_score") >= min_distress_score)
+        if min_valuation is not None:
+            expr = both(expr, ds.field("estimated_valuation") >= min_valuation)
+        if not os.path.isdir(self.root):
+            return _schema().empty_table()
+        try:
+            return self.dataset().to_table(columns=columns, filter=expr)
+        except OSError:
+            # Compaction may remove files between discovery and reading; rediscover once.
+            return self.dataset().to_table(columns=columns, filter=expr)
+
+    def summary(self, **filters) -> List[Dict[str, Any]]:
+        table = self.read(
+            columns=["marketplace", "url", "estimated_valuation", "distress_score"],
+            **filters,
+        )
+        if table.num_rows == 0:
+            return []
+        grouped = table.group_by("marketplace").aggregate([
+            ("url", "count"),
+            ("url", "count_distinct"),
+            ("estimated_valuation", "mean"),
+            ("estimated_valuation", "max"),
+            ("distress_score", "mean"),
+        ])
+        return [
+            {
+                "marketplace": row["marketplace"],
+                "observations": row["url_count"],
+                "unique_assets": row["url_count_distinct"],
+                "avg_valuation": round(row["estimated_valuation_mean"] or 0, 2),
+                "max_valuation": row["estimated_valuation_max"],
+                "avg_distress_score": round(row["distress_score_mean"] or 0, 2),
+            }
+            for row in grouped.to_pylist()
+        ]
+
+
+def default_snapshot_writer() -> Optional[SnapshotWriter]:
+    if not SNAPSHOT_DIR:
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("[Snapshots] ENGINE_SNAPSHOT_DIR is set but pyarrow is not installed; snapshots disabled")
+        return None
+    return SnapshotWriter(SNAPSHOT_DIR)
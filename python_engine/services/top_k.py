@@ -0,0 +1,90 @@
+import os
+import heapq
+import itertools
+import threading
+from typing import Optional, List, Dict, Any, Tuple
+from ..models import Asset, Marketplace
+
+
+# Verification may find more users than the snippet shows; estimates assume up to this many times more.
+TOP_K_SLACK = float(os.getenv("ENGINE_TOP_K_SLACK", "2.0"))
+MAX_DISTRESS = 10
+BEST_RATING = 5.0
+
+Rank = Tuple[float, int]
+
+
+def rank(asset: Asset) -> Rank:
+    return (asset.estimated_valuation or 0, asset.distress_score)
+
+
+class TopK:
+    """Running top-K of verified assets, ranked by valuation and then distress.
+
+    Unverified search results are scored with an optimistic estimate: the
+    snippet's user count times ``slack``, a perfect rating and the
+    lowest-distress multiple, run through the verifier's own scoring. Work
+    whose estimate cannot beat the current K-th asset is skipped.
+
+    This is approximate, not exact. Verified user counts have no ceiling,
+    so an asset can come in above its estimate, and a skipped one might
+    have placed. Raising ``slack`` trades speed for a closer match to the
+    exhaustive scan. Responses report ``exact: false`` accordingly.
+    """
+
+    def __init__(self, k: int, verifier, slack: float = TOP_K_SLACK):
+        self.k = k
+        self.verifier = verifier
+        self.slack = slack
+        self._heap: List[Tuple[Rank, int, Asset]] = []
+        self._order = itertools.count()
+        self._max_users = 0
+        # Search threads read the threshold while the event loop updates it.
+        self._lock = threading.Lock()
+
+    def offer(self, asset: Asset) -> bool:
+        """Add a verified asset; returns whether it made the top K."""
+        entry = (rank(asset), next(self._order), asset)
+        with self._lock:
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, entry)
+                return True
+            if entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+                return True
+        return False
+
+    def threshold(self) -> Optional[Rank]:
+        with self._lock:
+            return self._heap[0][0] if len(self._heap) >= self.k else None
+
+    def can_beat(self, estimate: float) -> bool:
+        threshold = self.threshold()
+        return threshold is None or (estimate, MAX_DISTRESS) > threshold
+
+    def _best_valuation(self, marketplace: Marketplace, users: float) -> float:
+        mrr = self.verifier.estimate_mrr(marketplace, users, BEST_RATING)
+        return self.verifier.calculate_valuation(mrr, 0)
+
+    def estimate(self, raw_result: Dict[str, Any]) -> float:
+        users = self.verifier.heuristic_verification(raw_result)["estimated_users"]
+        with self._lock:
+            self._max_users = max(self._max_users, users)
+        return self._best_valuation(Marketplace(raw_result.get("marketplace", "chrome")), users * self.slack)
+
+    def search_estimate(self, marketplace: Marketplace) -> float:
+        """Estimate for results a search has not returned yet.
+
+        Assumes no unseen listing is bigger than the biggest one this scan
+        has found so far. Until something has been found, any search might
+        matter.
+        """
+        with self._lock:
+            max_users = self._max_users
+        if not max_users:
+            return float("inf")
+        return self._best_valuation(marketplace, max_users * self.slack)
+
+    def results(self) -> List[Asset]:
+        with self._lock:
+            return [asset for _, _, asset in sorted(self._heap, reverse=True)]
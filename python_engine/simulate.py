@@ -0,0 +1,16 @@
+import json
+import asyncio
+import argparse
+
+from python_engine.services.frontier_scheduler import simulate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the frontier scheduler against recorded scans")
+    parser.add_argument("recording", help="JSONL file written with ENGINE_SCHEDULER_RECORD_PATH")
+    parser.add_argument("--budget-per-hour", type=float, default=1.0)
+    parser.add_argument("--tick-seconds", type=float, default=300.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(simulate(args.recording, args.budget_per_hour, args.tick_seconds))
+    print(json.dumps(result, indent=2))
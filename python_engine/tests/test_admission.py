@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from python_engine.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    tenant_key,
+    tenant_signature,
+)
+
+SECRET = "node-shared-secret"
+
+
+def single_slot(**kwargs):
+    """One slot shared by every class, so each release hands it to exactly one waiter."""
+    return AdmissionController(max_inflight=1, class_share={"interactive": 1.0, "standard": 1.0, "bulk": 1.0}, **kwargs)
+
+
+async def admit_in_order(controller, holder, waiters):
+    """Hold the only slot, queue ``waiters`` in order, then release and return the order they ran in."""
+    await controller.acquire(holder, "holder")
+    order = []
+
+    async def wait(priority, tenant, label):
+        await controller.acquire(priority, tenant)
+        order.append(label)
+        controller.release(priority)
+
+    tasks = [asyncio.create_task(wait(*w)) for w in waiters]
+    await asyncio.sleep(0)
+    controller.release(holder)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def request(headers=None, host="10.0.0.1"):
+    return Request({
+        "type": "http",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": (host, 51234),
+    })
+
+
+def test_higher_classes_are_admitted_first():
+    waiters = [
+        ("bulk", "a", "bulk"),
+        ("standard", "a", "standard"),
+        ("interactive", "a", "interactive"),
+    ]
+    order = asyncio.run(admit_in_order(single_slot(), "standard", waiters))
+    assert order == ["interactive", "standard", "bulk"]
+
+
+def test_tenants_are_served_round_robin_within_a_class():
+    waiters = [
+        ("bulk", "a", "a1"),
+        ("bulk", "a", "a2"),
+        ("bulk", "a", "a3"),
+        ("bulk", "b", "b1"),
+    ]
+    order = asyncio.run(admit_in_order(single_slot(), "bulk", waiters))
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_rejects_when_the_queue_is_full():
+    async def run():
+        controller = single_slot(max_queue=2)
+        await controller.acquire("bulk", "holder")
+        queued = [asyncio.create_task(controller.acquire("bulk", t)) for t in ("a", "b")]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("interactive", "c")
+        for task in queued:
+            task.cancel()
+        await asyncio.gather(*queued, return_exceptions=True)
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(run())
+    assert rejected.reason == "Engine queue is full"
+    assert rejected.retry_after >= 1
+    assert controller.rejected["interactive"] == 1
+    assert controller.depth == 0
+
+
+def test_rejects_a_tenant_over_its_share_of_the_queue():
+    async def run():
+        controller = single_slot(max_queue_per_tenant=1)
+        await controller.acquire("bulk", "holder")
+        queued = asyncio.create_task(controller.acquire("bulk", "a"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("bulk", "a")
+        # Another tenant still gets a place in the queue.
+        other = asyncio.create_task(controller.acquire("bulk", "b"))
+        await asyncio.sleep(0)
+        assert controller.depth == 2
+        for task in (queued, other):
+            task.cancel()
+        await asyncio.gather(queued, other, return_exceptions=True)
+        return rejected.value
+
+    assert asyncio.run(run()).reason == "Too many queued requests for this client"
+
+
+def test_signed_tenant_is_trusted():
+    signed = {"X-Tenant-Id": "session-1", "X-Tenant-Signature": tenant_signature("session-1", SECRET)}
+    # The same signed tenant keeps one key from any address.
+    assert tenant_key(request(signed, host="10.0.0.1"), SECRET) == tenant_key(request(signed, host="10.0.0.2"), SECRET)
+    assert tenant_key(request(signed), SECRET) != tenant_key(request(), SECRET)
+
+
+def test_unsigned_or_forged_tenant_falls_back_to_the_address():
+    by_address = tenant_key(request(), SECRET)
+    forged = {"X-Tenant-Id": "session-1", "X-Tenant-Signature": tenant_signature("session-1", "wrong-secret")}
+    assert tenant_key(request(forged), SECRET) == by_address
+    assert tenant_key(request({"X-Tenant-Id": "session-1"}), SECRET) == by_address
+    # Without a configured secret no tenant header is trusted.
+    signed = {"X-Tenant-Id": "session-1", "X-Tenant-Signature": tenant_signature("session-1", SECRET)}
+    assert tenant_key(request(signed), None) == tenant_key(request(), None)
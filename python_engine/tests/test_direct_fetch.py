@@ -0,0 +1,156 @@
+import asyncio
+
+import httpx
+import pytest
+
+from python_engine.models import Marketplace
+from python_engine.scanners.direct_fetch import DirectFetcher, is_listing_url
+from python_engine.services.shared_store import SharedStore
+
+LISTING_URL = "https://chromewebstore.google.com/detail/invoice-helper/abcdefghijklmnopabcdefghijklmnop"
+LISTING_PAGE = """<html><head>
+<title>Invoice Helper - Chrome Web Store</title>
+<meta name="description" content="Create invoices from any tab.">
+</head><body>
+<div>10,000+ users</div><div>4.5 out of 5</div><div>128 ratings</div>
+<div>Updated: March 3, 2024</div>
+</body></html>"""
+
+
+class StandInMarketplace:
+    """Answers listing requests like the store would, including conditional GETs."""
+
+    def __init__(self, etag='"v1"'):
+        self.etag = etag
+        self.requests = []
+        self.fail_with = None
+        self.redirect_to = None
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.fail_with:
+            raise self.fail_with("stand-in failure", request=request)
+        if self.redirect_to:
+            return httpx.Response(302, headers={"location": self.redirect_to})
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers={"etag": self.etag})
+        return httpx.Response(200, text=LISTING_PAGE, headers={"etag": self.etag})
+
+
+@pytest.fixture
+def server():
+    return StandInMarketplace()
+
+
+@pytest.fixture
+def fetcher(tmp_path, server):
+    return DirectFetcher(store=SharedStore(str(tmp_path / "state.db")), transport=httpx.MockTransport(server))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def fetch_twice(fetcher):
+    async def go():
+        try:
+            return await fetcher.fetch(LISTING_URL, Marketplace.CHROME), await fetcher.fetch(LISTING_URL, Marketplace.CHROME)
+        finally:
+            await fetcher.close()
+
+    return run(go())
+
+
+def test_200_is_parsed(fetcher, server):
+    async def go():
+        try:
+            return await fetcher.fetch(LISTING_URL, Marketplace.CHROME)
+        finally:
+            await fetcher.close()
+
+    result = run(go())
+    assert result["status"] == "modified"
+    data = result["data"]
+    assert data["name"] == "Invoice Helper"
+    assert data["users"] == 10000
+    assert data["rating"] == 4.5
+    assert data["reviews_count"] == 128
+    assert data["last_updated"] == "March 3, 2024"
+    assert "if-none-match" not in server.requests[0].headers
+
+
+def test_304_reuses_cached_listing(fetcher, server):
+    first, second = fetch_twice(fetcher)
+    assert server.requests[1].headers["if-none-match"] == '"v1"'
+    assert second["status"] == "not_modified"
+    assert second["data"] == first["data"]
+    assert fetcher.stats["not_modified"] == 1
+
+
+def test_changed_etag_fetches_in_full(fetcher, server):
+    async def go():
+        try:
+            await fetcher.fetch(LISTING_URL, Marketplace.CHROME)
+            server.etag = '"v2"'
+            return await fetcher.fetch(LISTING_URL, Marketplace.CHROME)
+        finally:
+            await fetcher.close()
+
+    assert run(go())["status"] == "modified"
+    assert fetcher.stats["modified"] == 2
+
+
+@pytest.mark.parametrize("error", [httpx.ReadTimeout, httpx.ConnectError])
+def test_timeout_or_error_falls_back_to_cached_data(fetcher, server, error):
+    async def go():
+        try:
+            first = await fetcher.fetch(LISTING_URL, Marketplace.CHROME)
+            server.fail_with = error
+            return first, await fetcher.fetch(LISTING_URL, Marketplace.CHROME)
+        finally:
+            await fetcher.close()
+
+    first, failed = run(go())
+    assert failed["status"] == "error"
+    assert failed["data"] == first["data"]
+    assert fetcher.stats["errors"] == 1
+
+
+def test_error_without_cache_has_no_data(fetcher, server):
+    server.fail_with = httpx.ReadTimeout
+    async def go():
+        try:
+            return await fetcher.fetch(LISTING_URL, Marketplace.CHROME)
+        finally:
+            await fetcher.close()
+
+    result = run(go())
+    assert result == {"url": LISTING_URL, "status": "error", "data": None}
+
+
+@pytest.mark.parametrize("url", [
+    "http://chromewebstore.google.com/detail/x/abcdefghijklmnopabcdefghijklmnop",
+    "https://169.254.169.254/latest/meta-data/",
+    "https://evil.example/?u=chromewebstore.google.com/detail/x",
+    "https://chromewebstore.google.com.evil.example/detail/x",
+    "https://user@chromewebstore.google.com/detail/x",
+    "https://chromewebstore.google.com:8443/detail/x",
+    "https://chromewebstore.google.com/category/extensions",
+])
+def test_non_listing_urls_are_never_fetched(fetcher, server, url):
+    assert not is_listing_url(url, Marketplace.CHROME)
+    result = run(fetcher.fetch(url, Marketplace.CHROME))
+    assert result["status"] == "error"
+    assert server.requests == []
+
+
+def test_off_site_redirects_are_not_followed(fetcher, server):
+    server.redirect_to = "http://127.0.0.1:8080/admin"
+    async def go():
+        try:
+            return await fetcher.fetch(LISTING_URL, Marketplace.CHROME)
+        finally:
+            await fetcher.close()
+
+    assert run(go())["status"] == "error"
+    assert len(server.requests) == 1
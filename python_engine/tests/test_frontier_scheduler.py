@@ -0,0 +1,156 @@
+import json
+import asyncio
+
+from python_engine.models import Marketplace
+from python_engine.services.frontier_scheduler import (
+    FrontierScheduler,
+    RecordedMarketplace,
+    GEMINI_COST_PER_CALL,
+    MAX_SEEN_URLS,
+    simulate,
+)
+
+HOUR = 3600
+
+
+def lead(url, marketplace="chrome"):
+    return {"url": url, "title": url, "marketplace": marketplace, "distress_score": 6, "estimated_valuation": 50000}
+
+
+def listing(url, marketplace="firefox"):
+    return {"url": url, "title": url, "marketplace": marketplace, "distress_score": 0, "estimated_valuation": 100}
+
+
+def write_recording(path, hours=48):
+    """Two pairs observed hourly: one turns up new distressed listings every hour, the other never changes."""
+    with open(path, "w") as f:
+        for h in range(hours):
+            t = h * HOUR
+            churning = [lead(f"https://c/{h}-{i}") for i in range(5)]
+            static = [listing(f"https://s/{i}") for i in range(5)]
+            f.write(json.dumps({"t": t, "query": "invoice", "marketplace": "chrome", "results": churning}) + "\n")
+            f.write(json.dumps({"t": t, "query": "notes", "marketplace": "firefox", "results": static}) + "\n")
+    return str(path)
+
+
+def replay(source, scheduler, tick_seconds=300.0):
+    for query, marketplace in source.pairs():
+        scheduler.add(query, [marketplace])
+    while source.now <= source.end:
+        asyncio.run(scheduler.run_once())
+        source.now += tick_seconds
+
+
+def test_churning_pair_is_revisited_more_than_static_one(tmp_path):
+    source = RecordedMarketplace(write_recording(tmp_path / "rec.jsonl"))
+    scheduler = FrontierScheduler(source.scan, source.verify, budget_per_hour=10.0, clock=source.clock)
+    replay(source, scheduler)
+
+    churning = scheduler.entries[("invoice", "chrome")]
+    static = scheduler.entries[("notes", "firefox")]
+    assert churning.scans > static.scans * 2
+    assert churning.refresh_interval < static.refresh_interval
+    assert churning.total_leads > 0 and static.total_leads == 0
+
+
+def test_verification_spend_is_gated_by_budget(tmp_path):
+    source = RecordedMarketplace(write_recording(tmp_path / "rec.jsonl", hours=4))
+    # Enough for the searches, not for verifying every new listing.
+    budget_per_hour = 0.012
+    scheduler = FrontierScheduler(source.scan, source.verify, budget_per_hour=budget_per_hour, clock=source.clock)
+    replay(source, scheduler)
+
+    assert scheduler.budget.available >= 0
+    assert scheduler.skipped_verifications > 0
+    assert scheduler.budget.spent <= budget_per_hour * (1 + (source.end - source.start) / HOUR) + 1e-9
+    assert scheduler.gemini_calls * GEMINI_COST_PER_CALL <= scheduler.budget.spent
+
+
+def test_unverified_results_are_retried_once_budget_refills():
+    now = [0.0]
+    verified = []
+
+    async def scan(query, marketplace):
+        return [lead(f"https://c/{i}") for i in range(4)]
+
+    async def verify(raw_result):
+        verified.append(raw_result["url"])
+        return None
+
+    scheduler = FrontierScheduler(scan, verify, budget_per_hour=0.0, clock=lambda: now[0])
+    scheduler.budget.available = scheduler.budget.capacity = 0.01 + 2.5 * GEMINI_COST_PER_CALL
+    scheduler.add("invoice", [Marketplace.CHROME])
+    asyncio.run(scheduler.run_once())
+    assert len(verified) == 2
+    assert scheduler.skipped_verifications == 2
+
+    scheduler.budget.available = scheduler.budget.capacity
+    scheduler.entries[("invoice", "chrome")].next_due = 0
+    asyncio.run(scheduler.run_once())
+    assert sorted(verified) == sorted(f"https://c/{i}" for i in range(4))
+
+
+def test_frontier_is_capped_by_evicting_least_promising_entries():
+    async def scan(query, marketplace):
+        return []
+
+    now = [0.0]
+    scheduler = FrontierScheduler(scan, budget_per_hour=100.0, clock=lambda: now[0], max_entries=3)
+    scheduler.add("a", [Marketplace.CHROME])
+    scheduler.add("b", [Marketplace.CHROME])
+    asyncio.run(scheduler.run_once())
+    # Both scanned with no leads; "a" is requested again, so "b" is the one to go.
+    now[0] = 10.0
+    scheduler.add("a", [Marketplace.CHROME])
+    scheduler.add("c", [Marketplace.CHROME])
+    scheduler.add("d", [Marketplace.CHROME])
+
+    assert len(scheduler.entries) == 3
+    assert set(scheduler.entries) == {("a", "chrome"), ("c", "chrome"), ("d", "chrome")}
+    assert scheduler.evicted == 1
+
+
+def test_leads_found_survives_eviction():
+    now = [0.0]
+
+    async def scan(query, marketplace):
+        return [lead(f"https://{query}/{i}") for i in range(3)]
+
+    async def verify(raw_result):
+        return await RecordedMarketplace.verify(None, raw_result)
+
+    scheduler = FrontierScheduler(scan, verify, budget_per_hour=100.0, clock=lambda: now[0], max_entries=1)
+    scheduler.add("a", [Marketplace.CHROME])
+    asyncio.run(scheduler.run_once())
+    assert scheduler.stats()["leads_found"] == 3
+
+    now[0] = 10.0
+    scheduler.add("b", [Marketplace.CHROME])
+    assert set(scheduler.entries) == {("b", "chrome")}
+    assert scheduler.stats()["leads_found"] == 3
+
+
+def test_seen_urls_are_bounded():
+    now = [0.0]
+    page = [0]
+
+    async def scan(query, marketplace):
+        page[0] += 1
+        return [listing(f"https://s/{page[0]}-{i}") for i in range(50)]
+
+    scheduler = FrontierScheduler(scan, budget_per_hour=1000.0, clock=lambda: now[0])
+    scheduler.add("notes", [Marketplace.FIREFOX])
+    entry = scheduler.entries[("notes", "firefox")]
+    for _ in range(20):
+        entry.next_due = now[0]
+        asyncio.run(scheduler.run_once())
+    assert len(entry.seen_urls) == MAX_SEEN_URLS
+    # The newest page is remembered, so an unchanged listing still reads as no churn.
+    assert "https://s/20-0" in entry.seen_urls
+
+
+def test_simulate_reports_leads_per_dollar(tmp_path):
+    stats = asyncio.run(simulate(write_recording(tmp_path / "rec.jsonl", hours=12), budget_per_hour=1.0))
+    assert stats["leads_found"] > 0
+    assert stats["leads_per_dollar"] > 0
+    assert stats["simulated_hours"] == 11.0
@@ -0,0 +1,9 @@
+from python_engine.benchmark import import_time, IMPORT_TIME_BUDGET_MS
+
+
+def test_engine_imports_within_budget_without_heavy_sdks():
+    report = import_time("python_engine.main")
+
+    assert 0 < report["total_ms"] <= IMPORT_TIME_BUDGET_MS, report["slowest"]
+    # google.genai and requests are imported on first use, never at startup.
+    assert report["eager_heavy_modules"] == []
@@ -0,0 +1,49 @@
+import asyncio
+
+from python_engine import main
+from python_engine.models import Asset, Marketplace
+from python_engine.services.local_index import LocalIndex
+
+
+def asset(name, verified_by):
+    return Asset(
+        id=main._asset_id(f"https://chrome.google.com/webstore/detail/{name}"),
+        name=f"{name} invoice helper",
+        url=f"https://chrome.google.com/webstore/detail/{name}",
+        marketplace=Marketplace.CHROME,
+        users=5000,
+        verified_by=verified_by,
+    )
+
+
+def publish(monkeypatch, tmp_path, assets):
+    index = LocalIndex(str(tmp_path / "index.db"))
+    for name in ("metric_history", "snapshot_writer", "push_dispatcher"):
+        monkeypatch.setattr(main, name, None)
+    monkeypatch.setattr(main, "local_index", index)
+    asyncio.run(main._publish_verified(assets))
+    return index
+
+
+def test_only_checked_verdicts_are_reused(monkeypatch, tmp_path):
+    assets = [
+        asset("gemini", "gemini"),
+        asset("classifier", "classifier"),
+        asset("heuristic", "heuristic"),
+        # verify_asset's error dict and the no-Gemini fallback leave verified_by unset.
+        asset("failed", None),
+    ]
+    index = publish(monkeypatch, tmp_path, assets)
+
+    fresh = index.fresh([a.id for a in assets], main.INDEX_REUSE_SECONDS)
+    assert {a.verified_by for a in fresh.values()} == {"gemini", "classifier"}
+    # Failed verifications are still searchable, just verified again next time they turn up.
+    assert len(index.search("invoice")) == 4
+
+
+def test_failed_verification_keeps_the_earlier_verified_record(monkeypatch, tmp_path):
+    index = publish(monkeypatch, tmp_path, [asset("app", "gemini")])
+    asyncio.run(main._publish_verified([asset("app", None)]))
+
+    (kept,) = index.search("invoice")
+    assert kept.verified_by == "gemini"
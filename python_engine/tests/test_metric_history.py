@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import numpy as np
+
+from python_engine.models import DistressSignal
+from python_engine.services.shared_store import SharedStore
+from python_engine.services.metric_history import (
+    MetricHistory,
+    _encode,
+    _decode,
+    DAY,
+    NO_UPDATES_DAYS,
+)
+
+NOW = 1_800_000_000
+
+
+def history(tmp_path, fanin=8):
+    return MetricHistory(str(tmp_path / "history"), store=SharedStore(str(tmp_path / "state.db")), fanin=fanin)
+
+
+def test_delta_encoding_restarts_at_each_asset():
+    keys = np.array(["a", "a", "a", "b", "b", "c"], dtype=object)
+    users = np.array([100, 120, 90, 7, 7, 5], dtype=np.int64)
+    encoded = _encode(keys, {"users": users})["users"]
+    # Each asset's first row is absolute; the rest are differences from the previous row of that asset.
+    assert encoded.tolist() == [100, 20, -30, 7, 0, 5]
+    assert _decode(keys, {"users": encoded})["users"].tolist() == users.tolist()
+
+
+def test_record_round_trips_through_history(tmp_path):
+    h = history(tmp_path)
+    h.record([{"id": "a", "users": 1000, "reviews_count": 40, "rating": 4.35, "last_updated": "March 3, 2026"}], NOW)
+    # A missing field is stored as "not observed", not as a measured zero.
+    h.record([{"id": "a", "reviews_count": 42}], NOW + DAY)
+
+    first, second = h.history("a")
+    assert first["users"] == 1000 and first["rating"] == 4.35 and first["last_updated"] == "2026-03-03"
+    assert second["users"] is None and second["reviews_count"] == 42
+    assert h.history("missing") == []
+
+
+def test_compaction_merges_a_full_tier_and_keeps_every_observation(tmp_path):
+    h = history(tmp_path, fanin=3)
+    for day in range(7):
+        h.record([{"id": "a", "users": 100 + day}, {"id": f"only-{day}", "users": 1}], NOW + day * DAY)
+
+    stats = h.stats()
+    # Six tier-0 segments became two tier-1 segments, which is under fanin; the last write is still tier 0.
+    assert stats["segments"] == 3
+    assert stats["observations"] == 14
+    assert [o["users"] for o in h.history("a")] == [100 + day for day in range(7)]
+    assert h.history("only-4")[0]["users"] == 1
+
+
+def test_trend_signals_need_enough_history(tmp_path):
+    h = history(tmp_path)
+    h.record([{"id": "a", "reviews_count": 100, "rating": 4.5}], NOW)
+    h.record([{"id": "a", "reviews_count": 110, "rating": 4.5}], NOW + 3 * DAY)
+    assert h.trend_signals(["a"], now=NOW + 3 * DAY) == {}
+
+
+def test_trend_signals_detect_falling_rating_and_stale_listing(tmp_path):
+    h = history(tmp_path)
+    last_updated = datetime.utcfromtimestamp(NOW - (NO_UPDATES_DAYS + 30) * DAY).date().isoformat()
+    for week, (rating, reviews) in enumerate([(4.6, 100), (4.4, 104), (4.1, 106), (4.0, 107)]):
+        h.record([
+            {"id": "falling", "rating": rating, "reviews_count": reviews, "last_updated": last_updated},
+            {"id": "steady", "rating": 4.6, "reviews_count": 100 + 10 * week, "last_updated": "2026-12-01"},
+        ], NOW + week * 7 * DAY)
+
+    decisions = h.trend_signals(["falling", "steady"], now=NOW + 21 * DAY)
+    assert decisions["falling"] == {DistressSignal.NO_UPDATES: True, DistressSignal.DECLINING_REVIEWS: True}
+    assert decisions["steady"] == {DistressSignal.NO_UPDATES: False, DistressSignal.DECLINING_REVIEWS: False}
+
@@ -0,0 +1,73 @@
+import math
+
+from fastapi.testclient import TestClient
+
+from python_engine import main
+from python_engine.models import Asset, Marketplace
+from python_engine.services.gemini_verifier import GeminiVerifier
+from python_engine.services.top_k import TopK, MAX_DISTRESS, rank
+
+
+def asset(name, valuation, distress=0):
+    return Asset(
+        id=name,
+        name=name,
+        url=f"https://chrome.google.com/webstore/detail/{name}",
+        marketplace=Marketplace.CHROME,
+        estimated_valuation=valuation,
+        distress_score=distress,
+    )
+
+
+def top(k=2, slack=2.0):
+    return TopK(k, GeminiVerifier(api_key="test"), slack=slack)
+
+
+def test_keeps_the_best_k_by_valuation_then_distress():
+    best = top(k=2)
+    assert best.threshold() is None
+    assert best.offer(asset("a", 1000))
+    assert best.offer(asset("b", 5000))
+    assert best.threshold() == (1000, 0)
+
+    # Same valuation but more distressed ranks higher and replaces the K-th asset.
+    assert best.offer(asset("c", 1000, distress=6))
+    assert best.threshold() == (1000, 6)
+    assert not best.offer(asset("d", 900, distress=9))
+    assert best.offer(asset("e", 8000))
+
+    assert [a.id for a in best.results()] == ["e", "b"]
+    assert best.threshold() == rank(asset("b", 5000))
+
+
+def test_can_beat_compares_the_estimate_at_maximum_distress():
+    best = top(k=1)
+    assert best.can_beat(0)
+    best.offer(asset("a", 1000, distress=4))
+    # An estimate equal to the K-th valuation can still win on distress.
+    assert best.can_beat(1000)
+    assert not best.can_beat(999.99)
+
+    best.offer(asset("b", 1000, distress=MAX_DISTRESS))
+    assert best.threshold() == (1000, MAX_DISTRESS)
+    assert not best.can_beat(1000)
+    assert best.can_beat(1000.01)
+
+
+def test_search_estimate_is_unbounded_until_a_result_is_seen():
+    best = top(slack=2.0)
+    assert math.isinf(best.search_estimate(Marketplace.CHROME))
+
+    estimate = best.estimate({"marketplace": "chrome", "snippet": "Used by 10,000 users"})
+    # The snippet's users times slack, a perfect rating and the lowest-distress multiple.
+    assert estimate == best._best_valuation(Marketplace.CHROME, 20000)
+    assert best.search_estimate(Marketplace.CHROME) == estimate
+    assert best.search_estimate(Marketplace.SHOPIFY) > estimate
+
+
+def test_scan_rejects_top_k_without_a_verifier(monkeypatch):
+    monkeypatch.setattr(main, "serpapi_client", object())
+    monkeypatch.setattr(main, "gemini_verifier", None)
+    response = TestClient(main.app).post("/scan", json={"query": "invoice", "top_k": 5})
+    assert response.status_code == 400
+    assert "top_k" in response.json()["detail"]
@@ -0,0 +1,84 @@
+import json
+import math
+import time
+import random
+import argparse
+from typing import List, Dict, Any
+
+from python_engine.services.distress_classifier import (
+    DistressClassifier,
+    load_labels,
+    SIGNAL_LABELS,
+    VALID_LABEL,
+    CONFIDENCE_THRESHOLD,
+)
+
+
+def evaluate(model: DistressClassifier, examples: List[Dict[str, Any]], threshold: float) -> Dict[str, Any]:
+    label_correct = {label: 0 for label in SIGNAL_LABELS + [VALID_LABEL]}
+    exact = 0
+    users_log_error = 0.0
+    rating_error = 0.0
+    confident = 0
+    confident_exact = 0
+
+    start = time.perf_counter()
+    predictions = [model.predict(ex) for ex in examples]
+    elapsed = time.perf_counter() - start
+
+    for ex, pred in zip(examples, predictions):
+        labels, values = DistressClassifier.targets(ex.get("verification", {}))
+        predicted = set(pred["distress_signals"])
+        hit = True
+        for label in SIGNAL_LABELS:
+            ok = (label in predicted) == bool(labels[label])
+            label_correct[label] += ok
+            hit = hit and ok
+        ok = pred["is_valid_asset"] == bool(labels[VALID_LABEL])
+        label_correct[VALID_LABEL] += ok
+        hit = hit and ok
+        exact += hit
+        users_log_error += abs(math.log1p(pred["estimated_users"]) - values["log_users"])
+        rating_error += abs(pred["estimated_rating"] - values["rating"])
+        if pred["confidence"] >= threshold:
+            confident += 1
+            confident_exact += hit
+
+    n = max(1, len(examples))
+    return {
+        "examples": len(examples),
+        "label_accuracy": {k: round(v / n, 3) for k, v in label_correct.items()},
+        "exact_match": round(exact / n, 3),
+        "users_mean_abs_log_error": round(users_log_error / n, 3),
+        "rating_mae": round(rating_error / n, 3),
+        "confidence_threshold": threshold,
+        "handled_locally": round(confident / n, 3),
+        "local_exact_match": round(confident_exact / confident, 3) if confident else None,
+        "assets_per_second": round(len(examples) / elapsed) if elapsed else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distil Gemini verification labels into a local classifier")
+    parser.add_argument("labels", help="JSONL file written with ENGINE_LABELS_PATH")
+    parser.add_argument("--out", required=True, help="where to write the model (ENGINE_CLASSIFIER_PATH)")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+
+    examples = load_labels(args.labels)
+    random.Random(7).shuffle(examples)
+    split = int(len(examples) * (1 - args.holdout))
+    train, test = examples[:split], examples[split:]
+
+    start = time.perf_counter()
+    model = DistressClassifier()
+    model.train(train, epochs=args.epochs)
+    train_seconds = time.perf_counter() - start
+
+    report = evaluate(model, test or train, args.threshold)
+    report["train_examples"] = len(train)
+    report["train_seconds"] = round(train_seconds, 2)
+    model.save(args.out)
+    print(json.dumps(report, indent=2))
@@ -3,6 +3,7 @@ import { createServer, type Server } from "http";
 import { setupAuth } from "./replit_integrations/auth";
 import { storage } from "./storage";
 import { pythonEngine } from "./python-client";
+import { registerEngineResultRoutes } from "./engine-results";
 import { updateOutreachLogSchema, insertOutreachLogSchema } from "@shared/schema";
 
 
@@ -17,6 +18,8 @@ export function registerRoutes(httpServer: Server, app: Express): Server {
     });
 
     // === ENGINE SCANNERS ===
+    registerEngineResultRoutes(app);
+
     // Trigger a scan via Python Engine
     app.post("/api/engine/scan", async (req, res) => {
         const { query, marketplaces, min_users, max_results } = req.body;
@@ -27,7 +30,8 @@ export function registerRoutes(httpServer: Server, app: Express): Server {
                 query || "",
                 marketplaces,
                 min_users,
-                max_results
+                max_results,
+                { tenant: req.sessionID }
             );
 
             if (result && result.assets.length > 0) {
@@ -114,7 +118,8 @@ export function registerRoutes(httpServer: Server, app: Express): Server {
             const result = await pythonEngine.verify(
                 asset_id || "unknown",
                 asset_url,
-                marketplace
+                marketplace,
+                req.sessionID
             );
 
             if (result) {
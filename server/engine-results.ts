@@ -0,0 +1,142 @@
+import type { Express, Request } from "express";
+import { createHmac, timingSafeEqual } from "crypto";
+import { pythonEngine, type Asset } from "./python-client";
+import { notifyEngineLeads } from "./notifications";
+
+const PUSH_SECRET = process.env.ENGINE_PUSH_SECRET;
+// The engine only pushes to hosts in its ENGINE_CALLBACK_HOSTS, and only over https unless on loopback.
+const CALLBACK_BASE_URL = process.env.ENGINE_CALLBACK_BASE_URL || `http://localhost:${process.env.PORT || "5000"}`;
+const RESULTS_TTL_MS = 60 * 60 * 1000;
+const MAX_SEEN_KEYS = 10000;
+
+interface PushedScan {
+  assets: Asset[];
+  done: boolean;
+  meta: Record<string, unknown>;
+  updatedAt: number;
+  // Batches can arrive out of order; the scan is done once every sequence up to the final count is here.
+  received: Set<number>;
+  batches: number | null;
+  // Sequences the engine gave up delivering; they count towards done but make the scan partial.
+  failed: number[];
+}
+
+if (!PUSH_SECRET) {
+  console.error("[Engine Push] ENGINE_PUSH_SECRET is not set; every pushed batch will be rejected");
+}
+
+function newScan(): PushedScan {
+  return { assets: [], done: false, meta: {}, updatedAt: Date.now(), received: new Set(), batches: null, failed: [] };
+}
+
+const scans = new Map<string, PushedScan>();
+// Insertion-ordered, so the oldest keys are evicted first.
+const seenKeys = new Set<string>();
+
+function verifySignature(req: Request): boolean {
+  if (!PUSH_SECRET) {
+    return false;
+  }
+  const header = req.header("x-engine-signature") || "";
+  const expected = "sha256=" + createHmac("sha256", PUSH_SECRET).update(req.rawBody as Buffer).digest("hex");
+  return header.length === expected.length && timingSafeEqual(Buffer.from(header), Buffer.from(expected));
+}
+
+function scanStatus(scan: PushedScan): "running" | "complete" | "partial" | "failed" {
+  if (!scan.done) {
+    return "running";
+  }
+  if (scan.meta.error) {
+    return "failed";
+  }
+  return scan.failed.length ? "partial" : "complete";
+}
+
+function pruneScans(): void {
+  const cutoff = Date.now() - RESULTS_TTL_MS;
+  scans.forEach((scan, scanId) => {
+    if (scan.updatedAt < cutoff) {
+      scans.delete(scanId);
+    }
+  });
+}
+
+export function registerEngineResultRoutes(app: Express): void {
+  // Receives batches pushed by the Python engine for callback scans and subscriptions
+  app.post("/api/engine/results", (req, res) => {
+    if (!verifySignature(req)) {
+      return res.status(401).json({ error: "invalid signature" });
+    }
+
+    const {
+      idempotency_key, scan_id, subscription_id, sequence, final, batches, failed_batches, assets = [], ...meta
+    } = req.body;
+    // Retried batches reuse their key; acknowledge them without applying twice.
+    if (seenKeys.has(idempotency_key)) {
+      return res.json({ duplicate: true });
+    }
+    seenKeys.add(idempotency_key);
+    if (seenKeys.size > MAX_SEEN_KEYS) {
+      seenKeys.delete(seenKeys.values().next().value as string);
+    }
+
+    if (subscription_id) {
+      // Acknowledge first; a slow mail send must not make the engine retry the batch.
+      notifyEngineLeads(subscription_id, assets).catch((error) => {
+        console.error(`[Engine Push] Subscription ${subscription_id} notification failed:`, error);
+      });
+      return res.json({ received: assets.length });
+    }
+
+    pruneScans();
+    const scan = scans.get(scan_id) || newScan();
+    scan.assets.push(...assets);
+    scan.updatedAt = Date.now();
+    scan.received.add(sequence);
+    if (final) {
+      scan.batches = batches ?? sequence;
+      scan.meta = meta;
+      scan.failed = failed_batches ?? [];
+    }
+    scan.done = scan.batches !== null && scan.received.size + scan.failed.length >= scan.batches;
+    scans.set(scan_id, scan);
+    res.json({ received: assets.length });
+  });
+
+  // Start a scan that streams results back instead of holding the request open
+  app.post("/api/engine/scan/async", async (req, res) => {
+    const { query, marketplaces, min_users, max_results } = req.body;
+    const scanId = await pythonEngine.startScan(
+      query || "",
+      `${CALLBACK_BASE_URL}/api/engine/results`,
+      marketplaces,
+      min_users,
+      max_results,
+      { tenant: req.sessionID }
+    );
+
+    if (!scanId) {
+      return res.status(503).json({ error: "Scan service unavailable" });
+    }
+    // Batches may have landed while startScan was awaited; keep them.
+    if (!scans.has(scanId)) {
+      scans.set(scanId, newScan());
+    }
+    res.status(202).json({ scan_id: scanId });
+  });
+
+  // Poll whatever has been pushed for a scan so far
+  app.get("/api/engine/scan/:scanId", (req, res) => {
+    const scan = scans.get(req.params.scanId);
+    if (!scan) {
+      return res.status(404).json({ error: "Unknown scan" });
+    }
+    res.json({
+      scan_id: req.params.scanId,
+      status: scanStatus(scan),
+      assets: scan.assets,
+      ...scan.meta,
+      ...(scan.failed.length ? { failed_batches: scan.failed } : {}),
+    });
+  });
+}
@@ -1,4 +1,5 @@
 import { Resend } from "resend";
+import type { Asset } from "./python-client";
 
 const resend = process.env.RESEND_API_KEY ? new Resend(process.env.RESEND_API_KEY) : null;
 const NOTIFY_EMAIL = process.env.NOTIFY_EMAIL || "Palmtreedreamsinc@gmail.com";
@@ -153,3 +154,57 @@ export async function notifyNewsletterSignup(email: string): Promise<void> {
     console.error("[Notifications] Failed to send newsletter notification:", error);
   }
 }
+
+const LEADS_PER_EMAIL = 10;
+
+function escapeHtml(text: string): string {
+  return text.replace(/[&<>"']/g, (c) => `&#${c.charCodeAt(0)};`);
+}
+
+// Listings matched by an engine subscription; names and URLs come from marketplaces, so they are escaped.
+export async function notifyEngineLeads(subscriptionId: string, assets: Asset[]): Promise<void> {
+  if (!assets.length) {
+    return;
+  }
+  if (!resend) {
+    console.log(`[Notifications] RESEND_API_KEY not set. Would notify: ${assets.length} engine leads for subscription ${subscriptionId}`);
+    return;
+  }
+
+  const leads = [...assets]
+    .sort((a, b) => (b.estimated_valuation ?? 0) - (a.estimated_valuation ?? 0))
+    .slice(0, LEADS_PER_EMAIL);
+  const rows = leads.map((asset) => `
+              <tr>
+                <td style="padding: 12px 0; border-bottom: 1px solid #e2e8f0; color: #0f172a; font-size: 14px;"><a href="${escapeHtml(asset.url)}" style="color: #0f172a;">${escapeHtml(asset.name)}</a><br><span style="color: #64748b; font-size: 12px;">${escapeHtml(asset.marketplace)}</span></td>
+                <td style="padding: 12px 0; border-bottom: 1px solid #e2e8f0; color: #10B77F; font-size: 14px; font-weight: 600; text-align: right;">Distress ${asset.distress_score}/10<br>${asset.estimated_valuation != null ? `$${Math.round(asset.estimated_valuation).toLocaleString('en-US')}` : "No valuation"}</td>
+              </tr>`).join("");
+
+  try {
+    await resend.emails.send({
+      from: "Asset Hunter <onboarding@resend.dev>",
+      to: NOTIFY_EMAIL,
+      subject: `${assets.length} New Distressed Asset${assets.length === 1 ? "" : "s"} Found`,
+      html: `
+        <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+          <div style="background: linear-gradient(135deg, #0F1729 0%, #1a2744 100%); padding: 30px; border-radius: 12px; text-align: center;">
+            <h1 style="color: #10B77F; margin: 0 0 10px 0; font-size: 24px;">New Engine Leads</h1>
+            <p style="color: #ffffff; margin: 0; font-size: 16px;">${assets.length} verified listing${assets.length === 1 ? "" : "s"} matched subscription ${escapeHtml(subscriptionId)}</p>
+          </div>
+          
+          <div style="background: #f8fafc; padding: 24px; border-radius: 12px; margin-top: 20px;">
+            <table style="width: 100%; border-collapse: collapse;">${rows}
+            </table>
+          </div>
+          
+          <p style="color: #64748b; font-size: 12px; text-align: center; margin-top: 20px;">
+            Asset Hunter Beta - Micro-Private Equity Engine
+          </p>
+        </div>
+      `,
+    });
+    console.log(`[Notifications] Engine leads notification sent for subscription ${subscriptionId}`);
+  } catch (error) {
+    console.error("[Notifications] Failed to send engine leads notification:", error);
+  }
+}
@@ -1,6 +1,9 @@
 import axios, { AxiosInstance } from 'axios';
+import { createHash, createHmac } from 'crypto';
 
 const PYTHON_ENGINE_URL = process.env.PYTHON_ENGINE_URL || 'http://localhost:8000';
+// Shared with the engine; without it the engine ignores X-Tenant-Id and queues by client address.
+const TENANT_SECRET = process.env.ENGINE_TENANT_SECRET;
 
 interface Asset {
   id: string;
@@ -19,6 +22,8 @@ interface Asset {
   distress_signals: string[];
   distress_score: number;
   verified: boolean;
+  // "gemini", "classifier" or "heuristic"; verified is only true after a Gemini check.
+  verified_by?: string | null;
   verification_notes: string | null;
   scraped_at: string;
 }
@@ -29,11 +34,57 @@ interface ScanResponse {
   marketplaces_scanned: number;
   scan_duration_ms: number;
   cached: boolean;
+  scan_id?: string | null;
+  next_cursor?: string | null;
+  skipped_marketplaces?: string[];
+  heuristic_assets?: number;
+  pruned_candidates?: number;
+  exact?: boolean | null;
+  local_matches?: number;
+  refresh_scan_id?: string | null;
+  refresh_cursor?: string | null;
+}
+
+interface ScanOptions {
+  min_distress_score?: number;
+  min_valuation?: number;
+  max_valuation?: number;
+  verified_only?: boolean;
+  sort_by?: 'estimated_valuation' | 'distress_score' | 'users' | 'estimated_mrr';
+  sort_desc?: boolean;
+  page_size?: number;
+  // Latency budget; the engine skips low-yield marketplaces and unverifiable assets to meet it.
+  deadline_ms?: number;
+  // Only the best N by valuation and distress; the engine stops searching and verifying once nothing left can place.
+  top_k?: number;
+  // Answer at once from earlier scans; refresh_cursor pages the fresh results once the background scan lands.
+  local_first?: boolean;
+  // Hashed and signed into X-Tenant-Id so the engine queues each caller fairly.
+  tenant?: string;
+}
+
+interface ColumnarScanResponse {
+  format: 'columnar';
+  columns: { [K in keyof Asset]: Asset[K][] };
+  total_found: number;
+  marketplaces_scanned: number;
+  scan_duration_ms: number;
+  cached: boolean;
+  scan_id?: string | null;
+  next_cursor?: string | null;
+  skipped_marketplaces?: string[];
+  heuristic_assets?: number;
+  pruned_candidates?: number;
+  exact?: boolean | null;
+  local_matches?: number;
+  refresh_scan_id?: string | null;
+  refresh_cursor?: string | null;
 }
 
 interface VerifyResponse {
   asset_id: string;
   verified: boolean;
+  verified_by?: string | null;
   distress_score: number;
   distress_signals: string[];
   estimated_mrr: number | null;
@@ -48,6 +99,48 @@ interface HealthResponse {
   gemini_available: boolean;
 }
 
+function tenantHeaders(tenant?: string): Record<string, string> {
+  if (!tenant || !TENANT_SECRET) {
+    return {};
+  }
+  // Session ids never leave this process; the engine only sees a hash it can verify came from us.
+  const id = createHash('sha256').update(tenant).digest('hex').slice(0, 32);
+  return {
+    'X-Tenant-Id': id,
+    'X-Tenant-Signature': createHmac('sha256', TENANT_SECRET).update(id).digest('hex'),
+  };
+}
+
+// Lets the engine's admission queue give up within the same budget as the scan itself.
+function scanHeaders(options: ScanOptions): Record<string, string> {
+  const headers = tenantHeaders(options.tenant);
+  if (options.deadline_ms) {
+    headers['X-Deadline-Ms'] = String(options.deadline_ms);
+  }
+  return headers;
+}
+
+function describeError(error: unknown): string {
+  if (axios.isAxiosError(error) && error.response?.status === 429) {
+    return `engine busy, retry after ${error.response.headers['retry-after'] ?? '?'}s`;
+  }
+  return (error as Error).message;
+}
+
+function fromColumns(columns: ColumnarScanResponse['columns']): Asset[] {
+  const names = Object.keys(columns) as (keyof Asset)[];
+  const count = names.length ? columns[names[0]].length : 0;
+  const assets: Asset[] = [];
+  for (let i = 0; i < count; i++) {
+    const asset = {} as Record<keyof Asset, unknown>;
+    for (const name of names) {
+      asset[name] = columns[name][i];
+    }
+    assets.push(asset as Asset);
+  }
+  return assets;
+}
+
 class PythonEngineClient {
   private client: AxiosInstance;
   private isAvailable: boolean = false;
@@ -79,20 +172,53 @@ class PythonEngineClient {
     query: string,
     marketplaces?: string[],
     minUsers: number = 1000,
-    maxResultsPerMarketplace: number = 20
+    maxResultsPerMarketplace: number = 20,
+    options: ScanOptions = {}
   ): Promise<ScanResponse | null> {
+    const { tenant, ...filters } = options;
     try {
-      const response = await this.client.post<ScanResponse>('/scan', {
+      // Columnar transport is roughly half the bytes of row-per-asset JSON for large scans.
+      const response = await this.client.post<ColumnarScanResponse>('/scan', {
         query,
         marketplaces: marketplaces || [],
         min_users: minUsers,
         max_results_per_marketplace: maxResultsPerMarketplace,
-      });
+        ...filters,
+      }, { params: { format: 'columnar' }, headers: scanHeaders(options) });
       
-      console.log(`[PythonEngine] Scan returned ${response.data.total_found} assets`);
-      return response.data;
+      const { columns, format, ...meta } = response.data;
+      console.log(`[PythonEngine] Scan returned ${meta.total_found} assets`);
+      return { ...meta, assets: fromColumns(columns) };
+    } catch (error) {
+      console.error('[PythonEngine] Scan error:', describeError(error));
+      return null;
+    }
+  }
+
+  // Starts a scan whose verified assets are pushed to callbackUrl in batches; resolves to the scan id.
+  async startScan(
+    query: string,
+    callbackUrl: string,
+    marketplaces?: string[],
+    minUsers: number = 1000,
+    maxResultsPerMarketplace: number = 20,
+    options: ScanOptions = {}
+  ): Promise<string | null> {
+    const { tenant, ...filters } = options;
+    try {
+      const response = await this.client.post<{ scan_id: string; status: string }>('/scan', {
+        query,
+        marketplaces: marketplaces || [],
+        min_users: minUsers,
+        max_results_per_marketplace: maxResultsPerMarketplace,
+        callback_url: callbackUrl,
+        ...filters,
+      }, { headers: scanHeaders(options) });
+
+      console.log(`[PythonEngine] Scan ${response.data.scan_id} accepted`);
+      return response.data.scan_id;
     } catch (error) {
-      console.error('[PythonEngine] Scan error:', (error as Error).message);
+      console.error('[PythonEngine] Start scan error:', describeError(error));
       return null;
     }
   }
@@ -100,19 +226,20 @@ class PythonEngineClient {
   async verify(
     assetId: string,
     assetUrl: string,
-    marketplace: string
+    marketplace: string,
+    tenant?: string
   ): Promise<VerifyResponse | null> {
     try {
       const response = await this.client.post<VerifyResponse>('/verify', {
         asset_id: assetId,
         asset_url: assetUrl,
         marketplace,
-      });
+      }, { headers: tenantHeaders(tenant) });
       
       console.log(`[PythonEngine] Verified asset ${assetId}:`, response.data.verified);
       return response.data;
     } catch (error) {
-      console.error('[PythonEngine] Verify error:', (error as Error).message);
+      console.error('[PythonEngine] Verify error:', describeError(error));
       return null;
     }
   }
@@ -137,4 +264,4 @@ class PythonEngineClient {
 }
 
 export const pythonEngine = new PythonEngineClient();
-export type { Asset, ScanResponse, VerifyResponse, HealthResponse };
+export type { Asset, ScanOptions, ScanResponse, VerifyResponse, HealthResponse };
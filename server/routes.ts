@@ -2774,7 +2774,8 @@ Best,
         query || "",
         marketplaces,
         min_users,
-        max_results
+        max_results,
+        { tenant: req.sessionID }
       );
       
       if (result && result.assets.length > 0) {
@@ -2841,7 +2842,8 @@ Best,
       const result = await pythonEngine.verify(
         asset_id || "unknown",
         asset_url,
-        marketplace
+        marketplace,
+        req.sessionID
       );
       
       if (result) {
@@ -0,0 +1,175 @@
+import re
+import html
+import threading
+from typing import Optional, List, Dict, Any, Tuple, Callable, Awaitable
+
+# Letters, digit runs and single symbols, roughly how SentencePiece splits listing text.
+_PIECES = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+_WORDS = re.compile(r"\S+\s*")
+ELLIPSIS = "…"
+# Gemini averages about three words per four tokens on English prose.
+WORDS_PER_TOKEN = 0.75
+# Keys, quotes and braces around the sections of a JSON reply.
+JSON_OVERHEAD_TOKENS = 64
+# The output cap is a hard stop, so it sits well above the expected reply; a reply cut
+# off mid-JSON cannot be parsed.
+OUTPUT_HEADROOM = 2.0
+
+
+class TruncatedReply(ValueError):
+    """The model stopped at the output cap, so its JSON is incomplete."""
+
+
+def count_tokens(text: str) -> int:
+    """Local estimate of Gemini's token count, close enough to budget with and free of a network round trip.
+
+    Common words are one token and long ones split about every six
+    letters; digits go in threes; punctuation is a token each.
+    """
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        if piece.isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            tokens += 1 + (len(piece) - 1) // 6
+        else:
+            tokens += 1
+    return tokens
+
+
+def normalize(text: str) -> str:
+    """Strip markup, links and whitespace runs that cost tokens without telling the model anything."""
+    text = html.unescape(re.sub(r"<[^>]+>", " ", text or ""))
+    text = re.sub(r"https?://\S+", "", text)
+    text = re.sub(r"\b(?:Read more|See more|Learn more)\b\.*", "", text, flags=re.I)
+    text = re.sub(r"([!?.…])\1+", r"\1", text)
+    return re.sub(r"\s+", " ", text).strip(" .·|-")
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Cut ``text`` at a word boundary so it fits ``max_tokens``."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    kept: List[str] = []
+    used = 1  # the ellipsis
+    for word in _WORDS.findall(text):
+        cost = count_tokens(word)
+        if used + cost > max_tokens:
+            break
+        kept.append(word)
+        used += cost
+    return "".join(kept).rstrip() + ELLIPSIS
+
+
+def _finish_reason(response: Any) -> str:
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return str(getattr(reason, "name", reason) or "")
+
+
+class CompactPrompt:
+    """A prompt split into static instructions and a budgeted per-call part.
+
+    The instructions go out as the request's system instruction, so they
+    form an identical prefix on every call and never compete with the
+    listing for budget. Each field is normalized and truncated to its own
+    token budget. When ``sections`` is given, each key of the JSON reply
+    has a token cap: the model is told the matching word limit and
+    :meth:`cap` trims anything that still runs over.
+
+    ``max_output_tokens`` defaults to ``OUTPUT_HEADROOM`` times the
+    expected reply. :meth:`generate` retries a reply cut off at that cap
+    once with double the cap, then raises :class:`TruncatedReply` so the
+    caller falls back explicitly. Token usage is tallied per call from
+    the provider's usage metadata, falling back to the local estimate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        system: str,
+        expected_output_tokens: Optional[int] = None,
+        sections: Optional[Dict[str, Tuple[int, str]]] = None,
+        max_output_tokens: Optional[int] = None,
+    ):
+        self.name = name
+        self.section_caps = {key: cap for key, (cap, _) in (sections or {}).items()}
+        if sections:
+            keys = "\n".join(
+                f'- "{key}" (at most {int(cap * WORDS_PER_TOKEN)} words): {description}'
+                for key, (cap, description) in sections.items()
+            )
+            system = f"{system}\nReturn ONLY a JSON object with these keys:\n{keys}"
+            expected_output_tokens = expected_output_tokens or sum(self.section_caps.values()) + JSON_OVERHEAD_TOKENS
+        if max_output_tokens is None and expected_output_tokens is None:
+            raise ValueError("CompactPrompt needs sections, expected_output_tokens or max_output_tokens")
+        self.system = system
+        self.system_tokens = count_tokens(system)
+        self.expected_output_tokens = expected_output_tokens or max_output_tokens
+        self.max_output_tokens = max_output_tokens or int(expected_output_tokens * OUTPUT_HEADROOM)
+        self._lock = threading.Lock()
+        self._totals = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "truncated": 0}
+
+    def render(self, fields: List[Tuple[str, Any, Optional[int]]]) -> str:
+        """One ``Label: value`` line per field; fields with a budget of None are sent as they are."""
+        lines = []
+        for label, value, budget in fields:
+            value = "" if value is None else str(value)
+            if budget is not None:
+                value = truncate(normalize(value), budget)
+            lines.append(f"{label}: {value}")
+        return "\n".join(lines)
+
+    def config(self, **overrides: Any) -> Dict[str, Any]:
+        return {
+            "system_instruction": self.system,
+            "response_mime_type": "application/json",
+            "max_output_tokens": self.max_output_tokens,
+            **overrides,
+        }
+
+    def cap(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: truncate(value, self.section_caps[key]) if key in self.section_caps and isinstance(value, str) else value
+            for key, value in data.items()
+        }
+
+    async def generate(self, send: Callable[[Dict[str, Any]], Awaitable[Any]], prompt: str, **overrides: Any) -> str:
+        """Call ``send(config)`` and return the reply text, retrying once if it hit the output cap."""
+        config = self.config(**overrides)
+        for _ in range(2):
+            response = await send(config)
+            self.record(prompt, response)
+            if _finish_reason(response) != "MAX_TOKENS":
+                return (getattr(response, "text", None) or "").strip()
+            with self._lock:
+                self._totals["truncated"] += 1
+            config = {**config, "max_output_tokens": config["max_output_tokens"] * 2}
+        raise TruncatedReply(f"{self.name} reply hit the output cap twice")
+
+    def record(self, prompt: str, response: Any) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        if prompt_tokens is None:
+            prompt_tokens = self.system_tokens + count_tokens(prompt)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        if output_tokens is None:
+            output_tokens = count_tokens(getattr(response, "text", None) or "")
+        with self._lock:
+            self._totals["calls"] += 1
+            self._totals["prompt_tokens"] += prompt_tokens
+            self._totals["cached_tokens"] += getattr(usage, "cached_content_token_count", None) or 0
+            self._totals["output_tokens"] += output_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self._totals)
+        calls = totals["calls"] or 1
+        return {
+            **totals,
+            "system_tokens": self.system_tokens,
+            "expected_output_tokens": self.expected_output_tokens,
+            "max_output_tokens": self.max_output_tokens,
+            "prompt_tokens_per_call": round(totals["prompt_tokens"] / calls, 1),
+            "output_tokens_per_call": round(totals["output_tokens"] / calls, 1),
+        }
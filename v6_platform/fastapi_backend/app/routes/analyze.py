@@ -3,6 +3,7 @@ import json
 from google import genai
 from fastapi import APIRouter
 from app.schemas import AnalyzeRequest, AnalyzeResult
+from app.prompts import CompactPrompt, TruncatedReply
 
 router = APIRouter()
 
@@ -10,6 +11,23 @@ router = APIRouter()
 GEMINI_API_KEY = os.getenv("AI_INTEGRATIONS_GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
 GEMINI_BASE_URL = os.getenv("AI_INTEGRATIONS_GEMINI_BASE_URL")
 
+# Valuation and MRR are calculated here, so the model only writes the five prose sections.
+ANALYZE_PROMPT = CompactPrompt(
+    "analyze",
+    system="""You are a ruthless Distressed Asset Fund Manager specializing in digital micro-acquisitions.
+Use the pre-calculated metrics exactly as given.
+chrome_extension: Google is deprecating Manifest V2 in 2025, forcing all extensions to migrate to Manifest V3 or die.
+shopify_app: focus on merchant retention and recurring revenue potential.""",
+    sections={
+        "manifest_v2_risk": (48, "Manifest V2 risk for Chrome, platform risk otherwise; High/Medium/Low with specific reasoning"),
+        "the_play": (200, "acquisition strategy: how to approach the owner, what to offer, how to monetize post-acquisition"),
+        "cold_email": (160, "a short, direct, intriguing pattern-interrupt cold email to the developer"),
+        "owner_contact": (24, "a fake but realistic owner name and email, for demo purposes"),
+        "negotiation_script": (200, "script for the first acquisition call"),
+    },
+)
+NAME_TOKEN_BUDGET = 24
+
 @router.post("/", response_model=AnalyzeResult)
 async def analyze_asset(request: AnalyzeRequest):
     if not GEMINI_API_KEY:
@@ -29,9 +47,12 @@ async def analyze_asset(request: AnalyzeRequest):
             http_options={"api_version": "", "base_url": GEMINI_BASE_URL}
         )
         model_name = "gemini-2.5-flash"
+        # 2.5 models spend output budget on thinking; the sections are capped, so skip it.
+        overrides = {"thinking_config": {"thinking_budget": 0}}
     else:
         client = genai.Client(api_key=GEMINI_API_KEY)
         model_name = "gemini-2.0-flash"
+        overrides = {}
 
     # Calculate MRR using the formula: Users * 2% conversion * $5/mo
     users = request.users
@@ -42,53 +63,26 @@ async def analyze_asset(request: AnalyzeRequest):
     valuation_low = annual_revenue * 3
     valuation_high = annual_revenue * 5
 
-    asset_type_context = ""
-    if request.asset_type == "chrome_extension":
-        asset_type_context = "This is a Chrome Extension. Note: Google is deprecating Manifest V2 in 2025, forcing all extensions to migrate to Manifest V3 or die."
-    elif request.asset_type == "shopify_app":
-        asset_type_context = "This is a Shopify App. Focus on merchant retention and recurring revenue potential."
-
-    system_prompt = f"""You are a ruthless Distressed Asset Fund Manager specializing in digital micro-acquisitions.
-
-INPUT:
-- Asset Name: {request.asset_name}
-- Users: {users:,}
-- URL: {request.url or "N/A"}
-- Asset Type: {request.asset_type}
-{asset_type_context}
-
-PRE-CALCULATED METRICS (use these exact numbers):
-- Potential MRR: ${calculated_mrr:,.0f}/month (Formula: {users:,} users x 2% conversion x $5/mo)
-- Annual Revenue Potential: ${annual_revenue:,.0f}
-- Valuation Range: ${valuation_low:,.0f} - ${valuation_high:,.0f} (3-5x annual revenue)
-
-YOUR TASK:
-1. Assess the "Manifest V2 Risk" (for Chrome) or "Platform Risk" (for Shopify) - rate as High/Medium/Low with specific reasoning.
-2. Write "The Play" - your acquisition and monetization strategy. Be specific about:
-   - How to approach the owner
-   - What to offer
-   - How to monetize post-acquisition
-3. Write a "Pattern Interrupt" cold email that gets the developer's attention. Make it short, direct, and intriguing.
-4. Generate a fake but realistic "Owner Contact" (for demo purposes).
-5. Write a "Negotiation Script" for the first call.
-
-Return ONLY valid JSON with these exact keys:
-{{
-  "valuation": "${valuation_low:,.0f} - ${valuation_high:,.0f}",
-  "potential_mrr": "${calculated_mrr:,.0f}/month",
-  "the_play": "string describing full acquisition strategy",
-  "cold_email": "string with the full cold email",
-  "manifest_v2_risk": "High/Medium/Low with specific reasoning",
-  "owner_contact": "Generated owner name and email for demo",
-  "negotiation_script": "Script for first acquisition call"
-}}"""
+    prompt = ANALYZE_PROMPT.render([
+        ("Asset Name", request.asset_name, NAME_TOKEN_BUDGET),
+        ("Asset Type", request.asset_type, None),
+        ("Users", f"{users:,}", None),
+        ("URL", request.url or "N/A", None),
+        ("Potential MRR", f"${calculated_mrr:,.0f}/month ({users:,} users x 2% conversion x $5/mo)", None),
+        ("Annual Revenue Potential", f"${annual_revenue:,.0f}", None),
+        ("Valuation Range", f"${valuation_low:,.0f} - ${valuation_high:,.0f} (3-5x annual revenue)", None),
+    ])
 
     try:
-        response = client.models.generate_content(
-            model=model_name,
-            contents=system_prompt
+        text = await ANALYZE_PROMPT.generate(
+            lambda config: client.aio.models.generate_content(
+                model=model_name,
+                contents=prompt,
+                config=config
+            ),
+            prompt,
+            **overrides,
         )
-        text = response.text.strip()
         
         # Clean JSON from markdown code blocks
         if text.startswith("```json"):
@@ -99,11 +93,11 @@ Return ONLY valid JSON with these exact keys:
             text = text[:-3]
         text = text.strip()
         
-        data = json.loads(text)
+        data = ANALYZE_PROMPT.cap(json.loads(text))
         
         return AnalyzeResult(
-            valuation=data.get("valuation", f"${valuation_low:,.0f} - ${valuation_high:,.0f}"),
-            potential_mrr=data.get("potential_mrr", f"${calculated_mrr:,.0f}/month"),
+            valuation=f"${valuation_low:,.0f} - ${valuation_high:,.0f}",
+            potential_mrr=f"${calculated_mrr:,.0f}/month",
             the_play=data.get("the_play", "Analysis pending"),
             cold_email=data.get("cold_email", ""),
             manifest_v2_risk=data.get("manifest_v2_risk", "Unknown"),
@@ -111,7 +105,7 @@ Return ONLY valid JSON with these exact keys:
             negotiation_script=data.get("negotiation_script", "Script locked")
         )
 
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, TruncatedReply) as e:
         print(f"JSON Parse Error: {e}")
         # Return calculated values even if AI fails
         return AnalyzeResult(
@@ -134,3 +128,8 @@ Return ONLY valid JSON with these exact keys:
             owner_contact=None,
             negotiation_script=None
         )
+
+
+@router.get("/stats")
+async def prompt_stats():
+    return ANALYZE_PROMPT.stats()
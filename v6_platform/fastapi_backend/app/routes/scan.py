@@ -1,4 +1,5 @@
 import os
+import asyncio
 import requests
 from fastapi import APIRouter
 from app.schemas import ScanRequest, ScanResult, Asset
@@ -42,7 +43,7 @@ async def scan_chrome_web_store(niche: str) -> List[Asset]:
     }
 
     try:
-        response = requests.get("https://serpapi.com/search", params=params)
+        response = await asyncio.to_thread(requests.get, "https://serpapi.com/search", params=params)
         data = response.json()
         results = data.get("organic_results", [])
         
@@ -88,7 +89,7 @@ async def scan_shopify_app_store(niche: str) -> List[Asset]:
     }
 
     try:
-        response = requests.get("https://serpapi.com/search", params=params)
+        response = await asyncio.to_thread(requests.get, "https://serpapi.com/search", params=params)
         data = response.json()
         results = data.get("organic_results", [])
         
@@ -2,9 +2,10 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import scan, analyze
+from app.diagnostics import LoopWatchdog, install as install_diagnostics, get_profile, debug_guard
 
 app = FastAPI(title="Revenue Hunter API", version="2.0")
 
@@ -16,6 +17,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Stack-revealing endpoints answer 404 unless this token is configured and sent as X-Debug-Token.
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")
+watchdog = LoopWatchdog(threshold=float(os.getenv("LOOP_LAG_THRESHOLD_MS", "200")) / 1000)
+install_diagnostics(
+    app,
+    watchdog,
+    profiled_paths=["/api/scan/", "/api/analyze/"],
+    profiling_enabled=os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes"),
+    debug_token=DEBUG_TOKEN,
+)
+
 app.include_router(scan.router, prefix="/api/scan", tags=["Scan"])
 app.include_router(analyze.router, prefix="/api/analyze", tags=["Analyze"])
 
@@ -26,3 +38,14 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+@app.get("/debug/loop", dependencies=[Depends(debug_guard(DEBUG_TOKEN))])
+async def loop_stats():
+    return watchdog.stats()
+
+@app.get("/debug/profile/{profile_id}", dependencies=[Depends(debug_guard(DEBUG_TOKEN))])
+async def request_profile(profile_id: str):
+    profile = get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile